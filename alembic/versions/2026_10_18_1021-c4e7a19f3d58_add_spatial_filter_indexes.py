@@ -0,0 +1,32 @@
+"""Add spatial filter indexes
+
+Revision ID: c4e7a19f3d58
+Revises: 8e3a6d41c0b2
+Create Date: 2026-10-18 10:21:07.418356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a19f3d58'
+down_revision: Union[str, Sequence[str], None] = '8e3a6d41c0b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The GiST indexes on images.geom and image_sets.limits (idx_images_geom, idx_image_sets_limits) already
+    # serve bbox and intersects-polygon; within-distance compares geographies, which needs expression indexes.
+    op.create_index('idx_images_geom_geography', 'images', [sa.text('(geom::geography(Geometry,4326))')], unique=False, postgresql_using='gist')
+    op.create_index('idx_image_sets_limits_geography', 'image_sets', [sa.text('(limits::geography(Geometry,4326))')], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_image_sets_limits_geography', table_name='image_sets', postgresql_using='gist')
+    op.drop_index('idx_images_geom_geography', table_name='images', postgresql_using='gist')
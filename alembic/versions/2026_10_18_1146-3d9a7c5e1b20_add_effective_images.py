@@ -0,0 +1,267 @@
+"""Add effective images
+
+Revision ID: 3d9a7c5e1b20
+Revises: e1f58b27a9c4
+Create Date: 2026-10-18 11:46:12.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9a7c5e1b20'
+down_revision: Union[str, Sequence[str], None] = 'e1f58b27a9c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The images merged with their image_set, as computed by `ifdo_api.crud.effective_image.refresh_statement`
+BACKFILL = """
+    INSERT INTO effective_images (
+        id,
+        name,
+        image_set_id,
+        created_at,
+        updated_at,
+        handle,
+        context_id,
+        project_id,
+        event_id,
+        platform_id,
+        sensor_id,
+        pi_id,
+        license_id,
+        creator_ids,
+        camera_pose_id,
+        camera_housing_viewport_id,
+        flatport_parameter_id,
+        domeport_parameter_id,
+        camera_calibration_model_id,
+        photometric_calibration_id,
+        sha256_hash,
+        date_time,
+        geom,
+        latitude,
+        longitude,
+        altitude_meters,
+        coordinate_uncertainty_meters,
+        copyright,
+        abstract,
+        entropy,
+        particle_count,
+        average_color,
+        mpeg7_color_layout,
+        mpeg7_color_statistic,
+        mpeg7_color_structure,
+        mpeg7_dominant_color,
+        mpeg7_edge_histogram,
+        mpeg7_homogeneous_texture,
+        mpeg7_scalable_color,
+        acquisition,
+        quality,
+        deployment,
+        navigation,
+        scale_reference,
+        illumination,
+        pixel_magnitude,
+        marine_zone,
+        spectral_resolution,
+        capture_mode,
+        fauna_attraction,
+        area_square_meters,
+        meters_above_ground,
+        acquisition_settings,
+        camera_yaw_degrees,
+        camera_pitch_degrees,
+        camera_roll_degrees,
+        overlap_fraction,
+        objective,
+        target_environment,
+        target_timescale,
+        spatial_constraints,
+        temporal_constraints,
+        time_synchronisation,
+        item_identification_scheme,
+        curation_protocol,
+        visual_constraints
+    )
+    SELECT
+        images.id,
+        images.name,
+        images.image_set_id,
+        images.created_at,
+        images.updated_at,
+        coalesce(nullif(images.handle, ''), image_sets.handle) AS handle,
+        coalesce(images.context_id, image_sets.context_id) AS context_id,
+        coalesce(images.project_id, image_sets.project_id) AS project_id,
+        coalesce(images.event_id, image_sets.event_id) AS event_id,
+        coalesce(images.platform_id, image_sets.platform_id) AS platform_id,
+        coalesce(images.sensor_id, image_sets.sensor_id) AS sensor_id,
+        coalesce(images.pi_id, image_sets.pi_id) AS pi_id,
+        coalesce(images.license_id, image_sets.license_id) AS license_id,
+        coalesce(nullif(array((SELECT image_creators.creator_id FROM image_creators WHERE image_creators.image_id = images.id)), '{}'), array((SELECT image_set_creators.creator_id FROM image_set_creators WHERE image_set_creators.image_set_id = image_sets.id))) AS creators,
+        coalesce(images.camera_pose_id, image_sets.camera_pose_id) AS camera_pose_id,
+        coalesce(images.camera_housing_viewport_id, image_sets.camera_housing_viewport_id) AS camera_housing_viewport_id,
+        coalesce(images.flatport_parameter_id, image_sets.flatport_parameter_id) AS flatport_parameter_id,
+        coalesce(images.domeport_parameter_id, image_sets.domeport_parameter_id) AS domeport_parameter_id,
+        coalesce(images.camera_calibration_model_id, image_sets.camera_calibration_model_id) AS camera_calibration_model_id,
+        coalesce(images.photometric_calibration_id, image_sets.photometric_calibration_id) AS photometric_calibration_id,
+        coalesce(nullif(images.sha256_hash, ''), image_sets.sha256_hash) AS sha256_hash,
+        coalesce(images.date_time, image_sets.date_time) AS date_time,
+        coalesce(images.geom, image_sets.geom) AS geom,
+        coalesce(images.latitude, image_sets.latitude) AS latitude,
+        coalesce(images.longitude, image_sets.longitude) AS longitude,
+        coalesce(images.altitude_meters, image_sets.altitude_meters) AS altitude_meters,
+        coalesce(images.coordinate_uncertainty_meters, image_sets.coordinate_uncertainty_meters) AS coordinate_uncertainty_meters,
+        coalesce(nullif(images.copyright, ''), image_sets.copyright) AS copyright,
+        coalesce(nullif(images.abstract, ''), image_sets.abstract) AS abstract,
+        coalesce(images.entropy, image_sets.entropy) AS entropy,
+        coalesce(images.particle_count, image_sets.particle_count) AS particle_count,
+        coalesce(nullif(images.average_color, '{}'), image_sets.average_color) AS average_color,
+        coalesce(nullif(images.mpeg7_color_layout, '{}'), image_sets.mpeg7_color_layout) AS mpeg7_color_layout,
+        coalesce(nullif(images.mpeg7_color_statistic, '{}'), image_sets.mpeg7_color_statistic) AS mpeg7_color_statistic,
+        coalesce(nullif(images.mpeg7_color_structure, '{}'), image_sets.mpeg7_color_structure) AS mpeg7_color_structure,
+        coalesce(nullif(images.mpeg7_dominant_color, '{}'), image_sets.mpeg7_dominant_color) AS mpeg7_dominant_color,
+        coalesce(nullif(images.mpeg7_edge_histogram, '{}'), image_sets.mpeg7_edge_histogram) AS mpeg7_edge_histogram,
+        coalesce(nullif(images.mpeg7_homogeneous_texture, '{}'), image_sets.mpeg7_homogeneous_texture) AS mpeg7_homogeneous_texture,
+        coalesce(nullif(images.mpeg7_scalable_color, '{}'), image_sets.mpeg7_scalable_color) AS mpeg7_scalable_color,
+        coalesce(images.acquisition, image_sets.acquisition) AS acquisition,
+        coalesce(images.quality, image_sets.quality) AS quality,
+        coalesce(images.deployment, image_sets.deployment) AS deployment,
+        coalesce(images.navigation, image_sets.navigation) AS navigation,
+        coalesce(images.scale_reference, image_sets.scale_reference) AS scale_reference,
+        coalesce(images.illumination, image_sets.illumination) AS illumination,
+        coalesce(images.pixel_magnitude, image_sets.pixel_magnitude) AS pixel_magnitude,
+        coalesce(images.marine_zone, image_sets.marine_zone) AS marine_zone,
+        coalesce(images.spectral_resolution, image_sets.spectral_resolution) AS spectral_resolution,
+        coalesce(images.capture_mode, image_sets.capture_mode) AS capture_mode,
+        coalesce(images.fauna_attraction, image_sets.fauna_attraction) AS fauna_attraction,
+        coalesce(images.area_square_meters, image_sets.area_square_meters) AS area_square_meters,
+        coalesce(images.meters_above_ground, image_sets.meters_above_ground) AS meters_above_ground,
+        coalesce(nullif(nullif(images.acquisition_settings, '{}'::jsonb), '[]'::jsonb), image_sets.acquisition_settings) AS acquisition_settings,
+        coalesce(images.camera_yaw_degrees, image_sets.camera_yaw_degrees) AS camera_yaw_degrees,
+        coalesce(images.camera_pitch_degrees, image_sets.camera_pitch_degrees) AS camera_pitch_degrees,
+        coalesce(images.camera_roll_degrees, image_sets.camera_roll_degrees) AS camera_roll_degrees,
+        coalesce(images.overlap_fraction, image_sets.overlap_fraction) AS overlap_fraction,
+        coalesce(nullif(images.objective, ''), image_sets.objective) AS objective,
+        coalesce(nullif(images.target_environment, ''), image_sets.target_environment) AS target_environment,
+        coalesce(nullif(images.target_timescale, ''), image_sets.target_timescale) AS target_timescale,
+        coalesce(nullif(images.spatial_constraints, ''), image_sets.spatial_constraints) AS spatial_constraints,
+        coalesce(nullif(images.temporal_constraints, ''), image_sets.temporal_constraints) AS temporal_constraints,
+        coalesce(nullif(images.time_synchronisation, ''), image_sets.time_synchronisation) AS time_synchronisation,
+        coalesce(nullif(images.item_identification_scheme, ''), image_sets.item_identification_scheme) AS item_identification_scheme,
+        coalesce(nullif(images.curation_protocol, ''), image_sets.curation_protocol) AS curation_protocol,
+        coalesce(nullif(images.visual_constraints, ''), image_sets.visual_constraints) AS visual_constraints
+    FROM images LEFT OUTER JOIN image_sets ON images.image_set_id = image_sets.id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_geospatial_table('effective_images',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('image_set_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('handle', sa.String(), nullable=True),
+    sa.Column('context_id', sa.UUID(), nullable=True),
+    sa.Column('project_id', sa.UUID(), nullable=True),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('platform_id', sa.UUID(), nullable=True),
+    sa.Column('sensor_id', sa.UUID(), nullable=True),
+    sa.Column('pi_id', sa.UUID(), nullable=True),
+    sa.Column('license_id', sa.UUID(), nullable=True),
+    sa.Column('camera_pose_id', sa.UUID(), nullable=True),
+    sa.Column('camera_housing_viewport_id', sa.UUID(), nullable=True),
+    sa.Column('flatport_parameter_id', sa.UUID(), nullable=True),
+    sa.Column('domeport_parameter_id', sa.UUID(), nullable=True),
+    sa.Column('camera_calibration_model_id', sa.UUID(), nullable=True),
+    sa.Column('photometric_calibration_id', sa.UUID(), nullable=True),
+    sa.Column('sha256_hash', sa.String(length=64), nullable=True),
+    sa.Column('date_time', sa.DateTime(), nullable=True),
+    sa.Column('geom', Geometry(geometry_type='POINT', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('altitude_meters', sa.Float(), nullable=True),
+    sa.Column('coordinate_uncertainty_meters', sa.Float(), nullable=True),
+    sa.Column('copyright', sa.String(length=500), nullable=True),
+    sa.Column('abstract', sa.Text(), nullable=True),
+    sa.Column('entropy', sa.Float(), nullable=True),
+    sa.Column('particle_count', sa.Integer(), nullable=True),
+    sa.Column('average_color', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_color_layout', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_color_statistic', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_color_structure', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_dominant_color', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_edge_histogram', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_homogeneous_texture', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('mpeg7_scalable_color', postgresql.ARRAY(sa.Float()), nullable=True),
+    sa.Column('acquisition', postgresql.ENUM('photo', 'video', 'slide', name='acquisitionenum', create_type=False), nullable=True),
+    sa.Column('quality', postgresql.ENUM('raw', 'processed', 'product', name='qualityenum', create_type=False), nullable=True),
+    sa.Column('deployment', postgresql.ENUM('mapping', 'stationary', 'survey', 'exploration', 'experiment', 'sampling', name='deploymentenum', create_type=False), nullable=True),
+    sa.Column('navigation', postgresql.ENUM('satellite', 'beacon', 'transponder', 'reconstructed', name='navigationenum', create_type=False), nullable=True),
+    sa.Column('scale_reference', postgresql.ENUM('camera_3d', 'camera_calibrated', 'laser_marker', 'optical_flow', name='scalereferenceenum', create_type=False), nullable=True),
+    sa.Column('illumination', postgresql.ENUM('sunlight', 'artificial_light', 'mixed_light', name='illuminationenum', create_type=False), nullable=True),
+    sa.Column('pixel_magnitude', postgresql.ENUM('km', 'hm', 'dam', 'm', 'cm', 'mm', 'um', name='pixelmagnitudeenum', create_type=False), nullable=True),
+    sa.Column('marine_zone', postgresql.ENUM('seafloor', 'water_column', 'sea_surface', 'atmosphere', 'laboratory', name='marinezoneenum', create_type=False), nullable=True),
+    sa.Column('spectral_resolution', postgresql.ENUM('grayscale', 'rgb', 'multi_spectral', 'hyper_spectral', name='spectralresenum', create_type=False), nullable=True),
+    sa.Column('capture_mode', postgresql.ENUM('timer', 'manual', 'mixed', name='capturemodeenum', create_type=False), nullable=True),
+    sa.Column('fauna_attraction', postgresql.ENUM('none', 'baited', 'light', name='faunaattractionenum', create_type=False), nullable=True),
+    sa.Column('area_square_meters', sa.Float(), nullable=True),
+    sa.Column('meters_above_ground', sa.Float(), nullable=True),
+    sa.Column('acquisition_settings', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('camera_yaw_degrees', sa.Float(), nullable=True),
+    sa.Column('camera_pitch_degrees', sa.Float(), nullable=True),
+    sa.Column('camera_roll_degrees', sa.Float(), nullable=True),
+    sa.Column('overlap_fraction', sa.Float(), nullable=True),
+    sa.Column('objective', sa.Text(), nullable=True),
+    sa.Column('target_environment', sa.Text(), nullable=True),
+    sa.Column('target_timescale', sa.Text(), nullable=True),
+    sa.Column('spatial_constraints', sa.Text(), nullable=True),
+    sa.Column('temporal_constraints', sa.Text(), nullable=True),
+    sa.Column('time_synchronisation', sa.Text(), nullable=True),
+    sa.Column('item_identification_scheme', sa.Text(), nullable=True),
+    sa.Column('curation_protocol', sa.Text(), nullable=True),
+    sa.Column('visual_constraints', sa.Text(), nullable=True),
+    sa.Column('creator_ids', postgresql.ARRAY(sa.UUID()), nullable=True),
+    sa.ForeignKeyConstraint(['camera_calibration_model_id'], ['image_camera_calibration_models.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['camera_housing_viewport_id'], ['image_camera_housing_viewports.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['camera_pose_id'], ['image_camera_poses.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['context_id'], ['contexts.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['domeport_parameter_id'], ['image_domeport_parameters.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['flatport_parameter_id'], ['image_flatport_parameters.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['id'], ['images.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['image_set_id'], ['image_sets.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['license_id'], ['licenses.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['photometric_calibration_id'], ['image_photometric_calibrations.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['pi_id'], ['pis.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['platform_id'], ['platforms.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    info={'help_text': 'Effective metadata of the images, falling back to their image_set'}
+    )
+    op.create_index('idx_effective_images_created_at_id', 'effective_images', ['created_at', 'id'], unique=False)
+    op.create_geospatial_index('idx_effective_images_geom', 'effective_images', ['geom'], unique=False, postgresql_using='gist', postgresql_ops={})
+    op.create_index('ix_effective_images_date_time', 'effective_images', ['date_time'], unique=False)
+    op.create_index('ix_effective_images_image_set_id', 'effective_images', ['image_set_id'], unique=False)
+    # Fill the table with the images already imported, then the CRUD objects keep it up to date
+    op.execute(sa.text(BACKFILL))
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_effective_images_image_set_id', table_name='effective_images')
+    op.drop_index('ix_effective_images_date_time', table_name='effective_images')
+    op.drop_geospatial_index('idx_effective_images_geom', table_name='effective_images', postgresql_using='gist', column_name='geom')
+    op.drop_index('idx_effective_images_created_at_id', table_name='effective_images')
+    op.drop_geospatial_table('effective_images')
+    # ### end Alembic commands ###
@@ -0,0 +1,101 @@
+"""Add annotation geometry
+
+Revision ID: 7b2f9e4c8a16
+Revises: 3d9a7c5e1b20
+Create Date: 2026-10-18 12:31:40.203517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2f9e4c8a16'
+down_revision: Union[str, Sequence[str], None] = '3d9a7c5e1b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The pixel-space geometry of an annotation, computed by the database from its shape and coordinates (one list of
+# values per frame) so that every write path fills it. Frames that do not fit their shape have no geometry.
+ANNOTATION_GEOMETRY = """
+    CREATE OR REPLACE FUNCTION annotation_geometry(shape shapeenum, coordinates jsonb) RETURNS geometry
+    LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE
+    SET search_path = public, pg_catalog
+    AS $$
+    DECLARE
+        frame jsonb;
+        points geometry[];
+        ring geometry[];
+        frame_geometry geometry;
+        geometries geometry[] := '{}';
+    BEGIN
+        IF shape = 'whole_image' OR jsonb_typeof(coordinates) IS DISTINCT FROM 'array' THEN
+            RETURN NULL;
+        END IF;
+        FOR frame IN SELECT value FROM jsonb_array_elements(coordinates) LOOP
+            CONTINUE WHEN jsonb_typeof(frame) <> 'array';
+            points := ARRAY(
+                SELECT ST_MakePoint((frame ->> (2 * k))::float8, (frame ->> (2 * k + 1))::float8)
+                FROM generate_series(0, jsonb_array_length(frame) / 2 - 1) AS k
+                ORDER BY k
+            );
+            frame_geometry := NULL;
+            IF shape = 'single_pixel' AND cardinality(points) = 1 THEN
+                frame_geometry := points[1];
+            ELSIF shape = 'circle' AND jsonb_array_length(frame) = 3 THEN
+                frame_geometry := ST_Buffer(points[1], (frame ->> 2)::float8);
+            ELSIF shape = 'polyline' AND cardinality(points) >= 2 THEN
+                frame_geometry := ST_MakeLine(points);
+            ELSIF shape IN ('polygon', 'rectangle') AND cardinality(points) >= 3 THEN
+                ring := CASE WHEN ST_Equals(points[1], points[cardinality(points)]) THEN points ELSE points || points[1] END;
+                IF cardinality(ring) >= 4 THEN
+                    frame_geometry := ST_MakePolygon(ST_MakeLine(ring));
+                END IF;
+            ELSIF shape = 'ellipse' AND cardinality(points) = 4 THEN
+                -- The points are the ends of the two axes: a unit circle scaled to them, rotated and moved to their center
+                frame_geometry := ST_Translate(
+                    ST_Rotate(
+                        ST_Scale(ST_Buffer(ST_MakePoint(0, 0), 1), ST_Distance(points[1], points[3]) / 2, ST_Distance(points[2], points[4]) / 2),
+                        atan2(ST_Y(points[3]) - ST_Y(points[1]), ST_X(points[3]) - ST_X(points[1]))
+                    ),
+                    (ST_X(points[1]) + ST_X(points[3])) / 2,
+                    (ST_Y(points[1]) + ST_Y(points[3])) / 2
+                );
+            END IF;
+            IF frame_geometry IS NOT NULL THEN
+                geometries := geometries || frame_geometry;
+            END IF;
+        END LOOP;
+        IF cardinality(geometries) = 0 THEN
+            RETURN NULL;
+        ELSIF cardinality(geometries) = 1 THEN
+            RETURN geometries[1];
+        END IF;
+        RETURN ST_Collect(geometries);
+    END;
+    $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GiST indexes on uuid columns come with btree_gist
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    op.execute(sa.text(ANNOTATION_GEOMETRY))
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('annotations', sa.Column('geom', Geometry(spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), sa.Computed('annotation_geometry(shape, coordinates)', persisted=True), nullable=True))
+    op.create_index('idx_annotations_image_id_geom', 'annotations', ['image_id', 'geom'], unique=False, postgresql_using='gist')
+    op.create_index(op.f('ix_annotation_labels_annotation_id'), 'annotation_labels', ['annotation_id'], unique=False)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_annotation_labels_annotation_id'), table_name='annotation_labels')
+    op.drop_index('idx_annotations_image_id_geom', table_name='annotations', postgresql_using='gist')
+    op.drop_column('annotations', 'geom')
+    # ### end Alembic commands ###
+    op.execute(sa.text("DROP FUNCTION IF EXISTS annotation_geometry(shapeenum, jsonb)"))
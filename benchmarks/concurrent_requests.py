@@ -0,0 +1,71 @@
+"""Load-test read endpoints of a running API at increasing concurrency.
+
+Each level keeps `concurrency` requests in flight for `--requests` requests in total and reports the
+throughput and latency percentiles, so that the scaling of a single worker can be compared between builds.
+
+    uvicorn ifdo_api.api.app:app --workers 1 &
+    python benchmarks/concurrent_requests.py --url http://localhost:8000 --path /v1/image_sets/ --path /v1/images/
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def load(client: httpx.AsyncClient, paths: list[str], requests: int, concurrency: int) -> list[float]:
+    """Send the requests, cycling through the paths, with at most `concurrency` of them in flight.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the API base URL.
+        paths (list[str]): Paths of the endpoints to request.
+        requests (int): Total number of requests.
+        concurrency (int): Number of concurrent requests.
+
+    Returns:
+        list[float]: The latency of every request, in seconds.
+    """
+    latencies = []
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(paths[index % len(paths)])
+
+    async def worker() -> None:
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def main() -> None:
+    """Parse the command line and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running API.")
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint to request, may be repeated.")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of requests per concurrency level.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    paths = args.paths or ["/v1/image_sets/"]
+
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        await load(client, paths, min(args.requests, 10), 1)  # warm up the connection pools
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            latencies = await load(client, paths, args.requests, concurrency)
+            elapsed = time.perf_counter() - start
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"concurrency {concurrency:>4}: {len(latencies) / elapsed:,.1f} req/s, "
+                f"p50 {quantiles[49] * 1000:.1f} ms, p99 {quantiles[98] * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Compare the compiled index filters with the former string-built queries on the `images` table.
+
+For each query shape it runs `--queries` queries with varying values, once with the values inlined in the
+SQL text (as `CRUDBase.create_query` used to do) and once with the bound expressions of `compile_filters`,
+then prints the plan Postgres chose for the bound version. Bound queries share one SQL text per shape, so
+asyncpg prepares it once and Postgres can reuse its plan, while every inlined query is parsed and planned
+again. Run it against a database holding a realistic number of images, e.g. loaded with ifdo_import.py.
+
+    python benchmarks/filter_queries.py --queries 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.crud.filters import compile_filters
+from ifdo_api.crud.filters import parse_filters
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.db.db import async_engine
+from ifdo_api.models.image import Image
+
+
+def shapes(image_set_ids: list[str]) -> dict:
+    """Build, for each query shape, a function returning random filter parameters.
+
+    Args:
+        image_set_ids (list[str]): IDs of the image_sets present in the database.
+
+    Returns:
+        dict: The parameter factories, by name.
+    """
+
+    def latitude_range() -> list[tuple[str, str]]:
+        lower = random.uniform(-60, 50)  # noqa: S311
+        return [("latitude__range", f"{lower},{lower + 1}")]
+
+    def bbox() -> list[tuple[str, str]]:
+        lon, lat = random.uniform(-30, 20), random.uniform(-60, 50)  # noqa: S311
+        return [("geom__bbox", f"{lon},{lat},{lon + 0.5},{lat + 0.5}")]
+
+    return {
+        "eq image_set_id": lambda: [("image_set_id", random.choice(image_set_ids))],  # noqa: S311
+        "in image_set_id": lambda: [("image_set_id__in", ",".join(random.sample(image_set_ids, min(3, len(image_set_ids)))))],
+        "range latitude": latitude_range,
+        "bbox geom": bbox,
+    }
+
+
+def inlined_sql(params: list[tuple[str, str]]) -> str:
+    """Build the query with the values inlined in the SQL text, the way `create_query` did.
+
+    Args:
+        params (list[tuple[str, str]]): The filter parameters.
+
+    Returns:
+        str: The SQL text.
+    """
+    conditions = []
+    for name, value in params:
+        field, _, operator = name.partition("__")
+        if operator == "in":
+            values = ", ".join(f"'{item}'" for item in value.split(","))
+            conditions.append(f"{field} IN ({values})")
+        elif operator == "range":
+            lower, upper = value.split(",")
+            conditions.append(f"{field} >= '{lower}' AND {field} <= '{upper}'")
+        elif operator == "bbox":
+            conditions.append(f"ST_Intersects({field}, ST_MakeEnvelope({value}, 4326))")
+        else:
+            conditions.append(f"{field} = '{value}'")
+    return f"SELECT images.id FROM images WHERE {' AND '.join(conditions)}"  # noqa: S608
+
+
+async def time_queries(db: AsyncSession, statements: list) -> float:
+    """Run the statements one after the other.
+
+    Args:
+        db (AsyncSession): Database session.
+        statements (list): The statements to run.
+
+    Returns:
+        float: The mean time per query, in milliseconds.
+    """
+    start = time.perf_counter()
+    for statement in statements:
+        (await db.execute(statement)).all()
+    return (time.perf_counter() - start) * 1000 / len(statements)
+
+
+def plan_nodes(plan: dict) -> list[str]:
+    """Flatten an EXPLAIN plan into the node types, with the index they use.
+
+    Args:
+        plan (dict): A node of the JSON plan.
+
+    Returns:
+        list[str]: The description of each node.
+    """
+    node = plan["Node Type"] + (f" using {plan['Index Name']}" if "Index Name" in plan else "")
+    return [node] + [child for subplan in plan.get("Plans", []) for child in plan_nodes(subplan)]
+
+
+async def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=1000, help="Number of queries per shape and mode.")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        count = (await db.execute(select(func.count()).select_from(Image))).scalar_one()
+        image_set_ids = [str(value) for value in (await db.execute(select(Image.image_set_id).distinct())).scalars()]
+        if not image_set_ids:
+            print("No images in the database, import some first.")
+            return
+        print(f"{count} images in {len(image_set_ids)} image_sets")
+        for name, make_params in shapes(image_set_ids).items():
+            params = [make_params() for _ in range(args.queries)]
+            inlined = await time_queries(db, [text(inlined_sql(item)) for item in params])
+            compiled = [select(Image.id).where(*compile_filters(Image, parse_filters(Image, item))) for item in params]
+            bound = await time_queries(db, compiled)
+            explain = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {inlined_sql(params[0])}"))).scalar_one()
+            plan = explain if isinstance(explain, list) else json.loads(explain)
+            print(f"{name:>16}: inlined {inlined:.2f} ms/query, bound {bound:.2f} ms/query; plan: {' > '.join(plan_nodes(plan[0]['Plan']))}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Benchmark the iFDO import of `CRUDImageSet.create_from_ifdo` against the previous per-object ORM import.
+
+Runs against the database configured through the usual POSTGRES_* environment variables, and deletes the
+image sets it creates.
+
+    python benchmarks/ifdo_import.py --items 50000
+"""
+
+import argparse
+import asyncio
+import copy
+import time
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.crud.image_set import image_set_crud
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.db.db import async_engine
+from ifdo_api.models.image import Image
+from ifdo_api.models.image_set import ImageSet
+
+
+def synthetic_ifdo(items: int) -> dict:
+    """Build an iFDO with the given number of items, sharing the header dimensions.
+
+    Args:
+        items (int): Number of entries in `image-set-items`.
+
+    Returns:
+        dict: The iFDO data.
+    """
+    run = uuid4().hex[:8]
+    return {
+        "image-set-header": {
+            "image-set-name": f"benchmark-{run}",
+            "image-set-ifdo-version": "v2.1.0",
+            "image-context": {"name": "benchmark context"},
+            "image-project": {"name": "benchmark project"},
+            "image-creators": [{"name": "benchmark creator"}],
+        },
+        "image-set-items": {
+            f"{run}-{index:07d}.jpg": {
+                "image-latitude": -50 + (index % 1000) / 100,
+                "image-longitude": -20 + (index // 1000) / 100,
+                "image-altitude-meters": -4000.0,
+                "image-acquisition": "photo",
+                "image-event": {"name": "benchmark event"},
+                "image-creators": [{"name": "benchmark creator"}],
+            }
+            for index in range(items)
+        },
+    }
+
+
+async def import_orm(db: AsyncSession, ifdo_data: dict) -> ImageSet:
+    """Import the iFDO by building one `Image` object per item and flushing them in a single commit.
+
+    Args:
+        db (AsyncSession): Database session.
+        ifdo_data (dict): The iFDO data.
+
+    Returns:
+        ImageSet: The created image_set.
+    """
+    image_set_dict = await image_set_crud.parse_ifdo(db=db, section=ifdo_data["image-set-header"], section_name="header")
+    images = []
+    for key, value in ifdo_data["image-set-items"].items():
+        value["image-set-name"] = key
+        images.append(Image(**await image_set_crud.parse_ifdo(db=db, section=value, section_name="items")))
+    db_obj = ImageSet(**image_set_dict, images=images)
+    db.add(db_obj)
+    await db.commit()
+    return db_obj
+
+
+async def run(name: str, items: int) -> None:
+    """Time one import and remove the created image_set.
+
+    Args:
+        name (str): Either "orm" or "bulk".
+        items (int): Number of items to import.
+    """
+    ifdo_data = synthetic_ifdo(items)
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        if name == "orm":
+            db_obj = await import_orm(db, copy.deepcopy(ifdo_data))
+        else:
+            db_obj = await image_set_crud.create_from_ifdo(db=db, ifdo_data=copy.deepcopy(ifdo_data))
+        elapsed = time.perf_counter() - start
+        print(f"{name:>5}: {items} images in {elapsed:.2f}s ({items / elapsed:,.0f} rows/s)")
+        await image_set_crud.delete(db=db, id_pk=db_obj.id)
+
+
+async def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000, help="Number of images in the synthetic iFDO.")
+    parser.add_argument("--mode", choices=["orm", "bulk", "both"], default="both")
+    args = parser.parse_args()
+    for name in ("orm", "bulk"):
+        if args.mode in (name, "both"):
+            await run(name, args.items)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
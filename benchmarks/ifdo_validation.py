@@ -0,0 +1,62 @@
+"""Benchmark the validation of a large iFDO with an increasing number of worker processes.
+
+The header is validated once and the items by chunks of IFDO_VALIDATION_CHUNK_SIZE, in the validation pool of
+`ifdo_api.utils.ifdo`: with one worker the chunks are validated in this process, with more they are spread over
+the pool. Each run is preceded by a warm-up validation, so that the workers are started and their validators
+compiled. The schema comes from the schema store (IFDO_SCHEMA_DIR) or is downloaded once.
+
+    python benchmarks/ifdo_validation.py --items 100000 --workers 1 2 4 8
+"""
+
+import argparse
+import copy
+import os
+import time
+from ifdo_import import synthetic_ifdo
+from ifdo_api.utils import ifdo
+
+
+def run(ifdo_data: dict, workers: int, max_errors: int) -> float:
+    """Time the validation of the iFDO with a number of workers.
+
+    Args:
+        ifdo_data (dict): The iFDO data.
+        workers (int): Number of worker processes, 1 to validate in this process.
+        max_errors (int): Number of errors after which the validation stops.
+
+    Returns:
+        float: The elapsed time, in seconds.
+    """
+    ifdo.close_validation_pool()
+    ifdo.IFDO_VALIDATION_WORKERS = workers
+    warm_up = copy.deepcopy(ifdo_data)
+    warm_up["image-set-items"] = dict(list(warm_up["image-set-items"].items())[: ifdo.IFDO_VALIDATION_CHUNK_SIZE * workers])
+    ifdo.validate_ifdo(warm_up, max_errors=max_errors)
+    start = time.perf_counter()
+    ifdo.validate_ifdo(ifdo_data, max_errors=max_errors)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000, help="Number of images in the synthetic iFDO.")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Numbers of workers to compare.")
+    parser.add_argument("--max-errors", type=int, default=ifdo.IFDO_MAX_ERRORS, help="Number of errors after which the validation stops.")
+    args = parser.parse_args()
+
+    ifdo_data = synthetic_ifdo(args.items)
+    baseline = None
+    for workers in args.workers:
+        elapsed = run(ifdo_data, workers, args.max_errors)
+        baseline = baseline or elapsed * workers  # time of one worker, taking the first run as linear
+        speedup = baseline / elapsed
+        print(
+            f"{workers:>3} workers: {args.items} items in {elapsed:.2f}s ({args.items / elapsed:,.0f} items/s),"
+            f" speedup {speedup:.2f}x, efficiency {speedup / workers:.0%}"
+        )
+    ifdo.close_validation_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Micro-benchmark of the parsing of iFDO items into rows of the `images` table.
+
+Compares `CRUDImageSet.parse_ifdo_image`, driven by the plan compiled from `ifdo_mapping`, with the previous
+parser walking the whole mapping for every item and converting the result with a second pass, and checks that
+both build the same rows. The named fields are served from a pre-filled `GetOrCreateCache`, so no database is
+needed and only the parsing is timed.
+
+    python benchmarks/parse_ifdo.py --items 100000
+"""
+
+import argparse
+import asyncio
+import copy
+import time
+from uuid import uuid4
+from ifdo_import import synthetic_ifdo
+from ifdo_api.crud.base import GetOrCreateCache
+from ifdo_api.crud.image_set import image_columns
+from ifdo_api.crud.image_set import image_set_crud
+from ifdo_api.models.base import utcnow
+from ifdo_api.schemas.ifdo import ifdo_mapping
+
+# Enumerated fields set on top of the synthetic items, in the mixed case the enums accept
+ENUM_FIELDS = {"image-quality": "Processed", "image-deployment": "SURVEY", "image-navigation": "beacon", "image-marine-zone": "Seafloor"}
+
+
+async def parse_legacy(section: dict, cache: GetOrCreateCache, image_set_id: str, timestamp: object) -> dict:  # noqa: C901, PLR0912
+    """Parse an item the way `parse_ifdo` did before the plan: every mapping entry is checked for every item.
+
+    Args:
+        section (dict): The item.
+        cache (GetOrCreateCache): Cache serving the named fields.
+        image_set_id (str): The ID of the image_set.
+        timestamp (object): The value of `created_at` and `updated_at`.
+
+    Returns:
+        dict: The row of the `images` table.
+    """
+    model_dict = {}
+    for key, value in ifdo_mapping.items():
+        if key in section:
+            location = value.get("location")
+            crud = value.get("crud")
+            if location is None or location == "items":
+                new_value = section[key]
+                if crud:
+                    if value.get("list"):
+                        model_dict[value["field_name"]] = [
+                            await image_set_crud.get_or_create(None, crud, value.get("unique"), item, cache=cache) for item in new_value
+                        ]
+                    else:
+                        model_dict[value["field_name"]] = await image_set_crud.get_or_create(None, crud, value.get("unique"), new_value, cache=cache)
+                else:
+                    if value.get("normalize"):
+                        new_value = value["normalize"](new_value).value
+                    if value.get("parse"):
+                        new_value = value["parse"](new_value)
+                    model_dict[value["field_name"]] = new_value
+    if "id" not in model_dict:
+        model_dict["id"] = uuid4().hex
+    row = dict.fromkeys(image_columns)
+    for key, value in model_dict.items():
+        if key in row:
+            row[key] = value
+        elif f"{key}_id" in row and value is not None:
+            row[f"{key}_id"] = value.id
+    row.update(image_set_id=image_set_id, created_at=timestamp, updated_at=timestamp, geom_longitude=row["longitude"], geom_latitude=row["latitude"])
+    return row
+
+
+def fill_cache(items: dict) -> GetOrCreateCache:
+    """Cache an unsaved object for each named field of the items, as `prefetch` would.
+
+    Args:
+        items (dict): The entries of `image-set-items`.
+
+    Returns:
+        GetOrCreateCache: The cache.
+    """
+    cache = GetOrCreateCache()
+    for item in items.values():
+        for key, value in ifdo_mapping.items():
+            if value.get("unique") and key in item:
+                for data in item[key] if value.get("list") else [item[key]]:
+                    if cache.get(value["crud"].model, data[value["unique"]]) is None:
+                        cache.add(value["crud"].model, data[value["unique"]], value["crud"].model(id=uuid4(), **data))
+    return cache
+
+
+async def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000, help="Number of images in the synthetic iFDO.")
+    args = parser.parse_args()
+
+    items = synthetic_ifdo(args.items)["image-set-items"]
+    for name, item in items.items():
+        item.update(ENUM_FIELDS, **{"image-set-name": name, "image-uuid": uuid4().hex})
+    cache = fill_cache(items)
+    image_set_id = uuid4().hex
+    template = dict.fromkeys(image_columns)
+    template["created_at"] = template["updated_at"] = utcnow()
+    template["image_set_id"] = image_set_id
+
+    legacy_items = copy.deepcopy(items)
+    start = time.perf_counter()
+    legacy = [await parse_legacy(item, cache, image_set_id, template["created_at"]) for item in legacy_items.values()]
+    elapsed = time.perf_counter() - start
+    print(f"legacy: {args.items} items in {elapsed:.2f}s ({args.items / elapsed:,.0f} items/s)")
+
+    start = time.perf_counter()
+    planned = [(await image_set_crud.parse_ifdo_image(db=None, section=item, template=template, cache=cache))[0] for item in items.values()]
+    elapsed = time.perf_counter() - start
+    print(f"  plan: {args.items} items in {elapsed:.2f}s ({args.items / elapsed:,.0f} items/s)")
+
+    if legacy != planned:
+        msg = "The planned parser builds different rows"
+        raise SystemExit(msg)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
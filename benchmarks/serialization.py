@@ -0,0 +1,130 @@
+"""Micro-benchmark of the JSON layer: rendering responses, dumping created objects and parsing iFDO bodies.
+
+Times, on synthetic images, the ways a page of `ImageSchema` is rendered (`jsonable_encoder` and the standard
+`json` module, the values dumped by pydantic rendered by `JSONResponse` and by `ORJSONResponse`, and
+`dump_json` as the response cache does), the conversion of a created object before the model is built
+(`jsonable_encoder` against `dump_exclude_none_and_empty`), and the parsing of an iFDO body by `json` and
+`orjson`. Every way is checked to give the same values, and no database is needed.
+
+    python benchmarks/serialization.py --items 10000
+"""
+
+import argparse
+import datetime
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+from uuid import uuid4
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from ifdo_import import synthetic_ifdo
+from pydantic import BaseModel
+from pydantic import TypeAdapter
+from ifdo_api.crud.base import dump_exclude_none_and_empty
+from ifdo_api.schemas.image import ImageSchema
+
+
+def jsonable_encoder_exclude_none_and_empty(obj: BaseModel) -> dict[str, Any]:
+    """Convert a created object the way `CRUDBase.create` did before, through `jsonable_encoder`.
+
+    Args:
+        obj (BaseModel): The validated object.
+
+    Returns:
+        dict[str, Any]: The data of the model.
+    """
+    data = jsonable_encoder(obj, exclude_none=True)
+    for key in data:
+        value = getattr(obj, key, None)
+        if isinstance(value, datetime.datetime):
+            data[key] = value.astimezone(datetime.timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    return {k: v for k, v in data.items() if v != []}
+
+
+def synthetic_images(items: int) -> list[ImageSchema]:
+    """Build validated images with the fields of a typical import.
+
+    Args:
+        items (int): Number of images.
+
+    Returns:
+        list[ImageSchema]: The images.
+    """
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    return [
+        ImageSchema(
+            id=uuid4(),
+            image_set_id=uuid4(),
+            name=f"image-{index:07d}.jpg",
+            handle=f"https://example.org/images/{index}",
+            date_time=start + datetime.timedelta(seconds=index),
+            latitude=-50 + (index % 1000) / 100,
+            longitude=-20 + (index // 1000) / 100,
+            altitude_meters=-4000.0,
+            acquisition="photo",
+            mpeg7_color_layout=[float(value) for value in range(12)],
+            context={"name": "benchmark context"},
+            creators=[{"name": "benchmark creator", "uri": "https://example.org/creator"}],
+        )
+        for index in range(items)
+    ]
+
+
+def timed(name: str, func: Callable[[], Any], items: int) -> Any:  # noqa: ANN401
+    """Run a function once and print its throughput.
+
+    Args:
+        name (str): The name of the way.
+        func (Callable[[], Any]): The function.
+        items (int): Number of items it handles.
+
+    Returns:
+        Any: The result of the function.
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>26}: {items} items in {elapsed:.3f}s ({items / elapsed:,.0f} items/s)")
+    return result
+
+
+def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000, help="Number of synthetic images.")
+    args = parser.parse_args()
+
+    images = synthetic_images(args.items)
+    adapter = TypeAdapter(list[ImageSchema])
+
+    print("Rendering a response")
+    bodies = [
+        timed("jsonable_encoder + json", lambda: json.dumps(jsonable_encoder(images, exclude_none=True)).encode(), args.items),
+        timed("dump_python + JSONResponse", lambda: JSONResponse(adapter.dump_python(images, mode="json", exclude_none=True)).body, args.items),
+        timed("dump_python + ORJSONResponse", lambda: ORJSONResponse(adapter.dump_python(images, mode="json", exclude_none=True)).body, args.items),
+        timed("dump_json", lambda: adapter.dump_json(images, exclude_none=True), args.items),
+    ]
+    if any(orjson.loads(body) != orjson.loads(bodies[0]) for body in bodies):
+        msg = "The responses hold different values"
+        raise SystemExit(msg)
+
+    print("Dumping created objects")
+    legacy = timed("jsonable_encoder", lambda: [jsonable_encoder_exclude_none_and_empty(image) for image in images], args.items)
+    dumped = timed("dump_exclude_none_and_empty", lambda: [dump_exclude_none_and_empty(image) for image in images], args.items)
+    if legacy != dumped:
+        msg = "The created objects are dumped to different values"
+        raise SystemExit(msg)
+
+    print("Parsing an iFDO body")
+    body = json.dumps(synthetic_ifdo(args.items))
+    parsed = [timed("json.loads", lambda: json.loads(body), args.items), timed("orjson.loads", lambda: orjson.loads(body), args.items)]
+    if parsed[0] != parsed[1]:
+        msg = "The iFDO is parsed to different values"
+        raise SystemExit(msg)
+
+
+if __name__ == "__main__":
+    main()
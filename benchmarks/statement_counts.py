@@ -0,0 +1,148 @@
+"""Count the SQL statements of every read endpoint and fail on N+1 query patterns.
+
+Index endpoints are requested with `limit=1` and with `--limit`, and show endpoints for two different
+objects: with the relationships of the response loaded by the loader profile of its schema, the number of
+statements does not depend on the number of objects, so any difference is reported as an N+1 and the script
+exits with status 1. Run it against a database holding a few image_sets, e.g. loaded with ifdo_import.py.
+
+    python benchmarks/statement_counts.py --limit 50
+"""
+
+import argparse
+import asyncio
+import sys
+from types import TracebackType
+from typing import Any
+import httpx
+from sqlalchemy import event
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from ifdo_api.api.app import app
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.db.db import async_engine
+from ifdo_api.models.base import Base
+
+# Query strings requested on top of the plain index and show routes
+VARIANTS = {
+    "/v1/image_sets/": ["include_images=true"],
+    "/v1/image_sets/{item_id}": ["include_images=true"],
+    "/v1/images/{item_id}": ["replace_image_set=true"],
+}
+
+
+class StatementCounter:
+    """Context manager recording the statements run on an engine while it is active.
+
+    Example:
+        with StatementCounter() as counter:
+            await client.get("/v1/images/?limit=100")
+        assert counter.count == 3
+    """
+
+    def __init__(self, engine: AsyncEngine | Engine = async_engine):
+        self.engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        """Number of statements recorded."""
+        return len(self.statements)
+
+    def record(self, _connection: Any, _cursor: Any, statement: str, *_args: Any) -> None:  # noqa: ANN401
+        """Record a statement, as a `before_cursor_execute` listener.
+
+        Args:
+            statement (str): The SQL statement.
+        """
+        self.statements.append(statement)
+
+    def __enter__(self) -> "StatementCounter":
+        self.statements.clear()
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None) -> None:
+        event.remove(self.engine, "before_cursor_execute", self.record)
+
+
+async def count(client: httpx.AsyncClient, path: str) -> int | None:
+    """Request a path and count the statements it runs.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the application.
+        path (str): Path and query string to request.
+
+    Returns:
+        int | None: The number of statements, or None if the request failed.
+    """
+    with StatementCounter() as counter:
+        response = await client.get(path, headers={"Cache-Control": "no-store"})
+    return counter.count if response.is_success else None
+
+
+async def sample_ids(table: str) -> list:
+    """Return the IDs of the oldest and the newest rows of a table.
+
+    Args:
+        table (str): Name of the table.
+
+    Returns:
+        list: Up to two IDs.
+    """
+    columns = Base.metadata.tables[table].c
+    async with AsyncSessionLocal() as db:
+        first = (await db.execute(select(columns.id).order_by(columns.created_at).limit(1))).scalar_one_or_none()
+        last = (await db.execute(select(columns.id).order_by(columns.created_at.desc()).limit(1))).scalar_one_or_none()
+    return [value for value in dict.fromkeys((first, last)) if value is not None]
+
+
+async def check(client: httpx.AsyncClient, path: str, limit: int) -> bool:
+    """Compare the statements of an endpoint between a small and a large result.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the application.
+        path (str): Path of the endpoint, as in the OpenAPI schema.
+        limit (int): Page size of the large index request.
+
+    Returns:
+        bool: False if the number of statements grows with the result.
+    """
+    ok = True
+    for variant in ["", *VARIANTS.get(path, [])]:
+        if path.endswith("{item_id}"):
+            table = path.rstrip("/").split("/")[-2]
+            if table not in Base.metadata.tables:
+                continue
+            ids = await sample_ids(table)
+            requests = [f"{path.replace('{item_id}', str(id_pk))}?{variant}" for id_pk in ids]
+        else:
+            requests = [f"{path}?limit=1&{variant}", f"{path}?limit={limit}&{variant}"]
+        counts = [await count(client, request) for request in requests]
+        if len(counts) < 2 or None in counts:  # noqa: PLR2004
+            print(f"{'skipped':>8}  {path}?{variant}")
+            continue
+        status = "ok" if counts[0] == counts[1] else "N+1"
+        ok = ok and status == "ok"
+        print(f"{status:>8}  {path}?{variant}: {counts[0]} -> {counts[1]} statements")
+    return ok
+
+
+async def main() -> None:
+    """Parse the command line and check every read endpoint."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=50, help="Page size of the large index requests.")
+    args = parser.parse_args()
+
+    paths = [path for path, operations in app.openapi()["paths"].items() if path.startswith("/v1/") and "get" in operations]
+    ok = True
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for path in paths:
+            if path.endswith(("/", "{item_id}")):
+                ok = await check(client, path, args.limit) and ok
+    await async_engine.dispose()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Benchmark the loading of a YAML iFDO with the pure Python loader of PyYAML and with the libyaml one.
+
+Writes a synthetic iFDO to a temporary YAML file, then times loading it as a whole (`yaml.safe_load` against
+`load_yaml`) and yielding its items one at a time (`iter_yaml_items` on the pure Python loader against
+`IfdoLoader`), and checks that every way builds the same items.
+
+    python benchmarks/yaml_ifdo.py --items 100000
+"""
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+import yaml
+from ifdo_import import synthetic_ifdo
+from ifdo_api.utils import ifdo_stream
+from ifdo_api.utils.ifdo_export import IfdoDumper
+from ifdo_api.utils.ifdo_stream import IFDO_ITEMS
+from ifdo_api.utils.ifdo_stream import iter_yaml_items
+from ifdo_api.utils.ifdo_stream import load_yaml
+
+
+class PureLoader(yaml.SafeLoader):
+    """The pure Python safe loader, composing nodes one at a time as `IfdoLoader` does."""
+
+
+def load_items(path: Path) -> dict:
+    """Load the items of the iFDO with the pure Python loader, all at once.
+
+    Args:
+        path (Path): The YAML file.
+
+    Returns:
+        dict: The items.
+    """
+    with path.open("rb") as stream:
+        return yaml.safe_load(stream)[IFDO_ITEMS]
+
+
+def load_items_c(path: Path) -> dict:
+    """Load the items of the iFDO with `load_yaml`, all at once.
+
+    Args:
+        path (Path): The YAML file.
+
+    Returns:
+        dict: The items.
+    """
+    with path.open("rb") as stream:
+        return load_yaml(stream)[IFDO_ITEMS]
+
+
+def stream_items(path: Path) -> dict:
+    """Yield the items of the iFDO one at a time with `iter_yaml_items`, on the loader it is configured with.
+
+    Args:
+        path (Path): The YAML file.
+
+    Returns:
+        dict: The items.
+    """
+    with path.open("rb") as stream:
+        return dict(iter_yaml_items(stream))
+
+
+def stream_items_pure(path: Path) -> dict:
+    """Yield the items of the iFDO one at a time with `iter_yaml_items`, on the pure Python loader.
+
+    Args:
+        path (Path): The YAML file.
+
+    Returns:
+        dict: The items.
+    """
+    loader = ifdo_stream.IfdoLoader
+    ifdo_stream.IfdoLoader = PureLoader
+    try:
+        return stream_items(path)
+    finally:
+        ifdo_stream.IfdoLoader = loader
+
+
+def run(name: str, load: Callable[[Path], dict], path: Path, items: int) -> dict:
+    """Time one way of loading the items and print its throughput.
+
+    Args:
+        name (str): The name of the way.
+        load (Callable[[Path], dict]): The function loading the items.
+        path (Path): The YAML file.
+        items (int): Number of items in the file.
+
+    Returns:
+        dict: The loaded items.
+    """
+    start = time.perf_counter()
+    loaded = load(path)
+    elapsed = time.perf_counter() - start
+    megabytes = path.stat().st_size / 1024 / 1024
+    print(f"{name:>13}: {items} items in {elapsed:.2f}s ({items / elapsed:,.0f} items/s, {megabytes / elapsed:.1f} MB/s)")
+    return loaded
+
+
+def main() -> None:
+    """Parse the command line and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000, help="Number of images in the synthetic iFDO.")
+    args = parser.parse_args()
+
+    if ifdo_stream.IfdoLoader.__mro__[1] is yaml.SafeLoader:
+        print("PyYAML is built without libyaml: IfdoLoader is the pure Python loader")
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "ifdo.yaml"
+        path.write_text(yaml.dump(synthetic_ifdo(args.items), Dumper=IfdoDumper, sort_keys=False), encoding="utf-8")
+        print(f"{path.stat().st_size / 1024 / 1024:.1f} MB of YAML")
+
+        expected = run("safe_load", load_items, path, args.items)
+        results = [
+            run("load_yaml", load_items_c, path, args.items),
+            run("stream (pure)", stream_items_pure, path, args.items),
+            run("stream", stream_items, path, args.items),
+        ]
+
+    if any(result != expected for result in results):
+        msg = "The loaders build different items"
+        raise SystemExit(msg)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from pydantic import BaseModel
@@ -16,11 +16,13 @@ from tipg.database import close_db_connection
 from tipg.database import connect_to_db
 from tipg.errors import DEFAULT_STATUS_CODES
 from tipg.errors import add_exception_handlers
+from tipg.settings import DatabaseSettings
 from tipg.settings import PostgresSettings
 from ifdo_api.api.exceptions import AppException
 from ifdo_api.api.v1 import catalog
 from ifdo_api.api.v1 import image
 from ifdo_api.api.v1 import image_set
+from ifdo_api.api.v1 import import_job
 from ifdo_api.api.v1.annotation import annotation
 from ifdo_api.api.v1.annotation import annotation_label
 from ifdo_api.api.v1.annotation import annotation_set
@@ -41,7 +43,10 @@ from ifdo_api.api.v1.fields import platform
 from ifdo_api.api.v1.fields import project
 from ifdo_api.api.v1.fields import related_material
 from ifdo_api.api.v1.fields import sensor
+from ifdo_api.crud.import_job import import_queue
+from ifdo_api.db.db import async_engine
 from ifdo_api.db.db import get_db_url
+from ifdo_api.utils.ifdo import close_validation_pool
 
 
 class HealthResponse(BaseModel):
@@ -52,7 +57,7 @@ class HealthResponse(BaseModel):
 
 @asynccontextmanager
 async def lifespan(application: FastAPI) -> asynccontextmanager:
-    """Lifespan event handler to initialize Redis cache.
+    """Lifespan event handler to initialize Redis cache and the import workers.
 
     Args:
         application (FastAPI): The FastAPI application instance.
@@ -65,18 +70,31 @@ async def lifespan(application: FastAPI) -> asynccontextmanager:
         settings=PostgresSettings(database_url=get_db_url(psycopg=False)),
         schemas=["public"],
     )
-    await register_collection_catalog(app)
+    # The geometries of the annotations are in pixels, not in a spatial reference system
+    await register_collection_catalog(app, db_settings=DatabaseSettings(exclude_tables=["public.annotations"]))
 
     redis_host = os.getenv("REDIS_HOST", "localhost")
     redis_port = os.getenv("REDIS_PORT", "6379")
     redis = Redis.from_url(f"redis://{redis_host}:{redis_port}")
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache", enable=os.getenv("CACHE_ENABLED", "true").lower() == "true")
+    import_queue.start()
     yield
+    await import_queue.stop()
+    close_validation_pool()
     await redis.close()
     await close_db_connection(application)
+    await async_engine.dispose()
 
 
-app = FastAPI(lifespan=lifespan, title="Paidiver ST3 PG API", version="0.1.0", openapi_url="/openapi.json", docs_url="/docs")
+# Responses are rendered by orjson, from the values pydantic dumps them to
+app = FastAPI(
+    lifespan=lifespan,
+    title="Paidiver ST3 PG API",
+    version="0.1.0",
+    openapi_url="/openapi.json",
+    docs_url="/docs",
+    default_response_class=ORJSONResponse,
+)
 
 
 origins = ["*"]
@@ -84,14 +102,14 @@ origins = ["*"]
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
-    allow_methods=["GET", "POST", "HEAD", "OPTIONS", "PUT", "DELETE"],
+    allow_methods=["GET", "POST", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"],
     allow_headers=["Access-Control-Allow-Headers", "Content-Type", "Authorization", "Access-Control-Allow-Origin"],
     allow_credentials=True,
 )
 
 
 @app.exception_handler(AppException)
-async def app_exception_handler(request: Request, exc: AppException) -> JSONResponse:
+async def app_exception_handler(request: Request, exc: AppException) -> ORJSONResponse:
     """Handle application exceptions.
 
     Args:
@@ -99,9 +117,9 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
         exc (AppException): The application exception to handle.
 
     Returns:
-        JSONResponse: A JSON response with the error details.
+        ORJSONResponse: A JSON response with the error details.
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail, "type": exc.__class__.__name__, "path": str(request.url)},
     )
@@ -124,6 +142,7 @@ def main() -> RedirectResponse:
 app.include_router(catalog.router, prefix="/v1/catalogs", tags=["Catalog"])
 app.include_router(image.router, prefix="/v1/images", tags=["Image"])
 app.include_router(image_set.router, prefix="/v1/image_sets", tags=["ImageSet"])
+app.include_router(import_job.router, prefix="/v1/import_jobs", tags=["ImportJob"])
 
 app.include_router(context.router, prefix="/v1/fields/contexts", tags=["Fields"])
 app.include_router(project.router, prefix="/v1/fields/projects", tags=["Fields"])
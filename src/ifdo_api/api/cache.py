@@ -0,0 +1,196 @@
+"""Response cache of the read endpoints, invalidated by tags (see `ifdo_api.crud.cache`)."""
+
+import hashlib
+import inspect
+import types
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from functools import cache
+from functools import wraps
+from typing import Any
+from typing import Union
+from typing import get_args
+from typing import get_origin
+from fastapi import Request
+from fastapi import Response
+from fastapi_cache import FastAPICache
+from pydantic import BaseModel
+from pydantic import TypeAdapter
+from sqlalchemy import inspect as inspect_model
+from sqlalchemy.ext.associationproxy import AssociationProxy
+from sqlalchemy.orm import ONETOMANY
+from ifdo_api.api.streaming import JSON_MEDIA_TYPE
+from ifdo_api.api.streaming import wants_ndjson
+from ifdo_api.crud.base import schema_of
+from ifdo_api.crud.cache import CACHE_NAMESPACE
+from ifdo_api.crud.cache import cache_backend
+from ifdo_api.crud.cache import cache_ttl
+from ifdo_api.crud.cache import list_tag
+from ifdo_api.crud.cache import lookup
+from ifdo_api.crud.cache import ref_tag
+from ifdo_api.crud.cache import register
+from ifdo_api.crud.cache import row_tag
+from ifdo_api.crud.cache import table_tag
+from ifdo_api.models.base import Base
+from ifdo_api.schemas.pagination import PageSchema
+
+
+def cached(
+    model: type[Base],
+    response_model: Any,  # noqa: ANN401
+    exclude_none: bool = False,
+    related: Sequence[type[Base]] = (),
+    parent: type[Base] | None = None,
+) -> Callable:
+    """Cache the JSON responses of a read endpoint of the model.
+
+    Responses are keyed on the path, the query and the response model of the route, kept for the TTL of the
+    table, and tagged with the rows and tables they hold so that the writes of the CRUD objects invalidate them.
+    Streamed responses and requests with `Cache-Control: no-store` bypass the cache, and `Cache-Control: no-cache`
+    refreshes the entry.
+
+    Args:
+        model (type[Base]): The model served by the endpoint.
+        response_model (Any): The response model of the route, used to serialize the cached body.
+        exclude_none (bool): Whether the route omits the fields set to None.
+        related (Sequence[type[Base]]): Other models whose rows are merged into the response.
+        parent (type[Base] | None): Model of the `item_id` path parameter whose children the route lists (e.g. the annotations
+            of an image), the response being tagged with that row, which the writes of the children invalidate.
+
+    Returns:
+        Callable: The decorator.
+    """
+    table = model.__tablename__
+    adapter = TypeAdapter(response_model)
+    tags = response_tags(model, response_model) | {ref_tag(item.__tablename__) for item in related}
+    variant = repr(response_model)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+        request_name = next((name for name, param in signature.parameters.items() if param.annotation is Request), None)
+        injected = request_name is None
+        if injected:
+            request_name = "cache_request"
+            parameter = inspect.Parameter(request_name, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            signature = signature.replace(parameters=[*signature.parameters.values(), parameter])
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            request: Request = kwargs.pop(request_name) if injected else kwargs[request_name]
+            cache_control = request.headers.get("cache-control")
+            if cache_backend() is None or cache_control == "no-store" or wants_ndjson(request):
+                return await func(*args, **kwargs)
+            key = cache_key(request, table, variant)
+            if cache_control != "no-cache":
+                body = await lookup(key)
+                if body is not None:
+                    return Response(body, media_type=JSON_MEDIA_TYPE, headers={FastAPICache.get_cache_status_header(): "HIT"})
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            body = adapter.dump_json(adapter.validate_python(result, from_attributes=True), exclude_none=exclude_none)
+            parent_tags = {row_tag(parent.__tablename__, request.path_params["item_id"])} if parent is not None else set()
+            await register(key, body, tags | parent_tags | result_tags(table, result), cache_ttl(table))
+            return Response(body, media_type=JSON_MEDIA_TYPE, headers={FastAPICache.get_cache_status_header(): "MISS"})
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
+
+
+def cache_key(request: Request, table: str, variant: str) -> str:
+    """Build the cache key of a request.
+
+    Args:
+        request (Request): The incoming request.
+        table (str): Name of the table served by the route.
+        variant (str): The response model of the route.
+
+    Returns:
+        str: The cache key.
+    """
+    digest = hashlib.sha256()
+    for part in (request.url.path, variant, *(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"{FastAPICache.get_prefix()}:{CACHE_NAMESPACE}:{table}:{digest.hexdigest()}"
+
+
+def result_tags(table: str, result: Any) -> set[str]:  # noqa: ANN401
+    """Return the tags of the rows of the table held by a response.
+
+    Args:
+        table (str): Name of the table served by the route.
+        result (Any): The value returned by the endpoint, an object, a list or a page of objects.
+
+    Returns:
+        set[str]: The tags.
+    """
+    tags = {table_tag(table)}
+    if isinstance(result, dict) and "items" in result:
+        tags.add(list_tag(table))
+        items = result["items"]
+    elif isinstance(result, list):
+        items = result
+    else:
+        items = [result]
+    for item in items:
+        id_pk = item.get("id") if isinstance(item, Mapping) else getattr(item, "id", None)
+        if id_pk is not None:
+            tags.add(row_tag(table, id_pk))
+    return tags
+
+
+def response_tags(model: type[Base], response_model: Any) -> set[str]:  # noqa: ANN401
+    """Return the tags of the tables embedded in the responses of a route.
+
+    Args:
+        model (type[Base]): The model served by the route.
+        response_model (Any): The response model of the route, possibly a union or a page of schemas.
+
+    Returns:
+        set[str]: The tags.
+    """
+    if get_origin(response_model) in (Union, types.UnionType):
+        return set().union(*(response_tags(model, argument) for argument in get_args(response_model)))
+    if isinstance(response_model, type) and issubclass(response_model, PageSchema):
+        return response_tags(model, schema_of(response_model.model_fields["items"].annotation))
+    if isinstance(response_model, type) and issubclass(response_model, BaseModel):
+        return set(schema_tags(model, response_model))
+    return set()
+
+
+@cache
+def schema_tags(model: type[Base], schema: type[BaseModel] | None) -> frozenset[str]:
+    """Return the tags of the tables whose rows the schema embeds, following the relationships it serializes.
+
+    Tables reached through a one-to-many relationship are left out, as their writes invalidate the row of the parent.
+
+    Args:
+        model (type[Base]): The model serialized by the schema.
+        schema (type[BaseModel] | None): The schema.
+
+    Returns:
+        frozenset[str]: The tags.
+    """
+    if schema is None:
+        return frozenset()
+    mapper = inspect_model(model)
+    tags = set()
+    for name, field in schema.model_fields.items():
+        nested_schema = schema_of(field.annotation)
+        if name in mapper.relationships:
+            relationship = mapper.relationships[name]
+            related = relationship.mapper.class_
+            if relationship.direction is not ONETOMANY:
+                tags.add(ref_tag(related.__tablename__))
+            tags |= schema_tags(related, nested_schema)
+        elif isinstance(mapper.all_orm_descriptors.get(name), AssociationProxy):
+            proxy = getattr(model, name)
+            related = inspect_model(proxy.target_class).relationships[proxy.value_attr].mapper.class_
+            tags |= {ref_tag(proxy.target_class.__tablename__), ref_tag(related.__tablename__)}
+            tags |= schema_tags(related, nested_schema)
+    return frozenset(tags)
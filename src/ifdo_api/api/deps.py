@@ -1,19 +1,91 @@
 #!/usr/bin/env python3
 """This file contains the dependencies for the FastAPI application."""
 
-from collections.abc import Generator
-from ifdo_api.db.db import SessionLocal
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+from typing import Annotated
+from fastapi import Query
+from fastapi import Request
+from ifdo_api.crud.filters import FILTER_SEPARATOR
+from ifdo_api.crud.filters import Filter
+from ifdo_api.crud.filters import FilterOperator
+from ifdo_api.crud.filters import parse_filters
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.models.base import Base
 
 
-def get_db() -> Generator:
-    """Get a database session.
+async def get_db() -> AsyncGenerator:
+    """Get an asyncio database session.
 
     Yields:
-        Generator: db session
+        AsyncGenerator: db session
     """
-    db = SessionLocal()
-    db.current_user_id = None
-    try:
+    async with AsyncSessionLocal() as db:
+        db.current_user_id = None
         yield db
-    finally:
-        db.close()
+
+
+def get_filters(
+    model: type[Base], reserved: tuple[str, ...] = ("cursor", "limit", "stream"), spatial_field: str | None = None
+) -> Callable[..., list[Filter]]:
+    """Build a dependency parsing the query parameters of an index route into filters on the model.
+
+    With a `spatial_field`, the route also takes the `bbox`, `within-distance` and `intersects-polygon`
+    parameters, applied to that geometry column.
+
+    Args:
+        model (type[Base]): The model listed by the route.
+        reserved (tuple[str, ...]): Query parameters of the route that are not filters.
+        spatial_field (str | None): Geometry column of the model the spatial parameters apply to.
+
+    Returns:
+        Callable[..., list[Filter]]: The dependency.
+    """
+
+    def filters(request: Request) -> list[Filter]:
+        """Filters given as `<field>=<value>` or `<field>__<operator>=<value>`.
+
+        Operators are eq, in (a,b,c), range (min,max, either may be empty), prefix, null (true/false) and, on
+        geometry columns, bbox (min_lon,min_lat,max_lon,max_lat), dwithin (lon,lat,meters) and intersects (WKT polygon).
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            list[Filter]: The filters.
+        """
+        return parse_filters(model, request.query_params.multi_items(), reserved=reserved)
+
+    if spatial_field is None:
+        return filters
+
+    spatial_params = {"bbox": FilterOperator.bbox, "within-distance": FilterOperator.dwithin, "intersects-polygon": FilterOperator.intersects}
+
+    def spatial_filters(
+        request: Request,
+        bbox: Annotated[str | None, Query(description="Envelope `min_lon,min_lat,max_lon,max_lat` the geometry must intersect.")] = None,
+        within_distance: Annotated[
+            str | None, Query(alias="within-distance", description="Circle `lon,lat,meters` the geometry must be within.")
+        ] = None,
+        intersects_polygon: Annotated[
+            str | None, Query(alias="intersects-polygon", description="WKT polygon in WGS84 the geometry must intersect.")
+        ] = None,
+    ) -> list[Filter]:
+        """Filters on the columns of the model, and on its geometry with the spatial parameters.
+
+        Args:
+            request (Request): The incoming request.
+            bbox (str | None): Envelope the geometry must intersect.
+            within_distance (str | None): Circle the geometry must be within.
+            intersects_polygon (str | None): Polygon the geometry must intersect.
+
+        Returns:
+            list[Filter]: The filters.
+        """
+        params = [(name, value) for name, value in request.query_params.multi_items() if name not in spatial_params]
+        for name, value in zip(spatial_params, (bbox, within_distance, intersects_polygon), strict=True):
+            if value is not None:
+                params.append((f"{spatial_field}{FILTER_SEPARATOR}{spatial_params[name].value}", value))
+        return parse_filters(model, params, reserved=reserved)
+
+    return spatial_filters
@@ -21,3 +21,11 @@ class ValueErrorException(AppException):
 
     def __init__(self, detail: str):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class IfdoValidationException(ValueErrorException):
+    """Exception raised when iFDO metadata does not match the schema of its version."""
+
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        super().__init__(detail="Validation errors in the iFDO metadata file:\n" + "\n".join(errors))
@@ -1,15 +1,37 @@
+from collections.abc import Awaitable
+from collections.abc import Callable
 from typing import Annotated
+from typing import Any
 from typing import Generic
 from typing import TypeVar
 from uuid import UUID
 from fastapi import APIRouter
+from fastapi import Body
 from fastapi import Depends
+from fastapi import Query
+from fastapi import Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.api.cache import cached
 from ifdo_api.api.deps import get_db
+from ifdo_api.api.deps import get_filters
 from ifdo_api.api.exceptions import NotFoundException
+from ifdo_api.api.streaming import STREAM_RESPONSES
+from ifdo_api.api.streaming import stream_response
+from ifdo_api.api.streaming import wants_stream
+from ifdo_api.crud.base import BULK_MAX_ROWS
+from ifdo_api.crud.base import DEFAULT_PAGE_SIZE
+from ifdo_api.crud.base import MAX_PAGE_SIZE
+from ifdo_api.crud.base import convert_pydantic_types
+from ifdo_api.crud.base import dump_exclude_none_and_empty
 from ifdo_api.crud.fields import creator_crud
+from ifdo_api.crud.filters import Filter
+from ifdo_api.schemas.bulk import BulkResultSchema
+from ifdo_api.schemas.bulk import partial_schema
 from ifdo_api.schemas.fields import CreatorSchema
+from ifdo_api.schemas.pagination import PageSchema
 
 T = TypeVar("T")
 
@@ -20,6 +42,48 @@ class DeleteSchema(BaseModel):
     message: str
 
 
+def bulk_response(results: list[dict]) -> dict:
+    """Build the response of a bulk write from the outcome of its rows.
+
+    Args:
+        results (list[dict]): The outcome of each row, in order.
+
+    Returns:
+        BulkResultSchema: The counts of rows written and not written, and the outcome of each row.
+    """
+    failed = sum(result.get("error") is not None for result in results)
+    return {"succeeded": len(results) - failed, "failed": failed, "results": results}
+
+
+async def bulk_validate_and_write(
+    rows: list[dict[str, Any]],
+    row_schema: type[BaseModel],
+    to_values: Callable[[BaseModel], dict[str, Any]],
+    write: Callable[[list[dict[str, Any]]], Awaitable[list[dict]]],
+) -> dict:
+    """Validate the rows of a bulk write one by one, write the valid ones, and report the outcome of each row.
+
+    Args:
+        rows (list[dict[str, Any]]): The rows of the request body.
+        row_schema (type[BaseModel]): Schema each row is validated with.
+        to_values (Callable[[BaseModel], dict[str, Any]]): Converts a validated row into the data of the object.
+        write (Callable[[list[dict[str, Any]]], Awaitable[list[dict]]]): The bulk method of the CRUD object.
+
+    Returns:
+        BulkResultSchema: The counts of rows written and not written, and the outcome of each row.
+    """
+    results = [{"index": index} for index in range(len(rows))]
+    valid = {}
+    for index, row in enumerate(rows):
+        try:
+            valid[index] = to_values(row_schema.model_validate(row))
+        except ValidationError as error:  # noqa: PERF203
+            results[index]["error"] = "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())
+    for index, result in zip(valid, await write(list(valid.values())), strict=True):
+        results[index] = {**result, "index": index}
+    return bulk_response(results)
+
+
 def generate_crud_router(  # noqa: C901
     model_crud: Generic[T],
     schema: type[BaseModel],
@@ -47,24 +111,44 @@ def generate_crud_router(  # noqa: C901
 
     if "index" in routes:
 
-        @router.get("/", response_model=list[schema])
-        async def index(db: Annotated[Session, Depends(get_db)]) -> list[BaseModel]:
-            """Get all items.
+        @router.get("/", response_model=PageSchema[schema], responses=STREAM_RESPONSES)
+        @cached(model, PageSchema[schema])
+        async def index(
+            request: Request,
+            db: Annotated[AsyncSession, Depends(get_db)],
+            filters: Annotated[list[Filter], Depends(get_filters(model, spatial_field=model_crud.spatial_field))],
+            cursor: str | None = None,
+            limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+            stream: bool = False,
+        ) -> dict | StreamingResponse:
+            """Get a page of items, or stream all of them.
+
+            Args:
+                request (Request): The incoming request.
+                db (AsyncSession): The database session.
+                filters (list[Filter]): Filters given as `<field>=<value>` or `<field>__<operator>=<value>`.
+                cursor (str | None): The `next` cursor of the previous page, None for the first page.
+                limit (int): The maximum number of items in the page.
+                stream (bool): Stream all the items as a JSON array, or as NDJSON with `Accept: application/x-ndjson`.
 
             Returns:
-                list[schema]: A list of items.
+                PageSchema[schema]: The items and the cursor of the next page.
             """
-            return model_crud.index(db=db)
+            if wants_stream(request, stream):
+                return stream_response(request, lambda session: model_crud.stream(db=session, filters=filters, schema=schema), schema)
+            items, next_cursor = await model_crud.page(db=db, filters=filters, cursor=cursor, limit=limit, schema=schema)
+            return {"items": items, "next": next_cursor}
 
     if "show" in routes:
 
         @router.get("/{item_id}", response_model=schema)
-        async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)]) -> list[BaseModel]:
+        @cached(model, schema)
+        async def show(item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> list[BaseModel]:
             """Get an item by its ID.
 
             Args:
                 item_id (UUID): The ID of the item to retrieve.
-                db (Session): The database session.
+                db (AsyncSession): The database session.
 
             Raises:
                 HTTPException: If the item is not found.
@@ -72,17 +156,17 @@ def generate_crud_router(  # noqa: C901
             Returns:
                 schema: The item with the specified ID.
             """
-            return model_crud.show(db=db, id_pk=item_id)
+            return await model_crud.show(db=db, id_pk=item_id, schema=schema)
 
     if "create" in routes:
 
         @router.post("/", response_model=schema)
-        async def create(obj_in: schema_create, db: Annotated[Session, Depends(get_db)]) -> list[BaseModel]:  # type: ignore[arg-type]
+        async def create(obj_in: schema_create, db: Annotated[AsyncSession, Depends(get_db)]) -> list[BaseModel]:  # type: ignore[arg-type]
             """Create a new item.
 
             Args:
                 obj_in (schema_create): The data for the new item.
-                db (Session): The database session.
+                db (AsyncSession): The database session.
 
             Raises:
                 HTTPException: If the creation fails.
@@ -90,21 +174,84 @@ def generate_crud_router(  # noqa: C901
             Returns:
                 schema: The created item.
             """
-            created_item = model_crud.create(db=db, obj_in=obj_in)
+            created_item = await model_crud.create(db=db, obj_in=obj_in, schema=schema)
             if not created_item:
                 raise NotFoundException(model.__name__)
 
             return created_item
 
+    # The bulk routes are declared before the `/{item_id}` ones, which would take `bulk` for an ID
+    if "create" in routes:
+
+        @router.post("/bulk", response_model=BulkResultSchema, response_model_exclude_none=True)
+        async def bulk_create(
+            rows: Annotated[list[dict[str, Any]], Body(max_length=BULK_MAX_ROWS)], db: Annotated[AsyncSession, Depends(get_db)]
+        ) -> dict:
+            """Create items by batches, each committed on its own.
+
+            Each row is validated with the schema of the items, its related objects given by their ID
+            (e.g. `context_id`). A row that fails does not prevent the others from being created.
+
+            Args:
+                rows (list[dict[str, Any]]): The data of the new items.
+                db (AsyncSession): The database session.
+
+            Returns:
+                BulkResultSchema: The ID of each item created, or why its row failed.
+            """
+            return await bulk_validate_and_write(
+                rows, schema_create, dump_exclude_none_and_empty, lambda values: model_crud.bulk_create(db=db, rows=values)
+            )
+
+    if "update" in routes:
+
+        @router.patch("/bulk", response_model=BulkResultSchema, response_model_exclude_none=True)
+        async def bulk_update(
+            rows: Annotated[list[dict[str, Any]], Body(max_length=BULK_MAX_ROWS)], db: Annotated[AsyncSession, Depends(get_db)]
+        ) -> dict:
+            """Update items by batches, each committed on its own.
+
+            Each row holds the `id` of an item and the fields to update, its related objects given by their ID.
+            A row that fails does not prevent the others from being updated.
+
+            Args:
+                rows (list[dict[str, Any]]): The IDs of the items and the fields to update.
+                db (AsyncSession): The database session.
+
+            Returns:
+                BulkResultSchema: The ID of each item updated, or why its row failed.
+            """
+            return await bulk_validate_and_write(
+                rows,
+                partial_schema(schema_create),
+                lambda row: convert_pydantic_types(row.model_dump(exclude_unset=True)),
+                lambda values: model_crud.bulk_update(db=db, rows=values),
+            )
+
+    if "delete" in routes:
+
+        @router.delete("/bulk", response_model=BulkResultSchema, response_model_exclude_none=True)
+        async def bulk_delete(ids: Annotated[list[UUID], Body(max_length=BULK_MAX_ROWS)], db: Annotated[AsyncSession, Depends(get_db)]) -> dict:
+            """Delete items by batches, each committed on its own.
+
+            Args:
+                ids (list[UUID]): The IDs of the items to delete.
+                db (AsyncSession): The database session.
+
+            Returns:
+                BulkResultSchema: The ID of each item deleted, or why it was not.
+            """
+            return bulk_response(await model_crud.bulk_delete(db=db, ids=ids))
+
     if "delete" in routes:
 
         @router.delete("/{item_id}", response_model=DeleteSchema)
-        async def delete(item_id: UUID, db: Annotated[Session, Depends(get_db)]) -> dict:
+        async def delete(item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> dict:
             """Delete an item by its ID.
 
             Args:
                 item_id (UUID): The ID of the item to delete.
-                db (Session): The database session.
+                db (AsyncSession): The database session.
 
             Raises:
                 HTTPException: If the item is not found.
@@ -112,18 +259,18 @@ def generate_crud_router(  # noqa: C901
             Returns:
                 schema: The deleted item.
             """
-            return model_crud.delete(db=db, id_pk=item_id)
+            return await model_crud.delete(db=db, id_pk=item_id)
 
     if "update" in routes:
 
         @router.put("/{item_id}", response_model=schema)
-        async def update(item_id: UUID, update_data: schema_create, db: Annotated[Session, Depends(get_db)]) -> list[BaseModel]:  # type: ignore[arg-type]
+        async def update(item_id: UUID, update_data: schema_create, db: Annotated[AsyncSession, Depends(get_db)]) -> list[BaseModel]:  # type: ignore[arg-type]
             """Update an item.
 
             Args:
                 item_id (UUID): The ID of the item to update.
                 update_data (schema_create): The data to update the item with.
-                db (Session): The database session.
+                db (AsyncSession): The database session.
 
             Raises:
                 HTTPException: If the item is not found.
@@ -131,10 +278,7 @@ def generate_crud_router(  # noqa: C901
             Returns:
                 schema: The updated item.
             """
-            db_item = model_crud.show(db=db, id_pk=item_id)
-            if not db_item:
-                raise NotFoundException(model.__name__)
-            return model_crud.update(db=db, id_pk=db_item.id, obj_in=update_data)
+            return await model_crud.update(db=db, id_pk=item_id, obj_in=update_data, schema=schema)
 
     return router
 
@@ -159,13 +303,13 @@ def add_common_router(
     # model = model_crud.model
 
     @router.post("/{item_id}/creators/", response_model=schema)
-    async def add_creator_with_body(item_id: UUID, creator: CreatorSchema | None, db: Annotated[Session, Depends(get_db)]) -> BaseModel:
+    async def add_creator_with_body(item_id: UUID, creator: CreatorSchema | None, db: Annotated[AsyncSession, Depends(get_db)]) -> BaseModel:
         """Add a creator to an image.
 
         Args:
             item_id (UUID): The ID of the item to which the creator is being added.
             creator (CreatorSchema | None): The creator data to be added.
-            db (Session): The database session.
+            db (AsyncSession): The database session.
 
         Raises:
             HTTPException: If the creation fails.
@@ -173,16 +317,16 @@ def add_common_router(
         Returns:
             CreatorSchema: The created item.
         """
-        return model_crud.add_creator(db=db, crud=creator_crud, item_id=item_id, creator=creator)
+        return await model_crud.add_creator(db=db, crud=creator_crud, item_id=item_id, creator=creator, schema=schema)
 
     @router.post("/{item_id}/creators/{creator_id}", response_model=schema)
-    async def add_creator(item_id: UUID, creator_id: UUID, db: Annotated[Session, Depends(get_db)]) -> BaseModel:
+    async def add_creator(item_id: UUID, creator_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> BaseModel:
         """Add a creator to an image.
 
         Args:
             item_id (UUID): The ID of the item to which the creator is being added.
             creator_id (UUID): The ID of the creator being added.
-            db (Session): The database session.
+            db (AsyncSession): The database session.
 
         Raises:
             HTTPException: If the creation fails.
@@ -190,6 +334,6 @@ def add_common_router(
         Returns:
             ImageSchema: The created item.
         """
-        return model_crud.add_creator(db=db, crud=creator_crud, item_id=item_id, creator_id=creator_id)
+        return await model_crud.add_creator(db=db, crud=creator_crud, item_id=item_id, creator_id=creator_id, schema=schema)
 
     return router
@@ -0,0 +1,109 @@
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.models.base import Base
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+YAML_MEDIA_TYPE = "application/yaml"
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}, "description": "Streamed with `stream=true` or `Accept: application/x-ndjson`."}}
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    """Check whether the response should be streamed.
+
+    Args:
+        request (Request): The incoming request.
+        stream (bool): The value of the `stream` query parameter.
+
+    Returns:
+        bool: True if `stream=true` was given or NDJSON was requested in the Accept header.
+    """
+    return stream or wants_ndjson(request)
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Check whether the client asked for newline-delimited JSON.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        bool: True if the Accept header contains application/x-ndjson.
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def wants_yaml(request: Request) -> bool:
+    """Check whether the client asked for YAML.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        bool: True if the Accept header contains application/yaml.
+    """
+    return YAML_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_response(
+    request: Request,
+    rows: Callable[[AsyncSession], AsyncIterator[Base]],
+    schema: type[BaseModel],
+    exclude_none: bool = False,
+    header: BaseModel | None = None,
+    header_field: str = "items",
+) -> StreamingResponse:
+    """Stream rows serialized one by one, as NDJSON or as a JSON array.
+
+    The rows are produced from a session opened for the duration of the response, as the request
+    session is closed once the route returns.
+
+    With a `header`, the JSON response is the header object with the rows in its `header_field` array,
+    and the NDJSON response starts with a line holding the header.
+
+    Args:
+        request (Request): The incoming request, used to negotiate the format.
+        rows (Callable[[AsyncSession], AsyncIterator[Base]]): Produces the rows from a database session.
+        schema (type[BaseModel]): Schema each row is serialized with.
+        exclude_none (bool): Whether to omit the fields set to None.
+        header (BaseModel | None): Optional object the rows belong to.
+        header_field (str): Name of the array of rows inside the header object.
+
+    Returns:
+        StreamingResponse: The streaming response.
+    """
+    ndjson = wants_ndjson(request)
+    separator = b"\n" if ndjson else b","
+    if header is None:
+        opening, closing = (b"", b"") if ndjson else (b"[", b"]")
+    elif ndjson:
+        opening, closing = header.model_dump_json(exclude_none=exclude_none).encode() + b"\n", b""
+    else:
+        header_json = header.model_dump_json(exclude_none=exclude_none, exclude={header_field}).encode()
+        opening = header_json[:-1] + (b"," if header_json != b"{}" else b"") + f'"{header_field}":['.encode()
+        closing = b"]}"
+
+    async def body() -> AsyncIterator[bytes]:
+        chunk = bytearray(opening)
+        first = True
+        async with AsyncSessionLocal() as db:
+            async for row in rows(db):
+                if not first:
+                    chunk += separator
+                first = False
+                chunk += schema.model_validate(row, from_attributes=True).model_dump_json(exclude_none=exclude_none).encode()
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    yield bytes(chunk)
+                    chunk.clear()
+        if ndjson and not first:
+            chunk += b"\n"
+        chunk += closing
+        yield bytes(chunk)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE if ndjson else JSON_MEDIA_TYPE)
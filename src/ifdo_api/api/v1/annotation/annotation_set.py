@@ -1,10 +1,65 @@
+from typing import Annotated
+from uuid import UUID
 from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import File
+from fastapi import UploadFile
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.api.deps import get_db
+from ifdo_api.api.exceptions import ValueErrorException
 from ifdo_api.api.generic_router import generate_crud_router
+from ifdo_api.crud.annotations.annotation import annotation_crud
 from ifdo_api.crud.annotations.annotation_set import annotation_set_crud
+from ifdo_api.schemas.annotations.annotation import AnnotationColumnsSchema
+from ifdo_api.schemas.annotations.annotation import AnnotationIngestResultSchema
 from ifdo_api.schemas.annotations.annotation_set import AnnotationSetSchema
+from ifdo_api.utils.annotation_ingest import read_annotation_csv
+
+# Number of validation errors of the columns reported in the response
+MAX_REPORTED_ERRORS = 20
 
 router: APIRouter = generate_crud_router(
     model_crud=annotation_set_crud,
     schema=AnnotationSetSchema,
     schema_create=AnnotationSetSchema,
 )
+
+
+@router.post("/{item_id}/annotations:bulk", response_model=AnnotationIngestResultSchema)
+async def ingest_annotations(
+    item_id: UUID,
+    input_file: Annotated[UploadFile, File()],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> dict:
+    """Create annotations in bulk, e.g. the detections of a model, from a file holding them by columns.
+
+    The file is either JSON, an object mapping the fields of `AnnotationColumnsSchema` to their list of values,
+    or CSV (`text/csv` or a `.csv` name), with a header naming the columns and the coordinates written as JSON.
+    Labels are given by name and must exist; annotators are given by name and created if unknown.
+
+    Args:
+        item_id (UUID): The ID of the annotation set.
+        input_file (UploadFile): The annotations, as JSON or CSV.
+        db (AsyncSession): The database session.
+
+    Raises:
+        HTTPException: If the annotation set is not found or the file cannot be read.
+
+    Returns:
+        AnnotationIngestResultSchema: The number of annotations created and the errors of the rejected ones.
+    """
+    await annotation_set_crud.show(db=db, id_pk=item_id)
+    try:
+        content = await input_file.read()
+        if input_file.content_type == "text/csv" or (input_file.filename or "").endswith(".csv"):
+            columns = AnnotationColumnsSchema.model_validate(read_annotation_csv(content.decode()))
+        else:
+            # Parsed and validated in one pass by pydantic-core
+            columns = AnnotationColumnsSchema.model_validate_json(content)
+    except ValidationError as error:
+        details = [f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors()[:MAX_REPORTED_ERRORS]]
+        raise ValueErrorException(detail=f"{error.error_count()} invalid values: {'; '.join(details)}") from error
+    except (UnicodeDecodeError, ValueError) as error:
+        raise ValueErrorException(detail=f"Invalid annotations file: {error}") from error
+    return await annotation_crud.ingest(db=db, annotation_set_id=item_id, columns=columns)
@@ -2,7 +2,7 @@ from typing import Annotated
 from fastapi import APIRouter
 from fastapi import Depends
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ifdo_api.api.deps import get_db
 from ifdo_api.schemas.catalog import CatalogSchema
 
@@ -10,11 +10,11 @@ router = APIRouter()
 
 
 @router.get("/", response_model=CatalogSchema)
-async def show(db: Annotated[Session, Depends(get_db)]) -> list[BaseModel]:
+async def show(db: Annotated[AsyncSession, Depends(get_db)]) -> list[BaseModel]:
     """Get an item by its ID.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Raises:
         HTTPException: If the item is not found.
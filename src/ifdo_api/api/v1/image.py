@@ -2,13 +2,29 @@ from typing import Annotated
 from uuid import UUID
 from fastapi import APIRouter
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from fastapi import Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.api.cache import cached
 from ifdo_api.api.deps import get_db
+from ifdo_api.api.deps import get_filters
+from ifdo_api.api.exceptions import NotFoundException
+from ifdo_api.api.exceptions import ValueErrorException
 from ifdo_api.api.generic_router import add_common_router
 from ifdo_api.api.generic_router import generate_crud_router
+from ifdo_api.crud.annotations.annotation import MAX_REGION_ANNOTATIONS
+from ifdo_api.crud.annotations.annotation import annotation_crud
+from ifdo_api.crud.base import DEFAULT_PAGE_SIZE
+from ifdo_api.crud.base import MAX_PAGE_SIZE
+from ifdo_api.crud.filters import Filter
+from ifdo_api.crud.filters import parse_floats
 from ifdo_api.crud.image import image_crud
+from ifdo_api.models.annotations.annotation import Annotation
+from ifdo_api.models.annotations.label import Label
 from ifdo_api.models.image import Image
+from ifdo_api.models.image_set import ImageSet
+from ifdo_api.schemas.annotations.annotation import AnnotationRegionSchema
 from ifdo_api.schemas.image import ImageSchema
+from ifdo_api.schemas.pagination import PageSchema
 
 router: APIRouter = generate_crud_router(
     model_crud=image_crud, schema=ImageSchema, schema_create=ImageSchema, routes=["create", "delete", "update", "index"]
@@ -17,13 +33,37 @@ router: APIRouter = generate_crud_router(
 router = add_common_router(model_crud=image_crud, schema=ImageSchema, router=router)
 
 
+@router.get("/merged", response_model=PageSchema[ImageSchema], response_model_exclude_none=True)
+@cached(Image, PageSchema[ImageSchema], exclude_none=True, related=[ImageSet])
+async def merged_index(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    filters: Annotated[list[Filter], Depends(get_filters(Image, reserved=("cursor", "limit"), spatial_field=image_crud.spatial_field))],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """Get a page of images, their unset fields replaced with the fields of their image_set.
+
+    Args:
+        db (AsyncSession): The database session.
+        filters (list[Filter]): Filters on the own fields of the images, given as `<field>=<value>` or `<field>__<operator>=<value>`.
+        cursor (str | None): The `next` cursor of the previous page, None for the first page.
+        limit (int): The maximum number of items in the page.
+
+    Returns:
+        PageSchema[ImageSchema]: The items and the cursor of the next page.
+    """
+    items, next_cursor = await image_crud.merged_page(db=db, filters=filters, cursor=cursor, limit=limit)
+    return {"items": items, "next": next_cursor}
+
+
 @router.get("/{item_id}", response_model=ImageSchema, response_model_exclude_none=True)
-async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)], replace_image_set: bool = False) -> Image:
+@cached(Image, ImageSchema, exclude_none=True, related=[ImageSet])
+async def show(item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)], replace_image_set: bool = False) -> Image | dict:
     """Get an item by its ID.
 
     Args:
         item_id (UUID): The ID of the item to retrieve.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         replace_image_set (bool): Whether to replace the image field with the existing image_set field. Defaults to False.
 
     Raises:
@@ -32,22 +72,53 @@ async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)], replace_i
     Returns:
         schema: The item with the specified ID.
     """
-    image = image_crud.show(db=db, id_pk=item_id)
     if replace_image_set:
-        return image.to_merged_dict()
-    return image
+        images = await image_crud.merged(db=db, where=[Image.id == item_id])
+        if not images:
+            raise NotFoundException(Image.__name__)
+        return images[0]
+    return await image_crud.show(db=db, id_pk=item_id, schema=ImageSchema)
 
     # Handle the include_images parameter
 
 
+@router.get("/{item_id}/annotations", response_model=list[AnnotationRegionSchema])
+@cached(Annotation, list[AnnotationRegionSchema], related=[Label], parent=Image)
+async def annotations_in_region(
+    item_id: UUID,
+    bbox: Annotated[str, Query(description="The region, as `x_min,y_min,x_max,y_max` in pixels")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=MAX_REGION_ANNOTATIONS)] = MAX_REGION_ANNOTATIONS,
+) -> list:
+    """Get the annotations of an image intersecting a rectangle of its pixels, e.g. a tile shown by a viewer.
+
+    Args:
+        item_id (UUID): The ID of the image.
+        bbox (str): The region, as `x_min,y_min,x_max,y_max` in pixels.
+        db (AsyncSession): The database session.
+        limit (int): The maximum number of annotations.
+
+    Raises:
+        HTTPException: If the region is invalid.
+
+    Returns:
+        list[AnnotationRegionSchema]: The annotations, whole-image ones excluded.
+    """
+    try:
+        x_min, y_min, x_max, y_max = parse_floats(bbox, count=4)
+    except ValueError as error:
+        raise ValueErrorException(detail="bbox must be x_min,y_min,x_max,y_max") from error
+    return await annotation_crud.in_region(db=db, image_id=item_id, bbox=(x_min, y_min, x_max, y_max), limit=limit)
+
+
 # @router.post("/{item_id}/annotations/{annotation_id}", response_model=ImageSchema)
-# async def add_annotation(item_id: UUID, annotation_id: UUID, db: Annotated[Session, Depends(get_db)]) -> BaseModel:
+# async def add_annotation(item_id: UUID, annotation_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> BaseModel:
 #     """Add a annotation to an image.
 
 #     Args:
 #         item_id (UUID): The ID of the item to which the annotation is being added.
 #         annotation_id (UUID): The ID of the annotation being added.
-#         db (Session): The database session.
+#         db (AsyncSession): The database session.
 
 #     Raises:
 #         HTTPException: If the creation fails.
@@ -59,13 +130,13 @@ async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)], replace_i
 
 
 # @router.post("/{item_id}/annotations/", response_model=ImageSchema)
-# async def add_new_annotation(item_id: UUID, annotation: ImageCreatorSchema, db: Annotated[Session, Depends(get_db)]) -> BaseModel:
+# async def add_new_annotation(item_id: UUID, annotation: ImageCreatorSchema, db: Annotated[AsyncSession, Depends(get_db)]) -> BaseModel:
 #     """Add new annotation to an image.
 
 #     Args:
 #         item_id (UUID): The ID of the item to which the annotation is being added.
 #         annotation (ImageCreatorSchema): The annotation data to be added.
-#         db (Session): The database session.
+#         db (AsyncSession): The database session.
 
 #     Raises:
 #         HTTPException: If the creation fails.
@@ -1,23 +1,45 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 from uuid import UUID
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import File
 from fastapi import Form
+from fastapi import Query
+from fastapi import Request
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.api.cache import cached
 from ifdo_api.api.deps import get_db
+from ifdo_api.api.deps import get_filters
 from ifdo_api.api.generic_router import add_common_router
 from ifdo_api.api.generic_router import generate_crud_router
+from ifdo_api.api.streaming import JSON_MEDIA_TYPE
+from ifdo_api.api.streaming import STREAM_RESPONSES
+from ifdo_api.api.streaming import YAML_MEDIA_TYPE
+from ifdo_api.api.streaming import stream_response
+from ifdo_api.api.streaming import wants_stream
+from ifdo_api.api.streaming import wants_yaml
+from ifdo_api.crud.base import DEFAULT_PAGE_SIZE
+from ifdo_api.crud.base import MAX_PAGE_SIZE
+from ifdo_api.crud.filters import Filter
 from ifdo_api.crud.image import image_crud
 from ifdo_api.crud.image_set import image_set_crud
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.models.image import Image
 from ifdo_api.models.image_set import ImageSet
 from ifdo_api.schemas.image import ImageSchema
 from ifdo_api.schemas.image_set import ImageSetFullSchema
 from ifdo_api.schemas.image_set import ImageSetSchema
 from ifdo_api.schemas.image_set import ImageSetSimpleSchema
+from ifdo_api.schemas.pagination import PageSchema
 from ifdo_api.utils.ifdo import DataFormat
+from ifdo_api.utils.ifdo import hash_ifdo_upload
+from ifdo_api.utils.ifdo import stream_ifdo_file
 from ifdo_api.utils.ifdo import validate_ifdo_data
+from ifdo_api.utils.ifdo_export import dump_ifdo_json
+from ifdo_api.utils.ifdo_export import dump_ifdo_yaml
 
 router: APIRouter = generate_crud_router(
     model_crud=image_set_crud,
@@ -29,31 +51,62 @@ router: APIRouter = generate_crud_router(
 router = add_common_router(model_crud=image_set_crud, schema=ImageSetSchema, router=router)
 
 
-@router.get("/", response_model=list[ImageSetSchema] | list[ImageSetSimpleSchema] | list[ImageSetFullSchema], response_model_exclude_none=True)
-async def index(db: Annotated[Session, Depends(get_db)], include_images: bool = False) -> list[ImageSet]:
-    """Get all items.
+@router.get(
+    "/",
+    response_model=PageSchema[ImageSetSchema] | PageSchema[ImageSetSimpleSchema] | PageSchema[ImageSetFullSchema],
+    response_model_exclude_none=True,
+)
+@cached(ImageSet, PageSchema[ImageSetSchema] | PageSchema[ImageSetSimpleSchema] | PageSchema[ImageSetFullSchema], exclude_none=True)
+async def index(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    filters: Annotated[
+        list[Filter],
+        Depends(get_filters(ImageSet, reserved=("cursor", "limit", "include_images"), spatial_field=image_set_crud.spatial_field)),
+    ],
+    include_images: bool = False,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """Get a page of items.
 
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        filters (list[Filter]): Filters given as `<field>=<value>` or `<field>__<operator>=<value>`.
         include_images (bool): Whether to include images in the response. Defaults to False.
+        cursor (str | None): The `next` cursor of the previous page, None for the first page.
+        limit (int): The maximum number of items in the page.
 
     Returns:
-        list[ImageSetSchema]: A list of items.
+        PageSchema[ImageSetSchema]: The items and the cursor of the next page.
     """
-    return image_set_crud.index(
+    items, next_cursor = await image_set_crud.page(
         db=db,
+        filters=filters,
+        cursor=cursor,
+        limit=limit,
         include_images=include_images,
+        schema=ImageSetFullSchema if include_images else ImageSetSchema,
     )
-
-
-@router.get("/{item_id}", response_model=ImageSetSchema | ImageSetFullSchema, response_model_exclude_none=True)
-async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)], include_images: bool = False) -> ImageSet:
+    return {"items": items, "next": next_cursor}
+
+
+@router.get("/{item_id}", response_model=ImageSetSchema | ImageSetFullSchema, response_model_exclude_none=True, responses=STREAM_RESPONSES)
+@cached(ImageSet, ImageSetSchema | ImageSetFullSchema, exclude_none=True)
+async def show(
+    request: Request,
+    item_id: UUID,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    include_images: bool = False,
+    stream: bool = False,
+) -> ImageSet | StreamingResponse:
     """Get an item by its ID.
 
     Args:
+        request (Request): The incoming request.
         item_id (UUID): The ID of the item to retrieve.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         include_images (bool): Whether to include images in the response. Defaults to False.
+        stream (bool): Stream the images, as NDJSON with `Accept: application/x-ndjson` (the image_set on the first line).
 
     Raises:
         HTTPException: If the item is not found.
@@ -61,19 +114,62 @@ async def show(item_id: UUID, db: Annotated[Session, Depends(get_db)], include_i
     Returns:
         schema: The item with the specified ID.
     """
-    return image_set_crud.show(db=db, id_pk=item_id, include_images=include_images)
+    if include_images and wants_stream(request, stream):
+        image_set = ImageSetSchema.model_validate(await image_set_crud.show(db=db, id_pk=item_id, schema=ImageSetSchema))
+        return stream_response(
+            request,
+            lambda session: image_crud.stream(db=session, where=[Image.image_set_id == item_id], schema=ImageSchema),
+            ImageSchema,
+            exclude_none=True,
+            header=image_set,
+            header_field="images",
+        )
+    schema = ImageSetFullSchema if include_images else ImageSetSchema
+    return await image_set_crud.show(db=db, id_pk=item_id, include_images=include_images, schema=schema)
 
     # Handle the include_images parameter
 
 
+@router.get(
+    "/{item_id}/ifdo",
+    response_class=StreamingResponse,
+    responses={200: {"content": {JSON_MEDIA_TYPE: {}, YAML_MEDIA_TYPE: {}}, "description": "The iFDO, as YAML with `Accept: application/yaml`."}},
+)
+async def export_ifdo(request: Request, item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> StreamingResponse:
+    """Export an image_set as an iFDO, streamed as its images are read.
+
+    Args:
+        request (Request): The incoming request, used to negotiate the format.
+        item_id (UUID): The ID of the image_set.
+        db (AsyncSession): The database session.
+
+    Raises:
+        HTTPException: If the image_set is not found.
+
+    Returns:
+        StreamingResponse: The iFDO, as JSON or as YAML with `Accept: application/yaml`.
+    """
+    await image_set_crud.show(db=db, id_pk=item_id)
+    yaml_output = wants_yaml(request)
+
+    async def body() -> AsyncIterator[bytes]:
+        # The request session is closed once the route returns
+        async with AsyncSessionLocal() as session:
+            header, items = await image_set_crud.export_ifdo(db=session, id_pk=item_id)
+            async for chunk in (dump_ifdo_yaml if yaml_output else dump_ifdo_json)(header, items):
+                yield chunk
+
+    return StreamingResponse(body(), media_type=YAML_MEDIA_TYPE if yaml_output else JSON_MEDIA_TYPE)
+
+
 @router.post("/{item_id}/images/", response_model=ImageSchema)
-async def add_image_with_body(item_id: UUID, image: ImageSchema | None, db: Annotated[Session, Depends(get_db)]) -> ImageSet:
+async def add_image_with_body(item_id: UUID, image: ImageSchema | None, db: Annotated[AsyncSession, Depends(get_db)]) -> ImageSet:
     """Add a image to an image.
 
     Args:
         item_id (UUID): The ID of the item to which the image is being added.
         image (ImageSchema | None): The image data to be added.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Raises:
         HTTPException: If the creation fails.
@@ -81,17 +177,17 @@ async def add_image_with_body(item_id: UUID, image: ImageSchema | None, db: Anno
     Returns:
         ImageSchema: The created item.
     """
-    return image_set_crud.add_image(db=db, crud=image_crud, item_id=item_id, image=image)
+    return await image_set_crud.add_image(db=db, crud=image_crud, item_id=item_id, image=image, schema=ImageSchema)
 
 
 @router.post("/{image_set_id}/images/{image_id}", response_model=ImageSchema)
-async def add_image(image_set_id: UUID, image_id: UUID, db: Annotated[Session, Depends(get_db)]) -> ImageSet:
+async def add_image(image_set_id: UUID, image_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> ImageSet:
     """Add a image to a image_set.
 
     Args:
         image_set_id (UUID): The ID of the image_set to which the image is being added.
         image_id (UUID): The ID of the image being added.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Raises:
         HTTPException: If the creation fails.
@@ -99,23 +195,32 @@ async def add_image(image_set_id: UUID, image_id: UUID, db: Annotated[Session, D
     Returns:
         ImageSchema: The created item.
     """
-    return image_set_crud.add_image(db=db, crud=image_crud, item_id=image_set_id, image_id=image_id)
+    return await image_set_crud.add_image(db=db, crud=image_crud, item_id=image_set_id, image_id=image_id, schema=ImageSchema)
 
 
 @router.post("/ifdo/{data_format}", response_model=ImageSetSchema)
 async def import_ifdo(
     data_format: DataFormat,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_db)],
     input_data: Annotated[str | None, Form()] = None,
     input_file: Annotated[UploadFile | None, File()] = None,
+    upsert: bool = False,
 ) -> ImageSetSchema:
     """Import data from IFDO format and create a image_set.
 
+    With `upsert=true`, an iFDO imported before (same `image-set-uuid`, or else same `image-set-name`) updates
+    its image_set instead: items are matched on `image-uuid` or `image-hash-sha256`, and only the new, changed
+    and removed images are written.
+
+    The raw upload is hashed (SHA-256) before it is parsed, and the hash is recorded on the image_set: uploading
+    the same data again returns the image_set imported from it, without parsing or validating it.
+
     Args:
         data_format (DataFormat): The format of the IFDO data to import.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         input_data (dict | None): An optional dictionary containing IFDO data.
         input_file (UploadFile | None): An optional file containing IFDO data in JSON format.
+        upsert (bool): Whether to update the image_set previously imported from the iFDO.
 
     Raises:
         HTTPException: If the input data is invalid or if the file format is incorrect.
@@ -123,6 +228,18 @@ async def import_ifdo(
     Returns:
         schema: The created item.
     """
-    input_data = await validate_ifdo_data(data_format, input_data, input_file)
+    ifdo_sha256 = await hash_ifdo_upload(data_format, input_data, input_file)
+    if ifdo_sha256 is not None:
+        image_set_id = await image_set_crud.find_ifdo_upload(db=db, ifdo_sha256=ifdo_sha256)
+        if image_set_id is not None:
+            return await image_set_crud.show(db=db, id_pk=image_set_id, schema=ImageSetSchema)
+
+    if data_format == DataFormat.file:
+        header, items = await stream_ifdo_file(input_file)
+        return await image_set_crud.create_from_ifdo_stream(
+            db=db, header=header, items=items, schema=ImageSetSchema, upsert=upsert, ifdo_sha256=ifdo_sha256
+        )
+
+    input_data = await validate_ifdo_data(input_data)
 
-    return image_set_crud.create_from_ifdo(ifdo_data=input_data, db=db)
+    return await image_set_crud.create_from_ifdo(ifdo_data=input_data, db=db, schema=ImageSetSchema, upsert=upsert, ifdo_sha256=ifdo_sha256)
@@ -0,0 +1,87 @@
+from typing import Annotated
+from uuid import UUID
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import File
+from fastapi import Form
+from fastapi import UploadFile
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.api.deps import get_db
+from ifdo_api.api.exceptions import ValueErrorException
+from ifdo_api.crud.import_job import import_job_crud
+from ifdo_api.crud.import_job import import_queue
+from ifdo_api.models.import_job import ImportJob
+from ifdo_api.schemas.import_job import ImportJobSchema
+from ifdo_api.utils.ifdo import DataFormat
+
+router = APIRouter()
+
+
+@router.post("/ifdo/{data_format}", response_model=ImportJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def create(
+    data_format: DataFormat,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    input_data: Annotated[str | None, Form()] = None,
+    input_file: Annotated[UploadFile | None, File()] = None,
+) -> ImportJob:
+    """Start importing data from IFDO format into a new image_set, in the background.
+
+    Args:
+        data_format (DataFormat): The format of the IFDO data to import.
+        db (AsyncSession): The database session.
+        input_data (str | None): The IFDO data as a JSON string, for the `ifdo` format.
+        input_file (UploadFile | None): A JSON or YAML file containing IFDO data, for the `file` format.
+
+    Raises:
+        HTTPException: If the input matching the format is missing, or the file format is incorrect.
+
+    Returns:
+        ImportJobSchema: The pending job, whose progress is reported by `GET /v1/import_jobs/{item_id}`.
+    """
+    if data_format == DataFormat.ifdo:
+        if input_data is None:
+            raise ValueErrorException(detail="Invalid IFDO data format")
+        job = await import_job_crud.create_from_upload(db=db, input_data=input_data)
+    else:
+        if input_file is None:
+            raise ValueErrorException(detail="File input is required for 'file' format")
+        job = await import_job_crud.create_from_upload(db=db, input_file=input_file)
+    import_queue.submit(job.id)
+    return job
+
+
+@router.get("/{item_id}", response_model=ImportJobSchema)
+async def show(item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> ImportJob:
+    """Get the progress of an import job: its status, the items imported, the throughput and the errors.
+
+    Args:
+        item_id (UUID): The ID of the job.
+        db (AsyncSession): The database session.
+
+    Raises:
+        HTTPException: If the job is not found.
+
+    Returns:
+        ImportJobSchema: The job.
+    """
+    return await import_job_crud.show(db=db, id_pk=item_id)
+
+
+@router.post("/{item_id}/cancel", response_model=ImportJobSchema)
+async def cancel(item_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]) -> ImportJob:
+    """Cancel an import job, deleting the image_set it imported so far.
+
+    A pending job is cancelled at once, a running one once its current batch is committed.
+
+    Args:
+        item_id (UUID): The ID of the job.
+        db (AsyncSession): The database session.
+
+    Raises:
+        HTTPException: If the job is not found or already finished.
+
+    Returns:
+        ImportJobSchema: The job.
+    """
+    return await import_job_crud.request_cancel(db=db, id_pk=item_id)
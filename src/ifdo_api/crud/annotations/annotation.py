@@ -1,9 +1,51 @@
 """This module implements the CRUD for the Annotations model."""
 
+import os
+from collections.abc import Iterable
+from collections.abc import Sequence
+from uuid import UUID
+from uuid import uuid4
+import orjson
+from sqlalchemy import RowMapping
+from sqlalchemy import String
+from sqlalchemy import any_
+from sqlalchemy import bindparam
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 from ifdo_api.crud.base import CRUDBase
+from ifdo_api.crud.cache import invalidate
+from ifdo_api.crud.cache import list_tag
+from ifdo_api.crud.cache import row_write_tags
 from ifdo_api.models.annotations.annotation import Annotation
 from ifdo_api.models.annotations.annotation import AnnotationLabel
 from ifdo_api.models.annotations.annotation import Annotator
+from ifdo_api.models.annotations.label import Label
+from ifdo_api.models.base import ShapeEnum
+from ifdo_api.models.base import utcnow
+from ifdo_api.models.image import Image
+from ifdo_api.schemas.annotations.annotation import AnnotationColumnsSchema
+from ifdo_api.utils.annotation_ingest import coordinate_errors
+from ifdo_api.utils.ifdo import IFDO_DATETIME_FORMAT
+
+MAX_REGION_ANNOTATIONS = int(os.getenv("MAX_REGION_ANNOTATIONS", "10000"))
+
+ANNOTATION_COPY_COLUMNS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "annotation_set_id",
+    "image_id",
+    "annotation_platform",
+    "shape",
+    "coordinates",
+    "dimension_pixels",
+)
+ANNOTATION_LABEL_COPY_COLUMNS = ("id", "created_at", "updated_at", "annotation_id", "label_id", "annotator_id", "creation_datetime")
 
 
 class CRUDAnnotation(CRUDBase[Annotation]):
@@ -13,6 +55,171 @@ class CRUDAnnotation(CRUDBase[Annotation]):
         CRUDBase (ModelType): Base class for CRUD operations.
     """
 
+    async def ingest(self, db: AsyncSession, *, annotation_set_id: UUID, columns: AnnotationColumnsSchema) -> dict:
+        """Create the annotations given by columns in an annotation set, with their labels.
+
+        The coordinates are checked against the shapes for all the annotations at once, the images, labels and
+        annotators are resolved with one query each (the unknown annotators being created), and the valid
+        annotations are written with COPY, in one transaction. The invalid ones are reported and left out.
+
+        Args:
+            db (AsyncSession): Database session.
+            annotation_set_id (UUID): The ID of the annotation set.
+            columns (AnnotationColumnsSchema): The annotations.
+
+        Returns:
+            AnnotationIngestResultSchema: The number of annotations created and the errors of the rejected ones.
+        """
+        rows = len(columns.shape)
+        if not rows:
+            return {"created": 0, "failed": 0, "errors": []}
+        labels = columns.label or [None] * rows
+        annotators = columns.annotator or [None] * rows
+        platforms = columns.annotation_platform or [None] * rows
+        errors = coordinate_errors(columns.shape, columns.coordinates)
+
+        # The lookups also open the transaction of the session, which the COPY below is part of
+        image_ids = set(await self.lookup(db, Image.id, Image.id, set(columns.image_id)))
+        label_ids = await self.lookup(db, Label.name, Label.id, {name for name in labels if name})
+        annotator_ids = await self.annotator_ids(db, {name for name, label in zip(annotators, labels, strict=True) if name and label})
+        max_platform_length = Annotation.annotation_platform.type.length
+        for index in range(rows):
+            if errors[index] is not None:
+                continue
+            if columns.image_id[index] not in image_ids:
+                errors[index] = "Image not found"
+            elif labels[index] and labels[index] not in label_ids:
+                errors[index] = f"Label '{labels[index]}' not found"
+            elif platforms[index] and len(platforms[index]) > max_platform_length:
+                errors[index] = f"annotation_platform: at most {max_platform_length} characters"
+
+        valid = [index for index, error in enumerate(errors) if error is None]
+        ids = {index: uuid4() for index in valid}
+        now = utcnow()
+        dimensions = columns.dimension_pixels or [None] * rows
+        creation_datetimes = columns.creation_datetime or [None] * rows
+        default_creation_datetime = now.strftime(IFDO_DATETIME_FORMAT)
+        connection = (await (await db.connection()).get_raw_connection()).driver_connection
+        await connection.copy_records_to_table(
+            Annotation.__tablename__,
+            columns=ANNOTATION_COPY_COLUMNS,
+            records=(
+                (
+                    ids[index],
+                    now,
+                    now,
+                    annotation_set_id,
+                    columns.image_id[index],
+                    platforms[index],
+                    ShapeEnum(columns.shape[index]).name,  # the enum type holds the names of the shapes
+                    orjson.dumps(columns.coordinates[index]).decode(),
+                    dimensions[index],
+                )
+                for index in valid
+            ),
+        )
+        await connection.copy_records_to_table(
+            AnnotationLabel.__tablename__,
+            columns=ANNOTATION_LABEL_COPY_COLUMNS,
+            records=(
+                (
+                    uuid4(),
+                    now,
+                    now,
+                    ids[index],
+                    label_ids[labels[index]],
+                    annotator_ids.get(annotators[index]),
+                    creation_datetimes[index] or default_creation_datetime,
+                )
+                for index in valid
+                if labels[index]
+            ),
+        )
+        await db.commit()
+        # The tags of the generic writes, computed once per distinct set of parents rather than once per row
+        annotations = {(("image_id", columns.image_id[index]), ("annotation_set_id", annotation_set_id)) for index in valid}
+        labelled = [index for index in valid if labels[index]]
+        annotation_labels = {(("label_id", label_ids[labels[index]]), ("annotator_id", annotator_ids.get(annotators[index]))) for index in labelled}
+        tags = {list_tag(Annotator.__tablename__)}.union(
+            *(row_write_tags(self.model, dict(values), created=True) for values in annotations),
+            *(row_write_tags(AnnotationLabel, dict(values), created=True) for values in annotation_labels),
+        )
+        await invalidate(tags)
+        return {
+            "created": len(valid),
+            "failed": rows - len(valid),
+            "errors": [{"index": index, "error": error} for index, error in enumerate(errors) if error is not None],
+        }
+
+    async def in_region(self, db: AsyncSession, *, image_id: UUID, bbox: Sequence[float], limit: int = MAX_REGION_ANNOTATIONS) -> list[RowMapping]:
+        """Return the annotations of an image intersecting a rectangle, in pixels.
+
+        The lookup is served by the GiST index on (`image_id`, `geom`). Whole-image annotations have no geometry
+        and are not returned.
+
+        Args:
+            db (AsyncSession): Database session.
+            image_id (UUID): The ID of the image.
+            bbox (Sequence[float]): The rectangle, as (x_min, y_min, x_max, y_max).
+            limit (int): The maximum number of annotations.
+
+        Returns:
+            list[RowMapping]: The annotations, with the IDs of their labels, in the order of their creation.
+        """
+        label_ids = select(AnnotationLabel.label_id).where(AnnotationLabel.annotation_id == Annotation.id).scalar_subquery()
+        statement = (
+            select(
+                Annotation.id,
+                Annotation.image_id,
+                Annotation.annotation_set_id,
+                Annotation.annotation_platform,
+                Annotation.shape,
+                Annotation.coordinates,
+                Annotation.dimension_pixels,
+                func.array(label_ids).label("label_ids"),
+            )
+            # The envelope has no SRID, as the pixel-space geometries
+            .where(Annotation.image_id == image_id, func.ST_Intersects(Annotation.geom, func.ST_MakeEnvelope(*bbox)))
+            .order_by(Annotation.created_at, Annotation.id)
+            .limit(limit)
+        )
+        return list((await db.execute(statement)).mappings())
+
+    async def lookup(self, db: AsyncSession, key: InstrumentedAttribute, value: InstrumentedAttribute, keys: Iterable) -> dict:
+        """Map keys to a column of the rows holding them, with one query whatever the number of keys.
+
+        Args:
+            db (AsyncSession): Database session.
+            key (InstrumentedAttribute): The column the keys are looked up in.
+            value (InstrumentedAttribute): The column mapped to.
+            keys (Iterable): The keys.
+
+        Returns:
+            dict: The value of each key found.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        # One array parameter rather than one parameter per key, which would be limited in number
+        array_type = ARRAY(PG_UUID(as_uuid=True)) if isinstance(keys[0], UUID) else ARRAY(String)
+        result = await db.execute(select(key, value).where(key == any_(bindparam("keys", keys, type_=array_type))))
+        return dict(result.tuples().all())
+
+    async def annotator_ids(self, db: AsyncSession, names: Iterable[str]) -> dict[str, UUID]:
+        """Return the IDs of annotators by name, creating the unknown ones.
+
+        Args:
+            db (AsyncSession): Database session.
+            names (Iterable[str]): The names of the annotators.
+
+        Returns:
+            dict[str, UUID]: The ID of each annotator.
+        """
+        names = list(names)
+        if names:
+            await db.execute(pg_insert(Annotator.__table__).on_conflict_do_nothing(index_elements=["name"]), [{"name": name} for name in names])
+        return await self.lookup(db, Annotator.name, Annotator.id, names)
+
 
 class CRUDAnnotationLabel(CRUDBase[AnnotationLabel]):
     """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -1,176 +1,532 @@
 """Base class for CRUD operations."""
 
+import base64
+import contextlib
 import datetime
+import json
+import os
+import types
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Mapping
+from collections.abc import Sequence
 from decimal import Decimal
+from functools import cache
 from typing import Any
 from typing import Generic
 from typing import TypeVar
+from typing import Union
+from typing import get_args
+from typing import get_origin
 from uuid import UUID
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from pydantic import EmailStr
 from pydantic import HttpUrl
+from sqlalchemy import Column
+from sqlalchemy import Select
+from sqlalchemy import String
+from sqlalchemy import any_
+from sqlalchemy import bindparam
+from sqlalchemy import delete
 from sqlalchemy import desc
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import text
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import tuple_
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.associationproxy import AssociationProxy
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm import selectinload
 from ifdo_api.api.exceptions import NotFoundException
 from ifdo_api.api.exceptions import ValueErrorException
+from ifdo_api.crud.cache import invalidate
+from ifdo_api.crud.cache import list_tag
+from ifdo_api.crud.cache import row_tag
+from ifdo_api.crud.cache import row_write_tags
+from ifdo_api.crud.cache import write_tags
+from ifdo_api.crud.filters import Filter
+from ifdo_api.crud.filters import compile_filters
 from ifdo_api.models.base import Base
+from ifdo_api.models.base import utcnow
 from ifdo_api.models.fields import Creator
 from ifdo_api.models.image import Image
 from ifdo_api.schemas.fields import CreatorSchema
 
 ModelType = TypeVar("ModelType", bound=Base)  # type: ignore[name-defined]
 
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+
 
 class CRUDBase(Generic[ModelType]):
     """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
+    The methods run on an `AsyncSession`. Lazy loads are not available there, so the objects returned to the
+    routes have the relationships serialized by their response schema loaded up front (see `loader_options`).
+
     Args:
         ModelType (Base): Base class for CRUD operations.
     """
 
+    # Geometry column filtered by the `bbox`, `within-distance` and `intersects-polygon` index parameters
+    spatial_field: str | None = None
+
     def __init__(self, model: ModelType):
         self.model = model
 
-    def show(self, db: Session, id_pk: int) -> ModelType | None:
+    async def show(self, db: AsyncSession, id_pk: UUID, schema: type[BaseModel] | None = None, options: Sequence = ()) -> ModelType:
         """Retrieve an object from the database by its primary key.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             id_pk (UUID): Primary key of the object to retrieve.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded with the object.
+            options (Sequence): Additional loader options.
+
+        Raises:
+            NotFoundException: If the object does not exist.
 
         Returns:
-            ModelType | None: The object if found, otherwise None.
+            ModelType: The object.
         """
-        db_item = db.query(self.model).filter(self.model.id == id_pk).one_or_none()
+        statement = (
+            select(self.model)
+            .where(self.model.id == id_pk)
+            .options(*loader_options(self.model, schema), *options)
+            .execution_options(populate_existing=True)
+        )
+        db_item = (await db.execute(statement)).scalar_one_or_none()
         if not db_item:
             raise NotFoundException(self.model.__name__)
         return db_item
 
-    def index(
-        self, db: Session, *, limit: int | None = None, arguments: dict | None = None, order_by: str = "created_at", desc_order: bool = True
+    async def index(
+        self,
+        db: AsyncSession,
+        *,
+        limit: int | None = None,
+        filters: Sequence[Filter] = (),
+        order_by: str = "created_at",
+        desc_order: bool = True,
+        cursor: str | None = None,
+        where: Sequence = (),
+        schema: type[BaseModel] | None = None,
+        options: Sequence = (),
     ) -> list[ModelType]:
         """Retrieve a list of objects from the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             limit (int | None): Maximum number of results to return.
-            arguments (dict | None): Filter arguments for the query.
+            filters (Sequence[Filter]): Filters on the columns of the model.
             order_by (str): Column name to order the results by.
             desc_order (bool): Whether to order the results in descending order.
+            cursor (str | None): Cursor returned by `page`, only the objects after it are returned.
+            where (Sequence): Additional SQL filter expressions.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded with the objects.
+            options (Sequence): Additional loader options.
 
         Returns:
             list[ModelType]: List of objects from the database.
         """
-        query = self.create_query(arguments) if arguments else "true"
+        statement = select(self.model).where(*compile_filters(self.model, filters), *where)
+        statement = self.order_by_keyset(statement, order_by=order_by, desc_order=desc_order, cursor=cursor)
+        statement = statement.options(*loader_options(self.model, schema), *options)
+        if limit:
+            statement = statement.limit(limit)
+
+        return list((await db.execute(statement)).scalars().all())
+
+    async def stream(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Sequence[Filter] = (),
+        order_by: str = "created_at",
+        desc_order: bool = True,
+        where: Sequence = (),
+        schema: type[BaseModel] | None = None,
+        options: Sequence = (),
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[ModelType]:
+        """Iterate over the objects through a server-side cursor.
+
+        Rows are fetched `batch_size` at a time (`yield_per`), and the relationships of each batch are loaded
+        with one query per relationship, so memory does not grow with the number of results.
 
-        column_attr = getattr(self.model, order_by, None)
-        if column_attr is None:
-            detail = f"Invalid order_by column: {order_by}"
-            raise ValueErrorException(detail)
-        order_clause = desc(column_attr) if desc_order else column_attr
+        Args:
+            db (AsyncSession): Database session, used for the whole iteration.
+            filters (Sequence[Filter]): Filters on the columns of the model.
+            order_by (str): Column name to order the results by.
+            desc_order (bool): Whether to order the results in descending order.
+            where (Sequence): Additional SQL filter expressions.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded with the objects.
+            options (Sequence): Additional loader options.
+            batch_size (int): Number of rows fetched from the cursor at a time.
 
-        if limit:
-            result = db.query(self.model).filter(text(query)).limit(limit).order_by(order_clause).all()
-        else:
-            result = db.query(self.model).filter(text(query)).order_by(order_clause).all()
+        Yields:
+            ModelType: The objects, in order.
+        """
+        statement = select(self.model).where(*compile_filters(self.model, filters), *where)
+        statement = self.order_by_keyset(statement, order_by=order_by, desc_order=desc_order, cursor=None)
+        statement = statement.options(*loader_options(self.model, schema), *options).execution_options(yield_per=batch_size)
+
+        async for item in await db.stream_scalars(statement):
+            yield item
+
+    async def page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        order_by: str = "created_at",
+        **kwargs: Any,  # noqa: ANN401
+    ) -> tuple[list[ModelType], str | None]:
+        """Retrieve one page of objects, paginated on the (order_by, id) keyset.
 
-        return result
+        Args:
+            db (AsyncSession): Database session.
+            cursor (str | None): Cursor of the page, None for the first one.
+            limit (int): Maximum number of objects in the page, capped to MAX_PAGE_SIZE.
+            order_by (str): Column name to order the results by.
+            **kwargs (Any): Other arguments of `index`.
+
+        Returns:
+            tuple[list[ModelType], str | None]: The objects and the cursor of the next page, None on the last page.
+        """
+        limit = min(limit, MAX_PAGE_SIZE)
+        items = await self.index(db, limit=limit + 1, order_by=order_by, cursor=cursor, **kwargs)
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor((getattr(items[-1], order_by), items[-1].id))
 
-    def create(self, db: Session, *, obj_in: ModelType | dict) -> ModelType:
+    def order_by_keyset(self, statement: Select, *, order_by: str, desc_order: bool, cursor: str | None) -> Select:
+        """Order the statement by (order_by, id) and keep only the rows after the cursor.
+
+        Args:
+            statement (Select): The statement to paginate.
+            order_by (str): Column name to order the results by.
+            desc_order (bool): Whether to order the results in descending order.
+            cursor (str | None): Cursor of the page, None for the first one.
+
+        Raises:
+            ValueErrorException: If the column or the cursor are invalid.
+
+        Returns:
+            Select: The ordered statement.
+        """
+        column_attr = getattr(self.model, order_by, None)
+        if column_attr is None or order_by not in self.model.__table__.columns:
+            detail = f"Invalid order_by column: {order_by}"
+            raise ValueErrorException(detail)
+        columns = (column_attr, self.model.id)
+        if cursor:
+            keyset = tuple_(*columns)
+            values = tuple_(*decode_cursor(cursor, columns))
+            statement = statement.where(keyset < values if desc_order else keyset > values)
+        return statement.order_by(*(desc(column) if desc_order else column for column in columns))
+
+    async def create(self, db: AsyncSession, *, obj_in: ModelType | dict, schema: type[BaseModel] | None = None) -> ModelType:
         """Create a new object in the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             obj_in (ModelType | dict): Object to be created.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the created object.
 
         Returns:
             ModelType: The created object.
         """
         if not isinstance(obj_in, dict):
-            obj_in = jsonable_encoder_exclude_none_and_empty(obj_in)
+            obj_in = dump_exclude_none_and_empty(obj_in)
 
         db_obj = self.model(**obj_in)
 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
-
-    def update(self, db: Session, *, id_pk: int, obj_in: ModelType | dict[str, Any]) -> ModelType:
+        tags = write_tags(db_obj, created=True)
+        await db.flush()  # assigns the ID
+        await self.refresh_derived(db, [db_obj.id])
+        await db.commit()
+        await invalidate(tags)
+        return await self.show(db, id_pk=db_obj.id, schema=schema)
+
+    async def update(self, db: AsyncSession, *, id_pk: UUID, obj_in: ModelType | dict[str, Any], schema: type[BaseModel] | None = None) -> ModelType:
         """Update an existing object in the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             id_pk (UUID): Primary key of the object to be updated.
             obj_in (ModelType | dict[str, Any]): Object data to update.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the updated object.
 
         Returns:
             ModelType: The updated object.
         """
-        obj_old = db.query(self.model).filter(self.model.id == id_pk).first()
+        obj_old = await db.get(self.model, id_pk)
         if not obj_old:
             raise NotFoundException(self.model.__name__)
         update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
         update_data = convert_pydantic_types(update_data)
 
+        tags = write_tags(obj_old)
         for field in vars(obj_old):
             if field in update_data:
                 setattr(obj_old, field, update_data[field])
 
         db.add(obj_old)
-        db.commit()
-        db.refresh(obj_old)
-        return obj_old
+        tags |= write_tags(obj_old)
+        await self.refresh_derived(db, [id_pk])
+        await db.commit()
+        await invalidate(tags)
+        return await self.show(db, id_pk=id_pk, schema=schema)
 
-    def delete(self, db: Session, *, id_pk: int) -> ModelType:
+    async def delete(self, db: AsyncSession, *, id_pk: UUID) -> dict:
         """Delete an object from the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             id_pk (UUID): Primary key of the object to be deleted.
 
         Returns:
-            ModelType: The deleted object.
+            dict: A confirmation message.
         """
-        obj = db.query(self.model).get(id_pk)
-        # obj = obj.one_or_none() if obj else None
+        obj = await db.get(self.model, id_pk)
         if not obj:
             raise NotFoundException(self.model.__name__)
-        db.delete(obj)
-        db.commit()
+        tags = write_tags(obj, deleted=True)
+        await db.delete(obj)
+        await self.refresh_deleted(db, [id_pk])
+        await db.commit()
+        await invalidate(tags)
         return {"message": f"{self.model.__name__} Object with id {id_pk} deleted successfully."}
 
-    def create_query(self, kwargs: dict) -> str:
-        """Create a SQL query string based on the provided keyword arguments.
+    async def bulk_create(self, db: AsyncSession, rows: Sequence[dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> list[dict]:
+        """Create objects by batches, each written with one `INSERT ... RETURNING` and committed on its own.
 
         Args:
-            kwargs (dict): Keyword arguments representing the query conditions.
+            db (AsyncSession): Database session.
+            rows (Sequence[dict[str, Any]]): Data of the objects, their related objects given by foreign key.
+            batch_size (int): Number of rows written per statement and per transaction.
 
         Returns:
-            str: The constructed SQL query string.
+            list[dict]: The result of each row, in order: its `index`, and the `id` of the object or the `error`.
         """
-        x = 0
-        query = ""
-        for key, value in kwargs.items():
-            beginning = "" if x == 0 else " AND"
-            if isinstance(value, list):
-                if len(value[1]) == 1:
-                    query += f"{beginning} {key} {value[0]} ('{value[1][0]}')"
-                else:
-                    query += f"{beginning} {key} {value[0]} {tuple(value[1])}"
-            else:
-                query += f"{beginning} {key} '{value}'"
-            x = 1
-
-        return query
-
-    def create_fields(self, db: Session, model_dict: dict, models_info: dict) -> dict:
+        table = self.model.__table__
+        statement = insert(table).returning(*self.tag_columns(), sort_by_parameter_order=True)
+
+        async def execute(values: list[dict]) -> list[Mapping]:
+            return list((await db.execute(statement, values)).mappings())
+
+        return await self.bulk_write(db, rows, batch_size, self.bulk_values, execute, created=True)
+
+    async def bulk_update(self, db: AsyncSession, rows: Sequence[dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> list[dict]:
+        """Update objects by batches, each written with one executemany UPDATE and committed on its own.
+
+        Args:
+            db (AsyncSession): Database session.
+            rows (Sequence[dict[str, Any]]): The `id` of each object and the fields to update.
+            batch_size (int): Number of rows written per statement and per transaction.
+
+        Returns:
+            list[dict]: The result of each row, in order: its `index`, and the `id` of the object or the `error`.
+        """
+        table = self.model.__table__
+
+        async def execute(values: list[dict]) -> list[Mapping]:
+            # The previous foreign keys are read along with the existence of the rows, for the cache tags
+            existing = list((await db.execute(select(*self.tag_columns()).where(table.c.id.in_([value["id"] for value in values])))).mappings())
+            found = {row["id"] for row in existing}
+            values = [value for value in values if value["id"] in found]
+            if values:
+                await db.execute(update(self.model), values)
+            return existing + values
+
+        return await self.bulk_write(db, rows, batch_size, lambda data: self.bulk_values(data, partial=True), execute)
+
+    async def bulk_delete(self, db: AsyncSession, ids: Sequence[UUID], batch_size: int = BULK_BATCH_SIZE) -> list[dict]:
+        """Delete objects by batches, each with one `DELETE ... RETURNING` committed on its own.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the objects.
+            batch_size (int): Number of rows deleted per statement and per transaction.
+
+        Returns:
+            list[dict]: The result of each row, in order: its `index`, and the `id` of the object or the `error`.
+        """
+        table = self.model.__table__
+        statement = delete(table).returning(*self.tag_columns())
+
+        async def execute(values: list[dict]) -> list[Mapping]:
+            return list((await db.execute(statement.where(table.c.id.in_([value["id"] for value in values])))).mappings())
+
+        return await self.bulk_write(db, ids, batch_size, lambda id_pk: {"id": id_pk}, execute, deleted=True)
+
+    async def bulk_write(
+        self,
+        db: AsyncSession,
+        rows: Sequence[Any],
+        batch_size: int,
+        prepare: Callable[[Any], dict],
+        execute: Callable[[list[dict]], Awaitable[list[Mapping]]],
+        created: bool = False,
+        deleted: bool = False,
+    ) -> list[dict]:
+        """Write rows by batches, one transaction per batch, reporting the outcome of each row.
+
+        A row that cannot be written does not fail the others: when the statement of a batch fails, the batch
+        is written again row by row, each in a savepoint, so that only the failing rows are left out.
+
+        Args:
+            db (AsyncSession): Database session.
+            rows (Sequence[Any]): The rows given to the bulk method.
+            batch_size (int): Number of rows per batch.
+            prepare (Callable[[Any], dict]): Converts a row into the values of the statement, with its `id`.
+                Raises ValueError for an invalid row.
+            execute (Callable[[list[dict]], Awaitable[list[Mapping]]]): Writes values, and returns the `id` and
+                foreign keys of the rows written.
+            created (bool): Whether the rows are created.
+            deleted (bool): Whether the rows are deleted.
+
+        Returns:
+            list[dict]: The result of each row, in order: its `index`, and the `id` of the object or the `error`.
+        """
+        results = [{"index": index} for index in range(len(rows))]
+        for start in range(0, len(rows), batch_size):
+            batch = {}
+            for index in range(start, min(start + batch_size, len(rows))):
+                try:
+                    batch[index] = prepare(rows[index])
+                except ValueError as error:  # noqa: PERF203
+                    results[index]["error"] = str(error)
+            written = await self.write_batch(db, batch, execute, results)
+            ids = {row["id"] for row in written}
+            for index, values in batch.items():
+                if "error" not in results[index]:
+                    if values["id"] in ids:
+                        results[index]["id"] = values["id"]
+                    else:
+                        results[index]["error"] = f"{self.model.__name__} not found"
+            tags = set().union(*(row_write_tags(self.model, row, created=created, deleted=deleted) for row in written))
+            if ids and deleted:
+                await self.refresh_deleted(db, list(ids))
+            elif ids:
+                await self.refresh_derived(db, list(ids))
+            await db.commit()
+            await invalidate(tags)
+        return results
+
+    async def write_batch(
+        self, db: AsyncSession, batch: dict[int, dict], execute: Callable[[list[dict]], Awaitable[list[Mapping]]], results: list[dict]
+    ) -> list[Mapping]:
+        """Write a batch in a savepoint, or row by row if it fails, recording the error of each failing row.
+
+        Args:
+            db (AsyncSession): Database session.
+            batch (dict[int, dict]): The values of the rows, by index.
+            execute (Callable[[list[dict]], Awaitable[list[Mapping]]]): Writes values, and returns the rows written.
+            results (list[dict]): The results of the rows, updated with the errors.
+
+        Returns:
+            list[Mapping]: The rows written.
+        """
+        if not batch:
+            return []
+        with contextlib.suppress(DBAPIError):
+            async with db.begin_nested():
+                return await execute(list(batch.values()))
+        written = []
+        for index, values in batch.items():
+            try:
+                async with db.begin_nested():
+                    written.extend(await execute([values]))
+            except DBAPIError as error:  # noqa: PERF203
+                results[index]["error"] = str(error.orig)
+        return written
+
+    def bulk_values(self, data: dict[str, Any], partial: bool = False) -> dict[str, Any]:
+        """Convert the data of an object into the values of its columns, for the bulk writes.
+
+        The object is built through the model, so that the columns it derives (e.g. the `geom` of an image)
+        are set. New objects get every column, set to its default when not given, so that all the rows of a
+        batch fit the same INSERT.
+
+        Args:
+            data (dict[str, Any]): The data of the object.
+            partial (bool): Whether only the given fields are written, for an update.
+
+        Raises:
+            ValueError: If the data holds related objects, unknown fields or an invalid ID.
+
+        Returns:
+            dict[str, Any]: The values of the columns.
+        """
+        mapper = inspect(self.model)
+        for key in data:
+            if key in mapper.relationships:
+                msg = f"Field '{key}' is not supported by bulk writes, give the ID of the related object instead"
+                raise ValueError(msg)
+            if key not in mapper.columns or mapper.columns[key].computed is not None:
+                msg = f"Unknown field '{key}'"
+                raise ValueError(msg)
+        obj = self.model(**data)
+        values = {column.key: obj.__dict__[column.key] for column in mapper.columns if column.key in obj.__dict__}
+        if "id" in values:
+            # The rows written are matched back to their index by ID, as RETURNING gives them
+            values["id"] = UUID(str(values["id"]))
+        if partial:
+            if "updated_at" in mapper.columns:
+                values["updated_at"] = utcnow()
+            return values
+        # Generated columns (e.g. the `geom` of an annotation) are computed by the database
+        columns = [column for column in mapper.columns if column.computed is None]
+        return {column.key: values[column.key] if column.key in values else column_default(column) for column in columns}
+
+    def tag_columns(self) -> list[Column]:
+        """Return the columns the cache tags of a written row are computed from: its ID and foreign keys.
+
+        Returns:
+            list[Column]: The columns.
+        """
+        table = self.model.__table__
+        return [table.c.id, *(column for column in table.columns if column.foreign_keys)]
+
+    async def refresh_derived(self, db: AsyncSession, ids: Sequence[UUID]) -> None:
+        """Recompute the rows derived from the written objects, before the write is committed.
+
+        Nothing is derived from most models; see `CRUDImage` and `CRUDImageSet` for the `effective_images` table.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the objects created or updated.
+        """
+
+    async def refresh_deleted(self, db: AsyncSession, ids: Sequence[UUID]) -> None:
+        """Recompute the rows derived from the deleted objects, before the delete is committed.
+
+        The rows derived from a deleted image or image_set are deleted with it; see `CRUDImageCreator` for the creators.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the objects deleted.
+        """
+
+    async def create_fields(self, db: AsyncSession, model_dict: dict, models_info: dict) -> dict:
         """Create fields for the image_set.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             model_dict (dict): The image_set dictionary to update.
             models_info (dict): Dictionary containing the CRUD and schema information for each field.
 
@@ -185,26 +541,35 @@ class CRUDBase(Generic[ModelType]):
                     if data_type is list:
                         items = []
                         for item in new_value:
-                            new_item = self.get_or_create(db, value["crud"], value.get("unique"), item)
+                            new_item = await self.get_or_create(db, value["crud"], value.get("unique"), item)
                             items.append(new_item)
                         model_dict[key] = items
                     else:
-                        new_item = self.get_or_create(db, value["crud"], value.get("unique"), new_value)
+                        new_item = await self.get_or_create(db, value["crud"], value.get("unique"), new_value)
                         model_dict[key] = new_item
                         if f"{key}_id" in model_dict:
                             del model_dict[f"{key}_id"]
 
         return model_dict
 
-    def add_creator(self, db: Session, crud: ModelType, item_id: UUID, creator_id: UUID | None = None, creator: CreatorSchema | None = None) -> Image:
+    async def add_creator(
+        self,
+        db: AsyncSession,
+        crud: ModelType,
+        item_id: UUID,
+        creator_id: UUID | None = None,
+        creator: CreatorSchema | None = None,
+        schema: type[BaseModel] | None = None,
+    ) -> Image:
         """Add a creator to a image, image_set or annotation_set.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             crud (ModelType): The CRUD object for image creators.
             item_id (UUID): The ID of the image.
             creator_id (UUID): The ID of the creator to add.
             creator (CreatorSchema): The creator object to add.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the updated object.
 
         Returns:
             ModelType: The updated model with the new creator.
@@ -216,46 +581,242 @@ class CRUDBase(Generic[ModelType]):
             msg = "Only one of creator_id or creator should be provided."
             raise ValueErrorException(msg)
         if creator:
-            creator = jsonable_encoder_exclude_none_and_empty(creator)
-            db_creator = self.get_or_create(db, crud, "name", creator)
+            creator = dump_exclude_none_and_empty(creator)
+            db_creator = await self.get_or_create(db, crud, "name", creator)
         else:
-            db_creator = crud.show(db, id_pk=creator_id)
+            db_creator = await crud.show(db, id_pk=creator_id)
         if not db_creator:
             raise NotFoundException(Creator.__name__)
-        db_item = self.show(db=db, id_pk=item_id)
+        db_item = await self.show(db=db, id_pk=item_id, options=[selectinload(self.model.creators)])
         if not db_item:
             raise NotFoundException(self.model.__name__)
         if db_creator in db_item.creators:
             msg = "Creator already exists in the image."
             raise ValueErrorException(msg)
         db_item.creators.append(db_creator)
-        db.commit()
-        db.refresh(db_item)
-        return db_item
-
-    def get_or_create(self, db: Session, crud: ModelType, unique: str | None, data: dict[str, any]) -> ModelType | None:
+        await self.refresh_derived(db, [item_id])
+        await db.commit()
+        await invalidate({row_tag(self.model.__tablename__, item_id), list_tag(Creator.__tablename__)})
+        return await self.show(db=db, id_pk=item_id, schema=schema)
+
+    async def get_or_create(
+        self, db: AsyncSession, crud: ModelType, unique: str | None, data: dict[str, any], cache: "GetOrCreateCache | None" = None
+    ) -> ModelType | None:
         """Helper to get or create an object in the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             crud (ModelType): The CRUD object to use for the operation.
             unique (str | None): Unique field to check for existing objects.
             data (dict[str, any]): Data to be used for creating or finding the object.
+            cache (GetOrCreateCache | None): Optional cache of the objects already found or created by the current import.
 
         Returns:
             ModelType | None: The found or created object.
         """
         instance = None
         model = crud.model
+        if unique and cache is not None:
+            instance = cache.get(model, data.get(unique))
+            if instance is not None:
+                return instance
         if unique:
-            instance = db.query(model).filter(getattr(model, unique) == data.get(unique)).first()
+            instance = (await db.execute(select(model).where(getattr(model, unique) == data.get(unique)))).scalars().first()
         if not instance:
             instance = model(**data)
             db.add(instance)
-            db.flush()
+            await db.flush()
+        if unique and cache is not None:
+            cache.add(model, data.get(unique), instance)
         return instance
 
 
+class GetOrCreateCache:
+    """Identity cache of the objects used by `CRUDBase.get_or_create`, keyed by (model, unique value).
+
+    It is meant to live for a single import: `prefetch` resolves all the values of a batch with one query per
+    model and one batched INSERT for the missing ones, after which `get_or_create` is served from memory.
+    """
+
+    def __init__(self):
+        self._instances: dict[tuple[type[Base], Any], Base] = {}
+
+    def get(self, model: type[Base], value: Any) -> Base | None:  # noqa: ANN401
+        """Return the cached object of the model with the given unique value.
+
+        Args:
+            model (type[Base]): The model of the object.
+            value (Any): The value of its unique field.
+
+        Returns:
+            Base | None: The object if it is cached, otherwise None.
+        """
+        return self._instances.get((model, value))
+
+    def add(self, model: type[Base], value: Any, instance: Base) -> None:  # noqa: ANN401
+        """Cache an object of the model under its unique value.
+
+        Args:
+            model (type[Base]): The model of the object.
+            value (Any): The value of its unique field.
+            instance (Base): The object to cache.
+        """
+        self._instances[(model, value)] = instance
+
+    async def prefetch(self, db: AsyncSession, crud: ModelType, unique: str, items: list[dict[str, Any]]) -> None:
+        """Load or create the objects for all the given items at once.
+
+        Args:
+            db (AsyncSession): Database session.
+            crud (ModelType): The CRUD object of the model.
+            unique (str): Unique field used to match the items with existing objects.
+            items (list[dict[str, Any]]): Data of the objects, as given to `CRUDBase.get_or_create`.
+        """
+        model = crud.model
+        pending = {}
+        for item in items:
+            value = item.get(unique)
+            if value is not None and (model, value) not in self._instances:
+                pending.setdefault(value, item)
+        if not pending:
+            return
+
+        column = getattr(model, unique)
+        values = bindparam("values", list(pending), type_=ARRAY(String))
+        for instance in (await db.execute(select(model).where(column == any_(values)))).scalars():
+            self.add(model, getattr(instance, unique), instance)
+
+        missing = [model(**item) for value, item in pending.items() if (model, value) not in self._instances]
+        if missing:
+            db.add_all(missing)
+            await db.flush()
+            for instance in missing:
+                self.add(model, getattr(instance, unique), instance)
+
+
+def encode_cursor(values: tuple) -> str:
+    """Encode the keyset values of the last object of a page into an opaque cursor.
+
+    Args:
+        values (tuple): The values of the ordering columns.
+
+    Returns:
+        str: The cursor.
+    """
+    payload = json.dumps(jsonable_encoder(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> tuple:
+    """Decode a cursor created by `encode_cursor` into the values of the given columns.
+
+    Args:
+        cursor (str): The cursor.
+        columns (tuple): The ordering columns.
+
+    Raises:
+        ValueErrorException: If the cursor is not valid for these columns.
+
+    Returns:
+        tuple: The keyset values.
+    """
+    msg = "Invalid cursor."
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return tuple(parse_column_value(column, value) for column, value in zip(columns, values, strict=True))
+    except (TypeError, ValueError) as error:
+        raise ValueErrorException(msg) from error
+
+
+def parse_column_value(column: Any, value: Any) -> Any:  # noqa: ANN401
+    """Convert a JSON value back to the Python type of the column.
+
+    Args:
+        column (Any): The column attribute.
+        value (Any): The JSON value.
+
+    Returns:
+        Any: The converted value.
+    """
+    python_type = column.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    return python_type(value)
+
+
+@cache
+def loader_options(model: type[Base], schema: type[BaseModel] | None) -> tuple:
+    """Build the loader profile of the relationships of the model that the schema serializes.
+
+    Many-to-one relationships are loaded with `joinedload`, in the same statement as their parent, and
+    collections (or association proxies) with `selectinload`, one statement per relationship whatever the
+    number of parents. The nested schemas are followed recursively, and every other relationship is set to
+    `raiseload`, so that serializing the result can not fall back to one lazy load per object.
+
+    Args:
+        model (type[Base]): The model being queried.
+        schema (type[BaseModel] | None): The schema the result is serialized with.
+
+    Returns:
+        tuple: The loader options, empty when no schema is given.
+    """
+    if schema is None:
+        return ()
+    mapper = inspect(model)
+    options = []
+    for name, field in schema.model_fields.items():
+        nested_schema = schema_of(field.annotation)
+        if name in mapper.relationships:
+            relationship = mapper.relationships[name]
+            load = selectinload(getattr(model, name)) if relationship.uselist else joinedload(getattr(model, name))
+            options.append(load.options(*loader_options(relationship.mapper.class_, nested_schema)))
+        elif isinstance(mapper.all_orm_descriptors.get(name), AssociationProxy):
+            proxy = getattr(model, name)
+            target = proxy.target_class
+            load = selectinload(getattr(model, proxy.target_collection)).selectinload(getattr(target, proxy.value_attr))
+            related = inspect(target).relationships[proxy.value_attr].mapper.class_
+            options.append(load.options(*loader_options(related, nested_schema)))
+    options.append(raiseload("*"))
+    return tuple(options)
+
+
+def schema_of(annotation: Any) -> type[BaseModel] | None:  # noqa: ANN401
+    """Return the pydantic model of a field annotation, looking inside `list[...]`, `Optional` and unions.
+
+    Args:
+        annotation (Any): The annotation of the field.
+
+    Returns:
+        type[BaseModel] | None: The pydantic model, or None if the field does not hold one.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) in (list, Union, types.UnionType):
+        for argument in get_args(annotation):
+            nested_schema = schema_of(argument)
+            if nested_schema is not None:
+                return nested_schema
+    return None
+
+
+def column_default(column: Column) -> Any:  # noqa: ANN401
+    """Return the value of the Python-side default of a column.
+
+    Args:
+        column (Column): The column.
+
+    Returns:
+        Any: The default value, None if the column has none.
+    """
+    if column.default is None:
+        return None
+    if column.default.is_callable:
+        return column.default.arg(None)
+    return column.default.arg
+
+
 def convert_pydantic_types(data: dict[str, Any]) -> dict[str, Any]:
     """Convert Pydantic-specific types to native Python types.
 
@@ -280,14 +841,21 @@ def convert_pydantic_types(data: dict[str, Any]) -> dict[str, Any]:
     return converted
 
 
-def jsonable_encoder_exclude_none_and_empty(obj: BaseModel) -> dict[str, Any]:
+def dump_exclude_none_and_empty(obj: BaseModel) -> dict[str, Any]:
     """Convert a Pydantic model to a JSON-serializable dictionary, excluding None and empty values.
 
+    The model is dumped in one pass by pydantic-core, to the same values as `jsonable_encoder` gives.
+
     Args:
         obj (BaseModel): The Pydantic model to convert.
 
     Returns:
         dict[str, Any]: A dictionary representation of the model with None and empty values excluded.
     """
-    data = jsonable_encoder(obj, exclude_none=True)
+    data = obj.model_dump(mode="json", exclude_none=True)
+    # asyncpg only binds datetime objects to the (naive, UTC) timestamp columns, not their ISO strings
+    for key in data:
+        value = getattr(obj, key, None)
+        if isinstance(value, datetime.datetime):
+            data[key] = value.astimezone(datetime.timezone.utc).replace(tzinfo=None) if value.tzinfo else value
     return {k: v for k, v in data.items() if v != []}
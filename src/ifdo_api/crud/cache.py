@@ -0,0 +1,225 @@
+"""Tags of the cached responses, and their invalidation by the writes of the CRUD objects.
+
+Cached responses are stored by `ifdo_api.api.cache` in the Redis backend initialised by `FastAPICache`. Each one
+is registered under tags naming the rows and tables it was built from, and a write invalidates the tags of what
+it changed:
+
+- `<table>:<id>`: responses holding the row, as the object of a show route or an item of an index page.
+- `<table>:list`: index responses, whose pages change when rows are created, updated or deleted.
+- `<table>:ref`: responses embedding rows of the table through a many-to-one or many-to-many relationship.
+- `<table>:*`: every response of the table, dropped when rows may have been deleted by a cascade.
+
+Rows embedded through a one-to-many relationship (the images of an image_set) are not tagged by table: a write
+on the child invalidates the row tag of its parent instead, so that only the image_set holding the image is dropped.
+"""
+
+import logging
+import os
+from collections.abc import Iterable
+from collections.abc import Mapping
+from typing import Any
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis.exceptions import RedisError
+from sqlalchemy import inspect
+from sqlalchemy.orm import MANYTOONE
+from sqlalchemy.orm import ONETOMANY
+from ifdo_api.models.base import Base
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "responses"
+DEFAULT_CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+
+# Time to live of the cached responses of each table, in seconds, overridden with CACHE_TTL_<TABLE>
+CACHE_TTLS = {
+    "image_sets": DEFAULT_CACHE_TTL,
+    "images": DEFAULT_CACHE_TTL,
+    "annotation_sets": DEFAULT_CACHE_TTL,
+    "annotations": 60,
+    "annotation_labels": 60,
+    "annotators": 3600,
+    "labels": 3600,
+}
+FIELDS_CACHE_TTL = 3600
+
+
+def cache_ttl(table: str) -> int:
+    """Return the time to live of the cached responses of a table.
+
+    Args:
+        table (str): Name of the table.
+
+    Returns:
+        int: The time to live, in seconds. Fields (contexts, projects, ...) rarely change and default to an hour.
+    """
+    return int(os.getenv(f"CACHE_TTL_{table.upper()}", CACHE_TTLS.get(table, FIELDS_CACHE_TTL)))
+
+
+# Tag sets outlive every entry they hold, so that no entry can escape an invalidation
+TAG_TTL = max(FIELDS_CACHE_TTL, *CACHE_TTLS.values(), *(int(value) for name, value in os.environ.items() if name.startswith("CACHE_TTL")))
+
+
+def row_tag(table: str, id_pk: Any) -> str:  # noqa: ANN401
+    """Tag of the responses holding a row."""
+    return f"{table}:{id_pk}"
+
+
+def list_tag(table: str) -> str:
+    """Tag of the index responses of a table."""
+    return f"{table}:list"
+
+
+def ref_tag(table: str) -> str:
+    """Tag of the responses embedding rows of a table."""
+    return f"{table}:ref"
+
+
+def table_tag(table: str) -> str:
+    """Tag of every response of a table."""
+    return f"{table}:*"
+
+
+def cache_backend() -> RedisBackend | None:
+    """Return the Redis backend of the cache.
+
+    Returns:
+        RedisBackend | None: The backend, or None if the cache is disabled or not initialised.
+    """
+    if not FastAPICache.get_enable():
+        return None
+    try:
+        backend = FastAPICache.get_backend()
+    except AssertionError:
+        return None
+    return backend if isinstance(backend, RedisBackend) else None
+
+
+def tag_key(tag: str) -> str:
+    """Return the Redis key of the set holding the cache keys registered under a tag.
+
+    Args:
+        tag (str): The tag.
+
+    Returns:
+        str: The Redis key.
+    """
+    return f"{FastAPICache.get_prefix()}:{CACHE_NAMESPACE}:tag:{tag}"
+
+
+def write_tags(obj: Base, created: bool = False, deleted: bool = False) -> set[str]:
+    """Return the tags invalidated by a write on an object.
+
+    Call it before the commit: the object is detached once deleted, and an update may change its parents.
+
+    Args:
+        obj (Base): The created, updated or deleted object.
+        created (bool): Whether the object is new, so that no response holds it yet.
+        deleted (bool): Whether the object is deleted, which may cascade to the rows referencing it.
+
+    Returns:
+        set[str]: The tags.
+    """
+    return row_write_tags(type(obj), {**obj.__dict__, "id": obj.id}, created=created, deleted=deleted)
+
+
+def row_write_tags(model: type[Base], values: Mapping[str, Any], created: bool = False, deleted: bool = False) -> set[str]:
+    """Return the tags invalidated by a write on a row, given by the values of its columns.
+
+    Args:
+        model (type[Base]): The model of the row.
+        values (Mapping[str, Any]): The values of the columns of the row, by attribute name.
+        created (bool): Whether the row is new, so that no response holds it yet.
+        deleted (bool): Whether the row is deleted, which may cascade to the rows referencing it.
+
+    Returns:
+        set[str]: The tags.
+    """
+    mapper = inspect(model)
+    table = mapper.local_table.name
+    tags = {list_tag(table)}
+    if not created:
+        tags |= {row_tag(table, values.get("id")), ref_tag(table)}
+    for relationship in mapper.relationships:
+        target = relationship.mapper.local_table.name
+        if relationship.direction is MANYTOONE:
+            for column in relationship.local_columns:
+                value = values.get(mapper.get_property_by_column(column).key)
+                if value is not None:
+                    tags.add(row_tag(target, value))
+        elif deleted and relationship.direction is ONETOMANY:
+            tags.add(table_tag(target))
+    return tags
+
+
+def models_info_tags(models_info: dict) -> set[str]:
+    """Return the tags invalidated by the fields (contexts, creators, ...) that `create_fields` may create.
+
+    Args:
+        models_info (dict): Dictionary containing the CRUD and schema information for each field.
+
+    Returns:
+        set[str]: The list tags of the tables of the fields.
+    """
+    return {list_tag(value["crud"].model.__tablename__) for value in models_info.values()}
+
+
+async def lookup(key: str) -> bytes | None:
+    """Return a cached response.
+
+    Args:
+        key (str): The cache key.
+
+    Returns:
+        bytes | None: The response body, or None on a miss.
+    """
+    backend = cache_backend()
+    if backend is None:
+        return None
+    try:
+        return await backend.get(key)
+    except RedisError:
+        logger.warning("Error retrieving cache key '%s'", key, exc_info=True)
+        return None
+
+
+async def register(key: str, value: bytes, tags: Iterable[str], expire: int) -> None:
+    """Store a cached response and register its key under its tags.
+
+    Args:
+        key (str): The cache key.
+        value (bytes): The response body.
+        tags (Iterable[str]): The tags of the response.
+        expire (int): Time to live of the entry, in seconds.
+    """
+    backend = cache_backend()
+    if backend is None:
+        return
+    try:
+        async with backend.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, value, ex=expire)
+            for tag in tags:
+                pipe.sadd(tag_key(tag), key)
+                pipe.expire(tag_key(tag), TAG_TTL)
+            await pipe.execute()
+    except RedisError:
+        logger.warning("Error setting cache key '%s'", key, exc_info=True)
+
+
+async def invalidate(tags: Iterable[str]) -> None:
+    """Drop the cached responses registered under any of the tags.
+
+    Errors are logged rather than raised, as the write they follow is already committed.
+
+    Args:
+        tags (Iterable[str]): The tags to invalidate.
+    """
+    backend = cache_backend()
+    keys = [tag_key(tag) for tag in tags]
+    if backend is None or not keys:
+        return
+    try:
+        members = await backend.redis.sunion(keys)
+        await backend.redis.delete(*members, *keys)
+    except RedisError:
+        logger.warning("Error invalidating cache tags %s", keys, exc_info=True)
@@ -0,0 +1,91 @@
+"""Maintenance of the `effective_images` table, the images merged with their image_set.
+
+The merge of `Image.to_merged_dict` is computed in SQL, with `COALESCE(images.<field>, image_sets.<field>)` over
+the join of the two tables. `CRUDImage.merged` reads it on the fly, and the CRUD objects write it into
+`effective_images` for the images they touch, in the transaction of the write.
+"""
+
+from sqlalchemy import ARRAY
+from sqlalchemy import Column
+from sqlalchemy import ColumnElement
+from sqlalchemy import Enum
+from sqlalchemy import String
+from sqlalchemy import func
+from sqlalchemy import literal_column
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import Insert
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.models.effective_image import effective_images
+from ifdo_api.models.image import Image
+from ifdo_api.models.image import image_creators
+from ifdo_api.models.image import merged_fields
+from ifdo_api.models.image_set import ImageSet
+from ifdo_api.models.image_set import image_set_creators
+
+
+def unset_to_null(column: Column) -> ColumnElement:
+    """Turn the values `Image.get_merged_field` treats as unset (empty strings, arrays and objects) into NULL.
+
+    Args:
+        column (Column): A column of the `images` table.
+
+    Returns:
+        ColumnElement: The column, NULL where it is unset.
+    """
+    if isinstance(column.type, String) and not isinstance(column.type, Enum):
+        return func.nullif(column, "", type_=column.type)
+    if isinstance(column.type, ARRAY):
+        return func.nullif(column, literal_column("'{}'"), type_=column.type)
+    if isinstance(column.type, JSONB):
+        return func.nullif(func.nullif(column, literal_column("'{}'::jsonb")), literal_column("'[]'::jsonb"), type_=column.type)
+    return column
+
+
+def merged_image_columns() -> list[ColumnElement]:
+    """Build the columns of the images merged with their image_set, as `Image.to_merged_dict` in SQL.
+
+    Returns:
+        list[ColumnElement]: The columns, labelled as in `Image.to_merged_dict`, `creators` holding the IDs of the creators.
+    """
+    columns = [Image.id, Image.name, Image.image_set_id, Image.created_at, Image.updated_at]
+    for field in merged_fields:
+        if field == "creators":
+            own = func.array(select(image_creators.c.creator_id).where(image_creators.c.image_id == Image.id).scalar_subquery())
+            inherited = func.array(select(image_set_creators.c.creator_id).where(image_set_creators.c.image_set_id == ImageSet.id).scalar_subquery())
+            columns.append(func.coalesce(func.nullif(own, literal_column("'{}'")), inherited).label(field))
+        elif field in ImageSet.__table__.columns:
+            columns.append(func.coalesce(unset_to_null(Image.__table__.c[field]), ImageSet.__table__.c[field]).label(field))
+        else:
+            columns.append(Image.__table__.c[field])
+    return columns
+
+
+merged_columns = merged_image_columns()
+
+
+def refresh_statement(*where: ColumnElement) -> Insert:
+    """Build the upsert of the merged images matching the conditions into `effective_images`.
+
+    Args:
+        *where (ColumnElement): Conditions on the images, or on the image_sets they belong to.
+
+    Returns:
+        Insert: The `INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE` statement.
+    """
+    names = ["creator_ids" if column.key == "creators" else column.key for column in merged_columns]
+    rows = select(*merged_columns).outerjoin(ImageSet, Image.image_set_id == ImageSet.id).where(*where)
+    statement = insert(effective_images).from_select(names, rows)
+    return statement.on_conflict_do_update(index_elements=[effective_images.c.id], set_={name: statement.excluded[name] for name in names[1:]})
+
+
+async def refresh_effective_images(db: AsyncSession, *where: ColumnElement) -> None:
+    """Recompute the effective metadata of the images matching the conditions, in the current transaction.
+
+    Args:
+        db (AsyncSession): Database session, flushed so that the pending writes are seen.
+        *where (ColumnElement): Conditions on the images, or on the image_sets they belong to.
+    """
+    await db.flush()
+    await db.execute(refresh_statement(*where))
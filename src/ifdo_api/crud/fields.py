@@ -1,6 +1,12 @@
 """This module implements the CRUD for the Fields model."""
 
+from collections.abc import Sequence
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ifdo_api.crud.base import CRUDBase
+from ifdo_api.crud.effective_image import refresh_effective_images
+from ifdo_api.models.effective_image import effective_images
 from ifdo_api.models.fields import PI
 from ifdo_api.models.fields import Context
 from ifdo_api.models.fields import Creator
@@ -16,6 +22,7 @@ from ifdo_api.models.fields import Platform
 from ifdo_api.models.fields import Project
 from ifdo_api.models.fields import RelatedMaterial
 from ifdo_api.models.fields import Sensor
+from ifdo_api.models.image import Image
 
 
 class CRUDImageContext(CRUDBase[Context]):
@@ -73,6 +80,16 @@ class CRUDImageCreator(CRUDBase[Creator]):
         CRUDBase (ModelType): Base class for CRUD operations.
     """
 
+    async def refresh_deleted(self, db: AsyncSession, ids: Sequence[UUID]) -> None:
+        """Recompute the `effective_images` rows listing the deleted creators, which have no foreign key to them.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the creators deleted.
+        """
+        listing = select(effective_images.c.id).where(effective_images.c.creator_ids.overlap(list(ids)))
+        await refresh_effective_images(db, Image.id.in_(listing))
+
 
 class CRUDImageLicense(CRUDBase[License]):
     """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -0,0 +1,281 @@
+"""Typed filters of the index endpoints, compiled to bound SQLAlchemy expressions."""
+
+import datetime
+import enum
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from functools import partial
+from typing import Any
+from geoalchemy2 import Geography
+from pydantic import BaseModel
+from shapely import wkt
+from shapely.errors import ShapelyError
+from sqlalchemy import ColumnElement
+from sqlalchemy import and_
+from sqlalchemy import any_
+from sqlalchemy import bindparam
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import ARRAY
+from ifdo_api.api.exceptions import ValueErrorException
+from ifdo_api.models.base import Base
+
+FILTER_SEPARATOR = "__"
+LIST_SEPARATOR = ","
+
+
+class FilterOperator(str, enum.Enum):
+    """Operators of the filters, given as `<field>__<operator>=<value>` (`<field>=<value>` for eq)."""
+
+    eq = "eq"
+    in_ = "in"
+    range = "range"
+    prefix = "prefix"
+    null = "null"
+    bbox = "bbox"
+    dwithin = "dwithin"
+    intersects = "intersects"
+
+
+SPATIAL_OPERATORS = (FilterOperator.bbox, FilterOperator.dwithin, FilterOperator.intersects)
+
+
+class Filter(BaseModel):
+    """A filter on a column of the model, with its value already converted to the type of the column."""
+
+    field: str
+    operator: FilterOperator
+    value: Any = None
+
+
+def parse_filters(model: type[Base], params: Iterable[tuple[str, str]], reserved: Iterable[str] = ()) -> list[Filter]:
+    """Parse query parameters into typed filters on the columns of the model.
+
+    Values are given as strings: `in` takes a comma-separated list, `range` a "min,max" pair where either bound
+    may be empty and `null` a boolean. On geometry columns, `bbox` takes a "min_lon,min_lat,max_lon,max_lat"
+    envelope, `dwithin` a "lon,lat,meters" circle and `intersects` a WKT polygon, all in WGS84.
+
+    Args:
+        model (type[Base]): The model being filtered.
+        params (Iterable[tuple[str, str]]): The query parameters, as (name, value) pairs.
+        reserved (Iterable[str]): Parameters of the route that are not filters.
+
+    Raises:
+        ValueErrorException: If a parameter does not name a column and operator, or its value does not match the column type.
+
+    Returns:
+        list[Filter]: The filters.
+    """
+    columns = filterable_columns(model)
+    reserved = set(reserved)
+    filters = []
+    for name, raw in params:
+        if name in reserved:
+            continue
+        field, _, operator_name = name.partition(FILTER_SEPARATOR)
+        try:
+            operator = FilterOperator(operator_name or FilterOperator.eq.value)
+        except ValueError as error:
+            msg = f"Invalid filter operator: {operator_name}"
+            raise ValueErrorException(msg) from error
+        if field not in columns:
+            msg = f"Invalid filter field: {field}"
+            raise ValueErrorException(msg)
+        filters.append(Filter(field=field, operator=operator, value=parse_filter_value(columns[field], operator, raw)))
+    return filters
+
+
+def compile_filters(model: type[Base], filters: Sequence[Filter]) -> list[ColumnElement]:
+    """Compile the filters into SQL expressions with bound parameters.
+
+    Every value is sent as a bound parameter and `in` lists as a single array parameter (`= ANY(:values)`),
+    so the SQL text of a query only depends on the fields and operators used, and its prepared plan is reused.
+
+    Args:
+        model (type[Base]): The model being filtered.
+        filters (Sequence[Filter]): The filters, as returned by `parse_filters`.
+
+    Returns:
+        list[ColumnElement]: The filter expressions, to be combined with AND.
+    """
+    expressions = []
+    for item in filters:
+        column = getattr(model, item.field)
+        if item.operator == FilterOperator.eq:
+            expressions.append(column == item.value)
+        elif item.operator == FilterOperator.in_:
+            expressions.append(column == any_(bindparam(None, item.value, type_=ARRAY(column.type))))
+        elif item.operator == FilterOperator.range:
+            lower, upper = item.value
+            bounds = [column >= lower] if lower is not None else []
+            bounds += [column <= upper] if upper is not None else []
+            expressions.append(and_(*bounds))
+        elif item.operator == FilterOperator.prefix:
+            expressions.append(column.startswith(item.value, autoescape=True))
+        elif item.operator == FilterOperator.null:
+            expressions.append(column.is_(None) if item.value else column.is_not(None))
+        elif item.operator == FilterOperator.bbox:
+            expressions.append(func.ST_Intersects(column, func.ST_MakeEnvelope(*item.value, 4326)))
+        elif item.operator == FilterOperator.dwithin:
+            longitude, latitude, meters = item.value
+            point = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326)
+            # Distances are measured in meters on the geography, so the column is cast as the expression GiST
+            # indexes of the geometry columns are (e.g. `idx_images_geom_geography`), which lets them serve the filter
+            expressions.append(func.ST_DWithin(cast(column, Geography(srid=4326)), cast(point, Geography(srid=4326)), meters))
+        elif item.operator == FilterOperator.intersects:
+            expressions.append(func.ST_Intersects(column, func.ST_GeomFromText(item.value, 4326)))
+    return expressions
+
+
+def filterable_columns(model: type[Base]) -> Mapping[str, Any]:
+    """Return the columns of the model that can be filtered on, by attribute name.
+
+    Args:
+        model (type[Base]): The model.
+
+    Returns:
+        Mapping[str, Any]: The column of each attribute.
+    """
+    return {attribute.key: attribute.columns[0] for attribute in inspect(model).column_attrs}
+
+
+def parse_filter_value(column: Any, operator: FilterOperator, raw: str) -> Any:  # noqa: ANN401
+    """Convert the raw value of a filter for the given column and operator.
+
+    Args:
+        column (Any): The column being filtered.
+        operator (FilterOperator): The operator of the filter.
+        raw (str): The value from the query string.
+
+    Raises:
+        ValueErrorException: If the value is not valid for the column and operator.
+
+    Returns:
+        Any: The converted value.
+    """
+    is_geometry = getattr(column.type, "geometry_type", None) is not None
+    is_text = not is_geometry and column.type.python_type is str
+    if (operator in SPATIAL_OPERATORS) != is_geometry or (operator == FilterOperator.prefix and not is_text):
+        msg = f"The {operator.value} filter can not be used on {column.key}"
+        raise ValueErrorException(msg)
+    try:
+        if operator == FilterOperator.null:
+            return parse_bool(raw)
+        if operator in SPATIAL_OPERATORS:
+            return SPATIAL_PARSERS[operator](raw)
+        if operator == FilterOperator.prefix:
+            return raw
+        python_type = column.type.python_type
+        if operator == FilterOperator.in_:
+            return [parse_scalar(python_type, value) for value in raw.split(LIST_SEPARATOR)]
+        if operator == FilterOperator.range:
+            lower, upper = raw.split(LIST_SEPARATOR)
+            return (parse_scalar(python_type, lower) if lower else None, parse_scalar(python_type, upper) if upper else None)
+        return parse_scalar(python_type, raw)
+    except (NotImplementedError, TypeError, ValueError, ShapelyError) as error:
+        msg = f"Invalid value for the {operator.value} filter on {column.key}: {raw}"
+        raise ValueErrorException(msg) from error
+
+
+def parse_scalar(python_type: type, raw: str) -> Any:  # noqa: ANN401
+    """Convert a raw value to the Python type of a column.
+
+    Args:
+        python_type (type): The Python type of the column.
+        raw (str): The raw value.
+
+    Returns:
+        Any: The converted value.
+    """
+    if python_type is bool:
+        return parse_bool(raw)
+    if python_type is datetime.datetime:
+        value = datetime.datetime.fromisoformat(raw)
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    if python_type is dict or python_type is list:
+        raise TypeError
+    return python_type(raw)
+
+
+def parse_floats(raw: str, count: int) -> list[float]:
+    """Convert a raw comma-separated list of numbers, like a "min_lon,min_lat,max_lon,max_lat" envelope.
+
+    Args:
+        raw (str): The raw list.
+        count (int): The expected number of values.
+
+    Raises:
+        ValueError: If the value does not hold `count` numbers.
+
+    Returns:
+        list[float]: The numbers.
+    """
+    values = [float(value) for value in raw.split(LIST_SEPARATOR)]
+    if len(values) != count:
+        raise ValueError(raw)
+    return values
+
+
+def parse_distance(raw: str) -> list[float]:
+    """Convert a raw "lon,lat,meters" circle.
+
+    Args:
+        raw (str): The raw circle.
+
+    Raises:
+        ValueError: If the value is not three numbers with a positive distance.
+
+    Returns:
+        list[float]: The longitude and latitude of the center, and the distance in meters.
+    """
+    values = parse_floats(raw, 3)
+    if values[2] < 0:
+        raise ValueError(raw)
+    return values
+
+
+def parse_polygon(raw: str) -> str:
+    """Check a raw WKT polygon.
+
+    Args:
+        raw (str): The raw WKT.
+
+    Raises:
+        ValueError: If the value is not a valid polygon or multipolygon.
+
+    Returns:
+        str: The WKT.
+    """
+    geometry = wkt.loads(raw)
+    if geometry.geom_type not in ("Polygon", "MultiPolygon") or not geometry.is_valid:
+        raise ValueError(raw)
+    return raw
+
+
+SPATIAL_PARSERS = {
+    FilterOperator.bbox: partial(parse_floats, count=4),
+    FilterOperator.dwithin: parse_distance,
+    FilterOperator.intersects: parse_polygon,
+}
+
+
+def parse_bool(raw: str) -> bool:
+    """Convert a raw boolean value.
+
+    Args:
+        raw (str): One of true/false, 1/0 or yes/no, case-insensitive.
+
+    Raises:
+        ValueError: If the value is not a boolean.
+
+    Returns:
+        bool: The value.
+    """
+    value = raw.lower()
+    if value in ("true", "1", "yes"):
+        return True
+    if value in ("false", "0", "no"):
+        return False
+    raise ValueError(raw)
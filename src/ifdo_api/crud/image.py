@@ -1,8 +1,21 @@
 """This module implements the CRUD for the Image model."""
 
-from sqlalchemy.orm import Session
+from collections.abc import Sequence
+from typing import Any
+from uuid import UUID
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ifdo_api.crud.base import DEFAULT_PAGE_SIZE
+from ifdo_api.crud.base import MAX_PAGE_SIZE
 from ifdo_api.crud.base import CRUDBase
-from ifdo_api.crud.base import jsonable_encoder_exclude_none_and_empty
+from ifdo_api.crud.base import dump_exclude_none_and_empty
+from ifdo_api.crud.base import encode_cursor
+from ifdo_api.crud.cache import invalidate
+from ifdo_api.crud.cache import models_info_tags
+from ifdo_api.crud.cache import write_tags
+from ifdo_api.crud.effective_image import merged_columns
+from ifdo_api.crud.effective_image import refresh_effective_images
 from ifdo_api.crud.fields import context_crud
 from ifdo_api.crud.fields import creator_crud
 from ifdo_api.crud.fields import event_crud
@@ -17,8 +30,11 @@ from ifdo_api.crud.fields import pi_crud
 from ifdo_api.crud.fields import platform_crud
 from ifdo_api.crud.fields import project_crud
 from ifdo_api.crud.fields import sensor_crud
+from ifdo_api.crud.filters import Filter
+from ifdo_api.crud.filters import compile_filters
 from ifdo_api.crud.image_set import image_set_crud
 from ifdo_api.models.image import Image
+from ifdo_api.models.image_set import ImageSet
 from ifdo_api.schemas.image import ImageSchema
 
 image_models_info = {
@@ -58,27 +74,130 @@ class CRUDImage(CRUDBase[Image]):
         CRUDBase (ModelType): Base class for CRUD operations.
     """
 
-    def create(self, db: Session, *, obj_in: ImageSchema) -> Image:
+    spatial_field = "geom"
+
+    async def create(self, db: AsyncSession, *, obj_in: ImageSchema, schema: type[BaseModel] | None = None) -> Image:
         """Create a new object in the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             obj_in (ModelType): Object to be created.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the created object.
 
         Returns:
             ModelType: The created object.
         """
-        obj_in_data = jsonable_encoder_exclude_none_and_empty(obj_in)
-        image_set_crud.show(db=db, id_pk=obj_in_data["image_set_id"])
+        obj_in_data = dump_exclude_none_and_empty(obj_in)
+        await image_set_crud.show(db=db, id_pk=obj_in_data["image_set_id"])
 
-        obj_in_data = self.create_fields(db, obj_in_data, image_models_info)
+        obj_in_data = await self.create_fields(db, obj_in_data, image_models_info)
 
         db_obj = self.model(**obj_in_data)
 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        tags = write_tags(db_obj, created=True) | models_info_tags(image_models_info)
+        await db.flush()  # assigns the ID
+        await self.refresh_derived(db, [db_obj.id])
+        await db.commit()
+        await invalidate(tags)
+        return await self.show(db, id_pk=db_obj.id, schema=schema)
+
+    async def refresh_derived(self, db: AsyncSession, ids: Sequence[UUID]) -> None:
+        """Recompute the `effective_images` rows of the written images.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the images created or updated.
+        """
+        await refresh_effective_images(db, self.model.id.in_(ids))
+
+    async def merged(
+        self,
+        db: AsyncSession,
+        *,
+        limit: int | None = None,
+        filters: Sequence[Filter] = (),
+        order_by: str = "created_at",
+        desc_order: bool = True,
+        cursor: str | None = None,
+        where: Sequence = (),
+    ) -> list[dict]:
+        """Retrieve images with the values of their image_set applied to their unset fields.
+
+        The fallback of `Image.to_merged_dict` is computed in SQL, with `COALESCE(images.<field>, image_sets.<field>)`
+        over the join of the two tables, so that the values of a whole page come out of one query. The related
+        objects are then loaded with one query per relationship for the whole page.
+
+        Args:
+            db (AsyncSession): Database session.
+            limit (int | None): Maximum number of results to return.
+            filters (Sequence[Filter]): Filters on the own columns of the images.
+            order_by (str): Column name to order the results by.
+            desc_order (bool): Whether to order the results in descending order.
+            cursor (str | None): Cursor returned by `merged_page`, only the images after it are returned.
+            where (Sequence): Additional SQL filter expressions.
+
+        Returns:
+            list[dict]: The merged images, with the related objects in place of their IDs.
+        """
+        statement = select(*merged_columns, getattr(self.model, order_by, self.model.created_at).label("order_key"))
+        statement = statement.outerjoin(ImageSet, self.model.image_set_id == ImageSet.id).where(*compile_filters(self.model, filters), *where)
+        statement = self.order_by_keyset(statement, order_by=order_by, desc_order=desc_order, cursor=cursor)
+        if limit:
+            statement = statement.limit(limit)
+        images = [dict(row) for row in (await db.execute(statement)).mappings()]
+        await self.load_merged_fields(db, images)
+        return images
+
+    async def merged_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> tuple[list[dict], str | None]:
+        """Retrieve one page of merged images, paginated on the (order_by, id) keyset of the images.
+
+        Args:
+            db (AsyncSession): Database session.
+            cursor (str | None): Cursor of the page, None for the first one.
+            limit (int): Maximum number of images in the page, capped to MAX_PAGE_SIZE.
+            **kwargs (Any): Other arguments of `merged`.
+
+        Returns:
+            tuple[list[dict], str | None]: The images and the cursor of the next page, None on the last page.
+        """
+        limit = min(limit, MAX_PAGE_SIZE)
+        images = await self.merged(db, limit=limit + 1, cursor=cursor, **kwargs)
+        next_cursor = None
+        if len(images) > limit:
+            images = images[:limit]
+            next_cursor = encode_cursor((images[-1]["order_key"], images[-1]["id"]))
+        return images, next_cursor
+
+    async def load_merged_fields(self, db: AsyncSession, images: list[dict]) -> None:
+        """Replace the IDs of the related objects of merged images by the objects, with one query per relationship.
+
+        Args:
+            db (AsyncSession): Database session.
+            images (list[dict]): The merged images, updated in place.
+        """
+        for key, value in image_models_info.items():
+            model = value["crud"].model
+            column = key if value.get("list") else f"{key}_id"
+            ids = set()
+            for image in images:
+                if value.get("list"):
+                    ids.update(image[column] or [])
+                elif image[column] is not None:
+                    ids.add(image[column])
+            objects = {obj.id: obj for obj in await db.scalars(select(model).where(model.id.in_(ids)))} if ids else {}
+            for image in images:
+                if value.get("list"):
+                    image[key] = [objects[related_id] for related_id in image[column] or []]
+                else:
+                    image[key] = objects.get(image[column])
 
 
 image_crud = CRUDImage(Image)
@@ -1,17 +1,37 @@
 """This module implements the CRUD for the ImageSet model."""
 
+from collections.abc import AsyncIterable
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from collections.abc import Sequence
+from enum import Enum
+from typing import Any
 from uuid import UUID
 from uuid import uuid4
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from sqlalchemy import Float
+from sqlalchemy import bindparam
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import noload
 from sqlalchemy.orm import selectinload
-from sqlalchemy.sql import text
 from ifdo_api.api.exceptions import NotFoundException
 from ifdo_api.api.exceptions import ValueErrorException
 from ifdo_api.crud.base import CRUDBase
+from ifdo_api.crud.base import GetOrCreateCache
 from ifdo_api.crud.base import ModelType
-from ifdo_api.crud.base import jsonable_encoder_exclude_none_and_empty
+from ifdo_api.crud.base import dump_exclude_none_and_empty
+from ifdo_api.crud.cache import invalidate
+from ifdo_api.crud.cache import list_tag
+from ifdo_api.crud.cache import models_info_tags
+from ifdo_api.crud.cache import row_tag
+from ifdo_api.crud.cache import write_tags
+from ifdo_api.crud.effective_image import refresh_effective_images
 from ifdo_api.crud.fields import context_crud
 from ifdo_api.crud.fields import creator_crud
 from ifdo_api.crud.fields import event_crud
@@ -27,11 +47,20 @@ from ifdo_api.crud.fields import platform_crud
 from ifdo_api.crud.fields import project_crud
 from ifdo_api.crud.fields import related_material_crud
 from ifdo_api.crud.fields import sensor_crud
+from ifdo_api.crud.filters import Filter
+from ifdo_api.models.base import utcnow
 from ifdo_api.models.image import Image
+from ifdo_api.models.image import image_creators
 from ifdo_api.models.image_set import ImageSet
-from ifdo_api.schemas.ifdo import ifdo_mapping
+from ifdo_api.schemas.ifdo import IfdoField
+from ifdo_api.schemas.ifdo import ifdo_section_plan
 from ifdo_api.schemas.image import ImageSchema
+from ifdo_api.schemas.image_set import ImageSetFullSchema
 from ifdo_api.schemas.image_set import ImageSetSchema
+from ifdo_api.utils.ifdo_export import ifdo_value
+from ifdo_api.utils.ifdo_export import is_empty
+from ifdo_api.utils.ifdo_export import related_dict
+from ifdo_api.utils.ifdo_stream import achunked
 
 image_set_models_info = {
     "context": {"crud": context_crud, "unique": "name"},
@@ -66,6 +95,80 @@ image_set_models_info = {
     },
 }
 
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+image_columns = [column.key for column in Image.__table__.columns if column.key != "geom"]
+
+# Fields of the iFDO items written to a column of the `images` table, and the creators written to `image_creators`
+image_fields = {key: field for key, field in ifdo_section_plan("items").items() if field.column in image_columns or field.field_name == "creators"}
+
+# Fields of the iFDO items written by the export, the name of the image being the key of the item
+export_fields = {key: field for key, field in image_fields.items() if field.field_name != "name"}
+
+image_geom = func.ST_SetSRID(
+    func.ST_MakePoint(bindparam("geom_longitude", type_=Float), bindparam("geom_latitude", type_=Float)),
+    4326,
+)
+insert_images_statement = insert(Image.__table__).values(geom=image_geom)
+
+# Columns compared by a re-import to tell the changed images from the unchanged ones
+compared_columns = [column for column in image_columns if column not in ("id", "created_at", "updated_at")]
+
+# Writes the new and the changed images of a re-import, keeping the creation date of the changed ones, and never
+# moving an image of another image_set into the one re-imported
+upsert_images_statement = pg_insert(Image.__table__).values(geom=image_geom)
+upsert_images_statement = upsert_images_statement.on_conflict_do_update(
+    index_elements=[Image.__table__.c.id],
+    set_={column: upsert_images_statement.excluded[column] for column in [*compared_columns, "updated_at", "geom"]},
+    where=Image.__table__.c.image_set_id == upsert_images_statement.excluded.image_set_id,
+)
+
+
+def stored_value(value: Any) -> Any:  # noqa: ANN401
+    """Convert a value read from the `images` table into the value parsed from an iFDO, to compare them.
+
+    Args:
+        value (Any): The stored value.
+
+    Returns:
+        Any: The value, enum members being replaced by their value.
+    """
+    return value.value if isinstance(value, Enum) else value
+
+
+def match_stored_images(images: list[dict], creators: list[dict], stored_ids: set[UUID], ids_by_hash: dict[str, UUID], seen: set[UUID]) -> None:
+    """Give the image rows of a re-import the IDs of the stored images they match, by UUID or else by SHA-256 hash.
+
+    A stored image is matched by one item only: an item matching an image already matched by an earlier item,
+    or repeating the UUID of an earlier item, is rejected as a duplicate.
+
+    Args:
+        images (list[dict]): Rows for the `images` table, as built by `parse_ifdo_image`.
+        creators (list[dict]): Rows for the `image_creators` association table, given the same IDs.
+        stored_ids (set[UUID]): The IDs of the images of the image_set.
+        ids_by_hash (dict[str, UUID]): The IDs of the images of the image_set, by hash.
+        seen (set[UUID]): The IDs given to the earlier items, updated with the IDs given to these.
+
+    Raises:
+        ValueErrorException: If an item is a duplicate.
+    """
+    ids = {}
+    duplicates = []
+    for image in images:
+        image_id = UUID(str(image["id"]))
+        if image_id not in stored_ids and image["sha256_hash"] in ids_by_hash:
+            image_id = ids_by_hash[image["sha256_hash"]]
+        if image_id in seen:
+            duplicates.append(image["name"])
+        seen.add(image_id)
+        ids[str(image["id"])] = image["id"] = image_id
+    if duplicates:
+        msg = f"Items matching the same image as an earlier item: {', '.join(duplicates)}"
+        raise ValueErrorException(msg)
+    for creator in creators:
+        creator["image_id"] = ids[str(creator["image_id"])]
+
 
 class CRUDImageSet(CRUDBase[ImageSet]):
     """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -74,106 +177,134 @@ class CRUDImageSet(CRUDBase[ImageSet]):
         CRUDBase (ModelType): Base class for CRUD operations.
     """
 
-    def show(self, db: Session, id_pk: int, include_images: bool = False) -> ModelType | None:
+    spatial_field = "limits"
+
+    async def show(
+        self,
+        db: AsyncSession,
+        id_pk: UUID,
+        schema: type[BaseModel] | None = None,
+        options: Sequence = (),
+        include_images: bool = False,
+    ) -> ModelType:
         """Retrieve an object from the database by its primary key.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             id_pk (UUID): Primary key of the object to retrieve.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded with the object.
+            options (Sequence): Additional loader options.
             include_images (bool): Whether to include images in the result. Defaults to False.
 
         Returns:
-            ModelType | None: The object if found, otherwise None.
+            ModelType: The object.
         """
-        query = db.query(self.model).filter(self.model.id == id_pk)
-        query = query.options(selectinload(self.model.images)) if include_images else query.options(noload(self.model.images))
-        db_item = query.one_or_none()
-        if not db_item:
-            raise NotFoundException(self.model.__name__)
-        return db_item
+        if include_images:
+            schema = schema or ImageSetFullSchema
+        else:
+            options = (*options, noload(self.model.images))
+        return await super().show(db, id_pk=id_pk, schema=schema, options=options)
 
-    def index(
+    async def index(
         self,
-        db: Session,
+        db: AsyncSession,
         *,
         limit: int | None = None,
-        arguments: dict | None = None,
+        filters: Sequence[Filter] = (),
         order_by: str = "created_at",
         desc_order: bool = True,
+        cursor: str | None = None,
+        schema: type[BaseModel] | None = None,
+        options: Sequence = (),
         include_images: bool = False,
     ) -> list[ModelType]:
         """Retrieve a list of objects from the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             limit (int | None): Maximum number of results to return.
-            arguments (dict | None): Filter arguments for the query.
+            filters (Sequence[Filter]): Filters on the columns of the model.
             order_by (str): Column name to order the results by.
             desc_order (bool): Whether to order the results in descending order.
+            cursor (str | None): Cursor returned by `page`, only the objects after it are returned.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded with the objects.
+            options (Sequence): Additional loader options.
             include_images (bool): Whether to include images in the results.
 
         Returns:
             list[ModelType]: List of objects from the database.
         """
-        query_str = self.create_query(arguments) if arguments else "true"
-
-        column_attr = getattr(self.model, order_by, None)
-        if column_attr is None:
-            detail = f"Invalid order_by column: {order_by}"
-            raise ValueErrorException(detail)
-        order_clause = desc(column_attr) if desc_order else column_attr
-
-        query = db.query(self.model).filter(text(query_str))
-
-        query = query.options(selectinload(self.model.images)) if include_images else query.options(noload(self.model.images))
-        if limit:
-            query = query.limit(limit)
-
-        return query.order_by(order_clause).all()
-
-    def create(self, db: Session, *, obj_in: ImageSetSchema) -> ImageSet:
+        if include_images:
+            schema = schema or ImageSetFullSchema
+        else:
+            options = (*options, noload(self.model.images))
+        return await super().index(
+            db,
+            limit=limit,
+            filters=filters,
+            order_by=order_by,
+            desc_order=desc_order,
+            cursor=cursor,
+            schema=schema,
+            options=options,
+        )
+
+    async def create(self, db: AsyncSession, *, obj_in: ImageSetSchema, schema: type[BaseModel] | None = None) -> ImageSet:
         """Create a new object in the database.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             obj_in (ModelType): Object to be created.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the created object.
 
         Returns:
             ModelType: The created object.
         """
-        obj_in_data = jsonable_encoder_exclude_none_and_empty(obj_in)
-        obj_in_data = self.create_fields(db, obj_in_data, image_set_models_info)
+        obj_in_data = dump_exclude_none_and_empty(obj_in)
+        obj_in_data = await self.create_fields(db, obj_in_data, image_set_models_info)
 
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
+        tags = write_tags(db_obj, created=True) | models_info_tags(image_set_models_info)
 
         try:
-            db.commit()
-            db.refresh(db_obj)
+            await db.commit()
         except Exception as error:
-            db.rollback()  # Undo partial transaction
+            await db.rollback()  # Undo partial transaction
             msg = "Failed to create the image_set from ifdo data."
             msg += f" Error: {error!s}"
             raise ValueErrorException(msg) from error
 
-        return db_obj
+        await invalidate(tags)
+        return await self.show(db, id_pk=db_obj.id, schema=schema)
 
-    def add_image(
+    async def refresh_derived(self, db: AsyncSession, ids: Sequence[UUID]) -> None:
+        """Recompute the `effective_images` rows of the images of the written image_sets.
+
+        Args:
+            db (AsyncSession): Database session.
+            ids (Sequence[UUID]): The IDs of the image_sets created or updated.
+        """
+        await refresh_effective_images(db, Image.image_set_id.in_(ids))
+
+    async def add_image(
         self,
-        db: Session,
+        db: AsyncSession,
         crud: ModelType,
         item_id: UUID,
         image_id: UUID | None = None,
         image: ImageSchema | None = None,
+        schema: type[BaseModel] | None = None,
     ) -> Image:
         """Add a image to a image_set.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             crud (ModelType): The CRUD object for image.
             item_id (UUID): The ID of the image_set.
             image_id (UUID): The ID of the image to add.
             image (ImageSchema): The image object to add.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the image.
 
         Returns:
             Image: The updated image with the new image.
@@ -185,29 +316,45 @@ class CRUDImageSet(CRUDBase[ImageSet]):
             msg = "Only one of image_id or image should be provided."
             raise ValueErrorException(msg)
         if image:
-            image = jsonable_encoder_exclude_none_and_empty(image)
-            db_image = self.get_or_create(db, crud, "name", image)
+            image = dump_exclude_none_and_empty(image)
+            db_image = await self.get_or_create(db, crud, "name", image)
         else:
-            db_image = crud.show(db, id_pk=image_id)
+            db_image = await crud.show(db, id_pk=image_id)
         if not db_image:
             raise NotFoundException(Image.__name__)
-        db_item = self.show(db=db, id_pk=item_id)
+        db_item = await self.show(db=db, id_pk=item_id)
         if not db_item:
             raise NotFoundException(self.model.__name__)
-        if db_image in db_item.images:
+        if db_image.image_set_id == db_item.id:
             msg = "Image already exists in the image_set."
             raise ValueErrorException(msg)
-        db_item.images.append(db_image)
-        db.commit()
-        db.refresh(db_item)
-        return db_item
-
-    def create_from_ifdo(self, db: Session, ifdo_data: dict) -> ImageSet:
+        # Setting the foreign key avoids loading the whole images collection of the image_set
+        tags = write_tags(db_image)
+        db_image.image_set_id = db_item.id
+        tags |= write_tags(db_image)
+        await crud.refresh_derived(db, [db_image.id])
+        await db.commit()
+        await invalidate(tags)
+        return await crud.show(db, id_pk=db_image.id, schema=schema)
+
+    async def create_from_ifdo(
+        self,
+        db: AsyncSession,
+        ifdo_data: dict,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        schema: type[BaseModel] | None = None,
+        upsert: bool = False,
+        ifdo_sha256: str | None = None,
+    ) -> ImageSet:
         """Create a image_set from IFDO data.
 
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             ifdo_data (dict): IFDO data to create the image_set.
+            batch_size (int): Number of images written per INSERT batch.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the created image_set.
+            upsert (bool): Whether to update the image_set previously imported from the iFDO, if any (see `update_from_ifdo_stream`).
+            ifdo_sha256 (str | None): The hash of the raw upload, recorded on the image_set (see `find_ifdo_upload`).
 
         Returns:
             ImageSet: The created image_set.
@@ -217,92 +364,526 @@ class CRUDImageSet(CRUDBase[ImageSet]):
         if not image_set_header or not image_set_items:
             msg = "Image set header and image set items are required in IFDO data"
             raise ValueErrorException(msg)
-        image_set_dict = self.parse_ifdo(db=db, section=image_set_header, section_name="header")
-        images = self.parse_ifdo_images(db=db, section=image_set_items)
-        image_set_dict["images"] = images
+        return await self.create_from_ifdo_stream(
+            db=db,
+            header=image_set_header,
+            items=image_set_items.items(),
+            batch_size=batch_size,
+            schema=schema,
+            upsert=upsert,
+            ifdo_sha256=ifdo_sha256,
+        )
+
+    async def create_from_ifdo_stream(
+        self,
+        db: AsyncSession,
+        header: dict,
+        items: AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+        schema: type[BaseModel] | None = None,
+        upsert: bool = False,
+        ifdo_sha256: str | None = None,
+    ) -> ImageSet:
+        """Create a image_set from an IFDO header and a stream of its items.
+
+        The image_set is created through the ORM, while its images are written in batches of multi-row
+        INSERT statements, with the `geom` column built server-side from the latitude and longitude.
+        Contexts, projects, creators and the other named fields are resolved through a cache that lives
+        for the whole import. Items are consumed one batch at a time, so an incremental parser (see
+        `ifdo_api.utils.ifdo_stream`) keeps the memory of the import bounded by the batch size.
+
+        Args:
+            db (AsyncSession): Database session.
+            header (dict): The `image-set-header` of the IFDO data.
+            items (AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]]): The (name, item) entries of `image-set-items`.
+            batch_size (int): Number of images written per INSERT batch.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the created image_set.
+            upsert (bool): Whether to update the image_set previously imported from the iFDO, if any (see `update_from_ifdo_stream`).
+            ifdo_sha256 (str | None): The hash of the raw upload, recorded on the image_set (see `find_ifdo_upload`).
 
-        db_obj = self.model(**image_set_dict)
+        Raises:
+            ValueErrorException: If the items are empty or the import fails.
+
+        Returns:
+            ImageSet: The created image_set.
+        """
+        if upsert:
+            image_set_id = await self.find_ifdo_image_set(db=db, header=header)
+            if image_set_id is not None:
+                return await self.update_from_ifdo_stream(
+                    db=db, id_pk=image_set_id, header=header, items=items, batch_size=batch_size, schema=schema, ifdo_sha256=ifdo_sha256
+                )
+        cache = GetOrCreateCache()
+        image_set_dict = await self.parse_ifdo(db=db, section=header, section_name="header", cache=cache)
+
+        db_obj = self.model(**image_set_dict, ifdo_sha256=ifdo_sha256)
         db.add(db_obj)
 
         try:
-            db.commit()
-            db.refresh(db_obj)
+            await db.flush()
+            imported = 0
+            batches = self.parse_ifdo_images(db=db, items=items, image_set_id=db_obj.id, batch_size=batch_size, cache=cache)
+            async for images, creators in batches:
+                await self.insert_images(db=db, images=images, creators=creators)
+                imported += len(images)
+            if imported:
+                await db.commit()
         except Exception as error:
-            db.rollback()  # Undo partial transaction
+            await db.rollback()  # Undo partial transaction
+            if isinstance(error, ValueErrorException):
+                raise
             msg = "Failed to create the image_set from ifdo data."
             msg += f" Error: {error!s}"
             raise ValueErrorException(msg) from error
+        if not imported:
+            await db.rollback()
+            msg = "Image set header and image set items are required in IFDO data"
+            raise ValueErrorException(msg)
+
+        await invalidate({list_tag(self.model.__tablename__), list_tag(Image.__tablename__)} | models_info_tags(image_set_models_info))
+        return await self.show(db, id_pk=db_obj.id, schema=schema)
+
+    async def find_ifdo_upload(self, db: AsyncSession, ifdo_sha256: str) -> UUID | None:
+        """Find the image_set imported from an upload, by the SHA-256 hash of the raw upload.
+
+        Args:
+            db (AsyncSession): Database session.
+            ifdo_sha256 (str): The hexadecimal hash of the upload.
+
+        Returns:
+            UUID | None: The ID of the image_set, None if the upload was not imported.
+        """
+        return (await db.execute(select(self.model.id).where(self.model.ifdo_sha256 == ifdo_sha256))).scalar_one_or_none()
+
+    async def find_ifdo_image_set(self, db: AsyncSession, header: dict) -> UUID | None:
+        """Find the image_set an iFDO was imported into, by its `image-set-uuid`, or else by its `image-set-name`.
+
+        Args:
+            db (AsyncSession): Database session.
+            header (dict): The `image-set-header` of the IFDO data.
+
+        Returns:
+            UUID | None: The ID of the image_set, None if the iFDO was not imported.
+        """
+        if header.get("image-set-uuid"):
+            try:
+                where = self.model.id == UUID(str(header["image-set-uuid"]))
+            except ValueError:
+                return None
+        elif header.get("image-set-name"):
+            where = self.model.name == header["image-set-name"]
+        else:
+            return None
+        return (await db.execute(select(self.model.id).where(where))).scalar_one_or_none()
+
+    async def update_from_ifdo_stream(
+        self,
+        db: AsyncSession,
+        id_pk: UUID,
+        header: dict,
+        items: AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]],
+        batch_size: int = IMPORT_BATCH_SIZE,
+        schema: type[BaseModel] | None = None,
+        ifdo_sha256: str | None = None,
+    ) -> ImageSet:
+        """Re-import an iFDO into the image_set it was imported into, writing only what changed.
+
+        The header replaces the fields of the image_set. Each item is matched to a stored image by its
+        `image-uuid`, or else by its `image-hash-sha256`, and compared with it: only the new and the changed
+        images are written, by batches of `INSERT ... ON CONFLICT DO UPDATE`, and the images of the image_set
+        missing from the iFDO are deleted. The whole re-import is one transaction, so that importing the same
+        iFDO twice writes nothing the second time, and it is rejected if two items match the same image or an
+        item has the `image-uuid` of an image of another image_set.
+
+        Args:
+            db (AsyncSession): Database session.
+            id_pk (UUID): The ID of the image_set.
+            header (dict): The `image-set-header` of the IFDO data.
+            items (AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]]): The (name, item) entries of `image-set-items`.
+            batch_size (int): Number of images parsed and written per batch.
+            schema (type[BaseModel] | None): Response schema whose relationships are loaded on the image_set.
+            ifdo_sha256 (str | None): The hash of the raw upload, recorded on the image_set (see `find_ifdo_upload`).
+
+        Raises:
+            ValueErrorException: If the items are empty or conflicting, or the import fails.
+
+        Returns:
+            ImageSet: The updated image_set.
+        """
+        cache = GetOrCreateCache()
+        plan = ifdo_section_plan("header")
+        collections = [field.field_name for field in plan.values() if field.many]
+        db_obj = await db.get(self.model, id_pk, options=[selectinload(getattr(self.model, name)) for name in collections])
+        image_set_dict = await self.parse_ifdo(db=db, section=header, section_name="header", cache=cache)
+        for field in plan.values():
+            if field.field_name != "id" and hasattr(self.model, field.field_name):
+                setattr(db_obj, field.field_name, image_set_dict.get(field.field_name, [] if field.many else None))
+
+        stored = (await db.execute(select(Image.id, Image.sha256_hash).where(Image.image_set_id == id_pk))).all()
+        stored_ids = {image_id for image_id, _ in stored}
+        ids_by_hash = {sha256_hash: image_id for image_id, sha256_hash in stored if sha256_hash}
+        seen: set[UUID] = set()
+        written: set[UUID] = set()
+        try:
+            batches = self.parse_ifdo_images(db=db, items=items, image_set_id=id_pk, batch_size=batch_size, cache=cache)
+            async for images, creators in batches:
+                match_stored_images(images, creators, stored_ids, ids_by_hash, seen)
+                await self.check_foreign_images(db=db, images=images, stored_ids=stored_ids)
+                changed = await self.changed_images(db=db, images=images, creators=creators, stored_ids=stored_ids)
+                if changed:
+                    await self.upsert_images(db=db, images=changed, creators=creators)
+                    written.update(image["id"] for image in changed)
+            if not seen:
+                msg = "Image set header and image set items are required in IFDO data"
+                raise ValueErrorException(msg)  # noqa: TRY301
+            removed = list(stored_ids - seen)
+            for start in range(0, len(removed), batch_size):
+                await db.execute(delete(Image).where(Image.id.in_(removed[start : start + batch_size])))
+            if db.is_modified(db_obj):
+                # The images inherit the fields of the header
+                await self.refresh_derived(db, [id_pk])
+            db_obj.ifdo_sha256 = ifdo_sha256 or db_obj.ifdo_sha256
+            await db.commit()
+        except Exception as error:
+            await db.rollback()  # Undo partial transaction
+            if isinstance(error, ValueErrorException):
+                raise
+            msg = "Failed to update the image_set from ifdo data."
+            msg += f" Error: {error!s}"
+            raise ValueErrorException(msg) from error
 
-        return db_obj
+        tags = {list_tag(self.model.__tablename__), list_tag(Image.__tablename__), row_tag(self.model.__tablename__, id_pk)}
+        tags |= {row_tag(Image.__tablename__, image_id) for image_id in written | set(removed)}
+        await invalidate(tags | models_info_tags(image_set_models_info))
+        return await self.show(db, id_pk=id_pk, schema=schema)
 
-    def parse_ifdo_images(
+    async def check_foreign_images(self, db: AsyncSession, images: list[dict], stored_ids: set[UUID]) -> None:
+        """Reject the image rows of a re-import that have the ID of an image of another image_set.
+
+        Args:
+            db (AsyncSession): Database session.
+            images (list[dict]): Rows for the `images` table, with the IDs of the stored images they match.
+            stored_ids (set[UUID]): The IDs of the images of the image_set.
+
+        Raises:
+            ValueErrorException: If an image belongs to another image_set.
+        """
+        unmatched = [image["id"] for image in images if image["id"] not in stored_ids]
+        if not unmatched:
+            return
+        foreign = set((await db.execute(select(Image.id).where(Image.id.in_(unmatched)))).scalars())
+        if foreign:
+            names = ", ".join(image["name"] for image in images if image["id"] in foreign)
+            msg = f"Items whose image-uuid belongs to an image of another image set: {names}"
+            raise ValueErrorException(msg)
+
+    async def changed_images(self, db: AsyncSession, images: list[dict], creators: list[dict], stored_ids: set[UUID]) -> list[dict]:
+        """Select the image rows of a re-import that differ from the stored images, new ones included.
+
+        Args:
+            db (AsyncSession): Database session.
+            images (list[dict]): Rows for the `images` table, as built by `parse_ifdo_image`, with the IDs of the stored images.
+            creators (list[dict]): Rows for the `image_creators` association table, with the same IDs.
+            stored_ids (set[UUID]): The IDs of the images of the image_set.
+
+        Returns:
+            list[dict]: The rows to write.
+        """
+        matched = [image["id"] for image in images if image["id"] in stored_ids]
+        table = Image.__table__
+        stored_rows = {}
+        stored_creators: dict[UUID, set] = {image_id: set() for image_id in matched}
+        if matched:
+            result = await db.execute(select(*(table.c[column] for column in ["id", *compared_columns])).where(table.c.id.in_(matched)))
+            stored_rows = {row["id"]: row for row in result.mappings()}
+            result = await db.execute(select(image_creators.c.image_id, image_creators.c.creator_id).where(image_creators.c.image_id.in_(matched)))
+            for image_id, creator_id in result.all():
+                stored_creators[image_id].add(creator_id)
+        new_creators: dict[UUID, set] = {}
+        for creator in creators:
+            new_creators.setdefault(creator["image_id"], set()).add(creator["creator_id"])
+
+        changed = []
+        for image in images:
+            row = stored_rows.get(image["id"])
+            if (
+                row is None
+                or new_creators.get(image["id"], set()) != stored_creators[image["id"]]
+                or any(stored_value(row[column]) != image[column] for column in compared_columns)
+            ):
+                changed.append(image)
+        return changed
+
+    async def upsert_images(self, db: AsyncSession, images: list[dict], creators: list[dict]) -> None:
+        """Write the new and changed images of a re-import, with their creators and their `effective_images` rows.
+
+        Args:
+            db (AsyncSession): Database session.
+            images (list[dict]): Rows for the `images` table, as built by `parse_ifdo_image`.
+            creators (list[dict]): Rows for the `image_creators` association table, of these images and others.
+        """
+        ids = [image["id"] for image in images]
+        await db.execute(upsert_images_statement, images)
+        await db.execute(delete(image_creators).where(image_creators.c.image_id.in_(ids)))
+        written = set(ids)
+        creators = [creator for creator in creators if creator["image_id"] in written]
+        if creators:
+            await db.execute(insert(image_creators), creators)
+        await refresh_effective_images(db, Image.id.in_(ids))
+
+    async def parse_ifdo_images(
         self,
-        db: Session,
-        section: dict,
-    ) -> list[Image]:
-        """Parse IFDO images from the given section.
+        db: AsyncSession,
+        items: AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]],
+        image_set_id: UUID,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        cache: GetOrCreateCache | None = None,
+    ) -> AsyncIterator[tuple[list[dict], list[dict]]]:
+        """Parse IFDO images into batches of table rows.
+
+        Args:
+            db (AsyncSession): Database session.
+            items (AsyncIterable[tuple[str, Any]] | Iterable[tuple[str, Any]]): The (name, item) entries of `image-set-items`.
+            image_set_id (UUID): The ID of the image_set the images belong to.
+            batch_size (int): Maximum number of images per batch.
+            cache (GetOrCreateCache | None): Cache used to resolve the named fields of the images.
+
+        Yields:
+            tuple[list[dict], list[dict]]: The `images` rows and the `image_creators` rows of each batch.
+        """
+        if cache is None:
+            cache = GetOrCreateCache()
+        template = dict.fromkeys(image_columns)
+        template["created_at"] = template["updated_at"] = utcnow()
+        template["image_set_id"] = image_set_id
+        async for batch in achunked(items, batch_size):
+            await self.prefetch_ifdo_fields(db=db, sections=[value for _, value in batch], section_name="items", cache=cache)
+            images = []
+            creators = []
+            for key, value in batch:
+                value["image-set-name"] = key
+                row, creator_ids = await self.parse_ifdo_image(db=db, section=value, template=template, cache=cache)
+                images.append(row)
+                creators.extend({"image_id": row["id"], "creator_id": creator_id} for creator_id in creator_ids)
+            yield images, creators
+
+    async def parse_ifdo_image(self, db: AsyncSession, section: dict, template: dict, cache: GetOrCreateCache) -> tuple[dict, list]:
+        """Parse an IFDO item straight into a row of the `images` table.
+
+        Related objects are replaced by their foreign key and every column is present, so that all the rows
+        of a batch can be sent in the same multi-row INSERT.
 
         Args:
-            db (Session): Database session.
-            section (dict): The section of the IFDO data containing images.
+            db (AsyncSession): Database session.
+            section (dict): The item.
+            template (dict): The row with every column set to its default, copied for the item.
+            cache (GetOrCreateCache): Cache used to resolve the named fields of the image.
 
         Returns:
-            list[Image]: A list of Image objects created from the section.
+            tuple[dict, list]: The row, including the `geom_longitude` and `geom_latitude` parameters used to
+                build `geom`, and the IDs of the creators of the image.
         """
-        images = []
+        row = template.copy()
+        creators = []
         for key, value in section.items():
-            value["image-set-name"] = key
-            image = self.parse_ifdo(db=db, section=value, section_name="items")
-            new_image = Image(**image)
+            field = image_fields.get(key)
+            if field is None:
+                continue
+            if field.crud is None:
+                row[field.column] = value if field.convert is None else field.convert(value)
+            elif value and isinstance(value, list if field.many else dict):
+                related = await self.get_or_create_ifdo_field(db=db, field=field, value=value, cache=cache)
+                if field.many:
+                    creators = [creator.id for creator in related]
+                else:
+                    row[field.column] = related.id
+        if row["id"] is None:
+            row["id"] = uuid4().hex
+        row["geom_longitude"] = row["longitude"]
+        row["geom_latitude"] = row["latitude"]
+        return row, creators
+
+    async def prefetch_ifdo_fields(self, db: AsyncSession, sections: list[dict], section_name: str, cache: GetOrCreateCache) -> None:
+        """Resolve the named fields used by the given sections with one query per field.
+
+        Args:
+            db (AsyncSession): Database session.
+            sections (list[dict]): The sections of the ifdo data to be parsed.
+            section_name (str): The name of the sections, "header" or "items".
+            cache (GetOrCreateCache): The cache to fill.
+        """
+        for key, field in ifdo_section_plan(section_name).items():
+            if not field.unique:
+                continue
+            items = []
+            for section in sections:
+                new_value = section.get(key)
+                if field.many and isinstance(new_value, list):
+                    items.extend(item for item in new_value if isinstance(item, dict))
+                elif isinstance(new_value, dict):
+                    items.append(new_value)
+            if items:
+                await cache.prefetch(db, field.crud, field.unique, items)
+
+    async def insert_images(self, db: AsyncSession, images: list[dict], creators: list[dict]) -> None:
+        """Write a batch of image rows and their creators, and their `effective_images` rows.
 
-            # db_image = self.get_or_create(db, image_crud, "name", image)
-            # new_image = Image(**db_image)
-            images.append(new_image)
-        return images
+        Args:
+            db (AsyncSession): Database session.
+            images (list[dict]): Rows for the `images` table, as built by `parse_ifdo_image`.
+            creators (list[dict]): Rows for the `image_creators` association table.
+        """
+        await db.execute(insert_images_statement, images)
+        if creators:
+            await db.execute(insert(image_creators), creators)
+        await refresh_effective_images(db, Image.id.in_([image["id"] for image in images]))
 
-    def parse_ifdo(
+    async def parse_ifdo(
         self,
-        db: Session,
+        db: AsyncSession,
         section: dict,
         section_name: str = "header",
+        cache: GetOrCreateCache | None = None,
     ) -> dict:
         """Create a image_set from the image set header.
 
+        Only the keys present in the section are visited, through the plan compiled for the section.
+
         Args:
-            db (Session): Database session.
+            db (AsyncSession): Database session.
             section (dict): The section of the ifdo data to parse.
             section_name (str): The name of the section being parsed, defaults to "header".
+            cache (GetOrCreateCache | None): Optional cache used to resolve the named fields.
 
         Returns:
             dict: The image_set dictionary containing parsed data from the section.
         """
+        plan = ifdo_section_plan(section_name)
         model_dict = {}
-        for key, value in ifdo_mapping.items():
-            if key in section:
-                location = value.get("location")
-                crud = value.get("crud")
-                if location is None or location == section_name:
-                    if crud:
-                        new_value = section[key]
-                        data_type = list if value.get("list") else dict
-                        if new_value and isinstance(new_value, data_type):
-                            if data_type is list:
-                                new_item = []
-                                for item in new_value:
-                                    local_item = self.get_or_create(db, crud, value.get("unique"), item)
-                                    new_item.append(local_item)
-                            else:
-                                new_item = self.get_or_create(db, crud, value.get("unique"), new_value)
-                            model_dict[value["field_name"]] = new_item
-                    else:
-                        new_value = section[key]
-                        if value.get("normalize"):
-                            new_value = value["normalize"](new_value).value
-                        model_dict[value["field_name"]] = new_value
+        for key, value in section.items():
+            field = plan.get(key)
+            if field is None:
+                continue
+            if field.crud is None:
+                model_dict[field.field_name] = value if field.convert is None else field.convert(value)
+            elif value and isinstance(value, list if field.many else dict):
+                model_dict[field.field_name] = await self.get_or_create_ifdo_field(db=db, field=field, value=value, cache=cache)
         if "id" not in model_dict:
             model_dict["id"] = uuid4().hex
         return model_dict
 
+    async def get_or_create_ifdo_field(
+        self, db: AsyncSession, field: IfdoField, value: dict | list, cache: GetOrCreateCache | None = None
+    ) -> ModelType | list[ModelType]:
+        """Get or create the related objects of an IFDO field.
+
+        Args:
+            db (AsyncSession): Database session.
+            field (IfdoField): The compiled field.
+            value (dict | list): The data of the object, or a list of them for a list field.
+            cache (GetOrCreateCache | None): Optional cache used to resolve the named fields.
+
+        Returns:
+            ModelType | list[ModelType]: The object, or the list of objects.
+        """
+        if field.many:
+            return [await self.get_or_create(db, field.crud, field.unique, item, cache=cache) for item in value]
+        return await self.get_or_create(db, field.crud, field.unique, value, cache=cache)
+
+    async def export_ifdo(self, db: AsyncSession, id_pk: UUID, batch_size: int = EXPORT_BATCH_SIZE) -> tuple[dict, AsyncIterator[tuple[str, dict]]]:
+        """Export an image_set as IFDO data, its items being read as they are consumed.
+
+        `ifdo_mapping` is inverted: the header is built from the image_set and each item from an image, whose
+        empty fields fall back to the value of the image_set as in `Image.to_merged_dict`. The related objects
+        used by the images are loaded up front with one query per field, and the images are read through a
+        server-side cursor, so the memory and the number of queries do not depend on the number of images.
+
+        Args:
+            db (AsyncSession): Database session, kept open until the items are consumed.
+            id_pk (UUID): The ID of the image_set.
+            batch_size (int): Number of images fetched at a time from the cursor.
+
+        Raises:
+            NotFoundException: If the image_set does not exist.
+
+        Returns:
+            tuple[dict, AsyncIterator[tuple[str, dict]]]: The `image-set-header` and the (name, item) entries
+                of `image-set-items`.
+        """
+        header_plan = ifdo_section_plan("header")
+        options = [
+            selectinload(getattr(self.model, field.field_name)) if field.many else joinedload(getattr(self.model, field.field_name))
+            for field in header_plan.values()
+            if field.crud is not None
+        ]
+        image_set = await self.show(db, id_pk=id_pk, options=options)
+        header = {}
+        for key, field in header_plan.items():
+            value = getattr(image_set, field.field_name)
+            if not is_empty(value):
+                header[key] = ifdo_value(value)
+
+        related = {}
+        for field in export_fields.values():
+            if field.crud is None:
+                continue
+            model = field.crud.model
+            if field.many:
+                ids = select(image_creators.c.creator_id).join(Image, Image.id == image_creators.c.image_id).where(Image.image_set_id == id_pk)
+            else:
+                ids = select(Image.__table__.c[field.column]).where(Image.image_set_id == id_pk)
+            objects = (await db.scalars(select(model).where(model.id.in_(ids)))).all()
+            own = getattr(image_set, field.field_name)
+            objects = [*objects, *(own if field.many else [own] if own is not None else [])]
+            related[field.field_name] = {obj.id: related_dict(obj) for obj in objects}
+
+        fallback = {}
+        for field in export_fields.values():
+            if field.many:
+                fallback[field.column] = [creator.id for creator in getattr(image_set, field.field_name)]
+            elif field.column in self.model.__table__.columns:
+                fallback[field.column] = getattr(image_set, field.column)
+        return header, self.iter_ifdo_items(db=db, id_pk=id_pk, related=related, fallback=fallback, batch_size=batch_size)
+
+    async def iter_ifdo_items(
+        self, db: AsyncSession, id_pk: UUID, related: dict, fallback: dict, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Read the images of an image_set through a server-side cursor and convert them into IFDO items.
+
+        Args:
+            db (AsyncSession): Database session.
+            id_pk (UUID): The ID of the image_set.
+            related (dict): The IFDO dicts of the related objects, by field name and ID.
+            fallback (dict): The values of the image_set, by column of the images.
+            batch_size (int): Number of images fetched at a time from the cursor.
+
+        Yields:
+            tuple[str, dict]: The name of each image and its item.
+        """
+        creator_ids = func.array(select(image_creators.c.creator_id).where(image_creators.c.image_id == Image.id).scalar_subquery())
+        columns = [Image.__table__.c[field.column] for field in export_fields.values() if not field.many]
+        statement = (
+            select(Image.name, *columns, creator_ids.label("creators"))
+            .where(Image.image_set_id == id_pk)
+            .order_by(Image.created_at, Image.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for values in (await db.stream(statement)).mappings():
+            item = {}
+            for key, field in export_fields.items():
+                value = values[field.column]
+                if is_empty(value):
+                    value = fallback.get(field.column)
+                if is_empty(value):
+                    continue
+                if field.many:
+                    item[key] = [related[field.field_name][related_id] for related_id in value]
+                elif field.crud is not None:
+                    item[key] = related[field.field_name][value]
+                else:
+                    item[key] = ifdo_value(value)
+            yield values["name"], item
+
     # def create_annotations(
     #     self,
     #     db: Session,
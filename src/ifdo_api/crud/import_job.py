@@ -0,0 +1,378 @@
+"""This module implements the CRUD for the ImportJob model, and the background import of iFDO files.
+
+An import job spools the uploaded file to `IMPORT_JOBS_DIR` and is run by the workers of `import_queue`. The
+image_set is committed first, then each batch of images is committed together with the progress of the job, which
+is the checkpoint a job resumes from: when it is run again, the items already imported are parsed but skipped.
+The checkpoint update only applies if the job is still running from the expected number of items, so that two
+workers can never both commit the same batch, and it returns the cancellation flag checked between batches.
+A job that fails or is cancelled deletes the image_set it imported so far, a failed job saying so in its errors.
+"""
+
+import logging
+import os
+import tempfile
+from collections.abc import AsyncIterable
+from collections.abc import AsyncIterator
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+from uuid import uuid4
+from fastapi import HTTPException
+from fastapi import UploadFile
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from ifdo_api.api.exceptions import IfdoValidationException
+from ifdo_api.api.exceptions import ValueErrorException
+from ifdo_api.crud.base import CRUDBase
+from ifdo_api.crud.base import GetOrCreateCache
+from ifdo_api.crud.cache import invalidate
+from ifdo_api.crud.cache import list_tag
+from ifdo_api.crud.cache import models_info_tags
+from ifdo_api.crud.cache import row_tag
+from ifdo_api.crud.cache import write_tags
+from ifdo_api.crud.image_set import IMPORT_BATCH_SIZE
+from ifdo_api.crud.image_set import image_set_crud
+from ifdo_api.crud.image_set import image_set_models_info
+from ifdo_api.db.db import AsyncSessionLocal
+from ifdo_api.models.base import ImportJobStatusEnum
+from ifdo_api.models.base import utcnow
+from ifdo_api.models.image import Image
+from ifdo_api.models.image_set import ImageSet
+from ifdo_api.models.import_job import ImportJob
+from ifdo_api.utils.ifdo import stream_ifdo_file
+from ifdo_api.utils.ifdo_stream import ENCODING_CONTENT_TYPES
+from ifdo_api.utils.ifdo_stream import ENCODING_SUFFIXES
+from ifdo_api.utils.ifdo_stream import JSON_CONTENT_TYPE
+from ifdo_api.utils.ifdo_stream import check_content_type
+from ifdo_api.utils.ifdo_stream import upload_content_type
+from ifdo_api.utils.ifdo_stream import upload_encoding
+from ifdo_api.utils.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+# Must be a persistent volume shared by every replica, for a stale job to be taken over by another one
+IMPORT_JOBS_DIR = Path(os.getenv("IMPORT_JOBS_DIR", Path(tempfile.gettempdir()) / "ifdo_import_jobs"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# Running jobs whose progress was not updated for this long are taken over, their worker being gone
+IMPORT_JOB_STALE_SECONDS = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "300"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+FINISHED_STATUSES = (ImportJobStatusEnum.completed, ImportJobStatusEnum.failed, ImportJobStatusEnum.cancelled)
+
+
+class ImportCancelledError(Exception):
+    """Raised between two batches of a job whose cancellation was requested."""
+
+
+class ImportJobLostError(Exception):
+    """Raised when the checkpoint of a job was moved by another worker, or the job is no longer running."""
+
+
+class CRUDImportJob(CRUDBase[ImportJob]):
+    """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
+
+    Args:
+        CRUDBase (ModelType): Base class for CRUD operations.
+    """
+
+    async def create_from_upload(self, db: AsyncSession, input_data: str | None = None, input_file: UploadFile | None = None) -> ImportJob:
+        """Spool an iFDO document to `IMPORT_JOBS_DIR` and create a pending job importing it.
+
+        Args:
+            db (AsyncSession): Database session.
+            input_data (str | None): The iFDO document as a JSON string.
+            input_file (UploadFile | None): The uploaded JSON or YAML file, possibly compressed, used when no string is given.
+
+        Raises:
+            ValueErrorException: If neither is given, or the file is neither JSON nor YAML.
+
+        Returns:
+            ImportJob: The created job.
+        """
+        if input_data is None and input_file is None:
+            raise ValueErrorException(detail="Either input data or an input file is required")
+        content_type = JSON_CONTENT_TYPE
+        suffix = ".json"
+        if input_data is None:
+            check_content_type(input_file)
+            content_type = upload_content_type(input_file)
+            suffix = f".{content_type.rsplit('/', 1)[-1]}"
+            encoding = upload_encoding(input_file)
+            if encoding is not None:
+                # Spooled as it was uploaded, its name telling the format of the decompressed content
+                content_type = ENCODING_CONTENT_TYPES[encoding]
+                suffix += ENCODING_SUFFIXES[encoding]
+        job_id = uuid4()
+        path = IMPORT_JOBS_DIR / f"{job_id}{suffix}"
+        await run_in_threadpool(IMPORT_JOBS_DIR.mkdir, parents=True, exist_ok=True)
+        if input_data is not None:
+            await run_in_threadpool(path.write_text, input_data, encoding="utf-8")
+        else:
+            await spool_upload(input_file, path)
+
+        db_obj = self.model(id=job_id, source_path=str(path), content_type=content_type, status=ImportJobStatusEnum.pending)
+        db.add(db_obj)
+        try:
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await run_in_threadpool(path.unlink, missing_ok=True)
+            raise
+        return db_obj
+
+    async def request_cancel(self, db: AsyncSession, id_pk: UUID) -> ImportJob:
+        """Cancel a job: a pending job is cancelled at once, a running one after its current batch.
+
+        Args:
+            db (AsyncSession): Database session.
+            id_pk (UUID): Primary key of the job.
+
+        Raises:
+            ValueErrorException: If the job is already finished.
+
+        Returns:
+            ImportJob: The job.
+        """
+        job = await self.show(db, id_pk=id_pk)
+        if job.status in FINISHED_STATUSES:
+            msg = f"Import job is already {job.status.value}"
+            raise ValueErrorException(msg)
+        cancelled = await db.execute(
+            self.progress(id_pk, ImportJob.status == ImportJobStatusEnum.pending).values(
+                status=ImportJobStatusEnum.cancelled, cancel_requested=True, finished_at=utcnow()
+            )
+        )
+        if not cancelled.rowcount:
+            await db.execute(self.progress(id_pk, ImportJob.status == ImportJobStatusEnum.running).values(cancel_requested=True))
+        await db.commit()
+        if cancelled.rowcount:
+            await run_in_threadpool(Path(job.source_path).unlink, missing_ok=True)
+        return await self.show(db, id_pk=id_pk)
+
+    async def unfinished(self) -> list[UUID]:
+        """Return the jobs a worker should run: the pending ones, and the running ones whose worker is gone.
+
+        Returns:
+            list[UUID]: The IDs of the jobs, oldest first.
+        """
+        async with AsyncSessionLocal() as db:
+            statement = select(ImportJob.id).where(self.claimable()).order_by(ImportJob.created_at)
+            return list((await db.execute(statement)).scalars())
+
+    async def run(self, job_id: UUID, batch_size: int = IMPORT_BATCH_SIZE) -> None:
+        """Run a job, resuming from its checkpoint, and record how it finished.
+
+        Args:
+            job_id (UUID): Primary key of the job.
+            batch_size (int): Number of images committed per batch.
+        """
+        async with AsyncSessionLocal() as db:
+            job = await self.claim(db, job_id)
+            if job is None:
+                return
+            path = Path(job.source_path)
+            upload = None
+            try:
+                try:
+                    stream = await run_in_threadpool(path.open, "rb")
+                except FileNotFoundError as error:
+                    msg = f"The uploaded file {path.name} is missing from IMPORT_JOBS_DIR, which must be shared by every replica"
+                    raise ValueErrorException(msg) from error
+                upload = UploadFile(stream, filename=path.name, headers=Headers({"content-type": job.content_type}))
+                await self.import_batches(db, job, upload, batch_size)
+            except ImportJobLostError:
+                await db.rollback()
+                return
+            except ImportCancelledError:
+                await self.finish(db, job, ImportJobStatusEnum.cancelled, drop_image_set=True)
+            except Exception as error:
+                logger.exception("Import job %s failed", job_id)
+                await db.rollback()
+                if isinstance(error, IfdoValidationException):
+                    errors = error.errors
+                else:
+                    errors = [error.detail if isinstance(error, HTTPException) else str(error)]
+                await self.finish(db, job, ImportJobStatusEnum.failed, errors=errors, drop_image_set=True)
+            else:
+                await self.finish(db, job, ImportJobStatusEnum.completed)
+            finally:
+                if upload is not None:
+                    await upload.close()
+
+    async def claim(self, db: AsyncSession, job_id: UUID) -> ImportJob | None:
+        """Mark a job as running, if no other worker runs it.
+
+        Args:
+            db (AsyncSession): Database session.
+            job_id (UUID): Primary key of the job.
+
+        Returns:
+            ImportJob | None: The job, or None if it is finished or running elsewhere.
+        """
+        statement = (
+            self.progress(job_id, self.claimable())
+            .values(status=ImportJobStatusEnum.running, started_at=func.coalesce(ImportJob.started_at, utcnow()))
+            .returning(ImportJob)
+        )
+        job = (await db.execute(statement)).scalar_one_or_none()
+        await db.commit()
+        return job
+
+    async def import_batches(self, db: AsyncSession, job: ImportJob, upload: UploadFile, batch_size: int) -> None:
+        """Import the image_set of a job and its images, one committed batch at a time.
+
+        Args:
+            db (AsyncSession): Database session.
+            job (ImportJob): The claimed job.
+            upload (UploadFile): The spooled iFDO file.
+            batch_size (int): Number of images committed per batch.
+
+        Raises:
+            ValueErrorException: If the file has no items, or the image_set of a resumed job was deleted.
+        """
+        header, items = await stream_ifdo_file(upload)
+        cache = GetOrCreateCache()
+        processed = job.items_processed
+        image_set_id = job.image_set_id
+        if image_set_id is None:
+            if processed:
+                msg = "The image set of the import job was deleted"
+                raise ValueErrorException(msg)
+            image_set_dict = await image_set_crud.parse_ifdo(db=db, section=header, section_name="header", cache=cache)
+            image_set = ImageSet(**image_set_dict)
+            db.add(image_set)
+            await db.flush()
+            image_set_id = image_set.id
+            # Only one worker records its image_set, the other one rolls its own back
+            await self.checkpoint(db, job.id, processed, ImportJob.image_set_id.is_(None), image_set_id=image_set_id)
+            await invalidate({list_tag(ImageSet.__tablename__)} | models_info_tags(image_set_models_info))
+
+        batches = image_set_crud.parse_ifdo_images(
+            db=db, items=skip_items(items, processed), image_set_id=image_set_id, batch_size=batch_size, cache=cache
+        )
+        async for images, creators in batches:
+            await image_set_crud.insert_images(db=db, images=images, creators=creators)
+            await self.checkpoint(db, job.id, processed, count=len(images))
+            processed += len(images)
+            await invalidate({row_tag(ImageSet.__tablename__, image_set_id), list_tag(Image.__tablename__)})
+        if not processed:
+            msg = "Image set header and image set items are required in IFDO data"
+            raise ValueErrorException(msg)
+
+    async def checkpoint(self, db: AsyncSession, job_id: UUID, processed: int, *where: Any, count: int = 0, **values: Any) -> None:  # noqa: ANN401
+        """Commit the current batch together with the progress of the job.
+
+        Args:
+            db (AsyncSession): Database session holding the batch.
+            job_id (UUID): Primary key of the job.
+            processed (int): Number of items imported before the batch.
+            *where (Any): Other conditions the job must meet.
+            count (int): Number of items in the batch, 0 for the image_set itself.
+            **values (Any): Other columns of the job to update.
+
+        Raises:
+            ImportJobLostError: If the job is no longer running from `processed` items, or does not meet `where`; the batch is rolled back.
+            ImportCancelledError: If the cancellation of the job was requested; the batch is committed.
+        """
+        statement = (
+            self.progress(job_id, ImportJob.status == ImportJobStatusEnum.running, ImportJob.items_processed == processed, *where)
+            .values(items_processed=processed + count, batches_committed=ImportJob.batches_committed + int(count > 0), **values)
+            .returning(ImportJob.cancel_requested)
+        )
+        cancel_requested = (await db.execute(statement)).scalar_one_or_none()
+        if cancel_requested is None:
+            await db.rollback()
+            raise ImportJobLostError
+        await db.commit()
+        if cancel_requested:
+            raise ImportCancelledError
+
+    async def finish(
+        self, db: AsyncSession, job: ImportJob, status: ImportJobStatusEnum, errors: list[str] | None = None, drop_image_set: bool = False
+    ) -> None:
+        """Record the end of a job and remove its file.
+
+        Args:
+            db (AsyncSession): Database session.
+            job (ImportJob): The job.
+            status (ImportJobStatusEnum): How the job finished.
+            errors (list[str] | None): The errors that made the job fail.
+            drop_image_set (bool): Whether to delete the image_set imported so far, with its images; a failed job records it in its errors.
+        """
+        tags = set()
+        errors = list(errors or [])
+        image_set_id = await db.scalar(select(ImportJob.image_set_id).where(ImportJob.id == job.id))
+        image_set = await db.get(ImageSet, image_set_id) if drop_image_set and image_set_id else None
+        if image_set is not None:
+            tags = write_tags(image_set, deleted=True)
+            await db.execute(delete(ImageSet).where(ImageSet.id == image_set.id))
+            if status == ImportJobStatusEnum.failed:
+                errors.append(f"The image set {image_set_id} imported so far was deleted with its images")
+        await db.execute(self.progress(job.id).values(status=status, errors=errors, finished_at=utcnow()))
+        await db.commit()
+        await invalidate(tags)
+        await run_in_threadpool(Path(job.source_path).unlink, missing_ok=True)
+
+    def progress(self, job_id: UUID, *where: Any) -> Any:  # noqa: ANN401
+        """Build an UPDATE of a job that leaves the objects of the session untouched.
+
+        Args:
+            job_id (UUID): Primary key of the job.
+            *where (Any): Other conditions the job must meet.
+
+        Returns:
+            Any: The UPDATE statement, setting `updated_at`.
+        """
+        return update(ImportJob).where(ImportJob.id == job_id, *where).values(updated_at=utcnow()).execution_options(synchronize_session=False)
+
+    def claimable(self) -> Any:  # noqa: ANN401
+        """Condition on the jobs a worker may claim.
+
+        Returns:
+            Any: The condition.
+        """
+        stale = utcnow() - timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+        running = and_(ImportJob.status == ImportJobStatusEnum.running, ImportJob.updated_at < stale)
+        return or_(ImportJob.status == ImportJobStatusEnum.pending, running)
+
+
+async def spool_upload(file: UploadFile, path: Path) -> None:
+    """Copy an uploaded file to disk, one chunk at a time.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        path (Path): The destination.
+    """
+    await file.seek(0)
+    with path.open("wb") as output:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(output.write, chunk)
+
+
+async def skip_items(items: AsyncIterable[Any], count: int) -> AsyncIterator[Any]:
+    """Skip the first elements of an asynchronous iterable.
+
+    Args:
+        items (AsyncIterable[Any]): The elements.
+        count (int): The number of elements to skip.
+
+    Yields:
+        Any: The elements after the first `count`.
+    """
+    async for item in items:
+        if count:
+            count -= 1
+            continue
+        yield item
+
+
+import_job_crud = CRUDImportJob(ImportJob)
+import_queue = JobQueue(import_job_crud.run, workers=IMPORT_WORKERS, sweep=import_job_crud.unfinished, sweep_interval=IMPORT_JOB_STALE_SECONDS)
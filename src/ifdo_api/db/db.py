@@ -2,17 +2,21 @@ import os
 import sqlalchemy
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 load_dotenv()
 
 
-def get_db_url(alembic: bool = False, psycopg: bool = True) -> str:
+def get_db_url(alembic: bool = False, psycopg: bool = True, asyncpg: bool = False) -> str:
     """Get the database URL from environment variables.
 
     Args:
         alembic (bool, optional): If True, the URL is created for Alembic migrations. Defaults to False.
         psycopg (bool, optional): If True, uses psycopg2 for PostgreSQL. Defaults to True.
+        asyncpg (bool, optional): If True, uses asyncpg for PostgreSQL, taking precedence over psycopg. Defaults to False.
 
     Returns:
         str: Database URL
@@ -27,6 +31,8 @@ def get_db_url(alembic: bool = False, psycopg: bool = True) -> str:
         port = os.environ.get("POSTGRES_PORT_ALEMBIC", "5432")
 
     # Construct the database URL
+    if asyncpg:
+        return f"postgresql+asyncpg://{username}:{password}@{hostname}:{port}/{database}"
     if psycopg:
         return f"postgresql+psycopg2://{username}:{password}@{hostname}:{port}/{database}"
     return f"postgres://{username}:{password}@{hostname}:{port}/{database}"
@@ -45,8 +51,23 @@ def engine_create(alembic: bool = False) -> sqlalchemy.engine.Engine:
     return create_engine(db_url)
 
 
+def async_engine_create() -> AsyncEngine:
+    """Create the asyncio engine used by the API routes.
+
+    Returns:
+        AsyncEngine: engine
+    """
+    pool_size = int(os.environ.get("POSTGRES_POOL_SIZE", "10"))
+    max_overflow = int(os.environ.get("POSTGRES_MAX_OVERFLOW", "10"))
+    return create_async_engine(get_db_url(asyncpg=True), pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+
 engine = engine_create()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = async_engine_create()
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
 db = SessionLocal()
 metadata = sqlalchemy.MetaData()
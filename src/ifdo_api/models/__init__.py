@@ -3,6 +3,7 @@ from .annotations import AnnotationLabel
 from .annotations import AnnotationSet
 from .annotations import Annotator
 from .annotations import Label
+from .effective_image import effective_images
 from .fields import PI
 from .fields import Context
 from .fields import Creator
@@ -23,6 +24,7 @@ from .image import image_creators
 from .image_set import ImageSet
 from .image_set import image_set_creators
 from .image_set import image_set_related_materials
+from .import_job import ImportJob
 
 __all__ = [
     "PI",
@@ -41,12 +43,14 @@ __all__ = [
     "ImageFlatportParameter",
     "ImagePhotometricCalibration",
     "ImageSet",
+    "ImportJob",
     "Label",
     "License",
     "Platform",
     "Project",
     "RelatedMaterial",
     "Sensor",
+    "effective_images",
     "image_creators",
     "image_set_creators",
     "image_set_related_materials",
@@ -1,7 +1,10 @@
+from geoalchemy2 import Geometry
 from sqlalchemy import Column
+from sqlalchemy import Computed
 from sqlalchemy import Enum
 from sqlalchemy import Float
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.associationproxy import association_proxy
@@ -72,6 +75,18 @@ class Annotation(DefaultColumns, Base):
         },
     )
 
+    geom = Column(
+        Geometry(geometry_type="GEOMETRY", spatial_index=False),
+        # `annotation_geometry` is the SQL function of the migration adding the column
+        Computed("annotation_geometry(shape, coordinates)", persisted=True),
+        nullable=True,
+        info={
+            "help": "The annotation in pixel space, without SRID, derived from its shape and coordinates: a point, a line "
+            "or a polygon (circles and ellipses being approximated), a collection of them for several frames, and "
+            "none for whole-image annotations."
+        },
+    )
+
     dimension_pixels = Column(
         Float,
         nullable=True,
@@ -99,6 +114,10 @@ class Annotation(DefaultColumns, Base):
     )
 
 
+# Serves the region queries, which look for the annotations of one image intersecting a rectangle (uuid in GiST needs btree_gist)
+Index("idx_annotations_image_id_geom", Annotation.image_id, Annotation.geom, postgresql_using="gist")
+
+
 class AnnotationLabel(DefaultColumns, Base):
     """A label assigned to an annotation by an annotator."""
 
@@ -113,6 +132,7 @@ class AnnotationLabel(DefaultColumns, Base):
     annotation_id = Column(
         ForeignKey("annotations.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
         info={"help": "A unique identifier to the annotation this label is assigned to"},
     )
 
@@ -133,5 +153,6 @@ class AnnotationLabel(DefaultColumns, Base):
         info={"help": "The date-time stamp of label creation"},
     )
 
+    annotation = relationship("Annotation", back_populates="annotation_labels")
     label = relationship("Label", backref="annotation_labels")
-    annotator = relationship("Annotator", backref="annotation_labels")
+    annotator = relationship("Annotator", back_populates="annotation_labels")
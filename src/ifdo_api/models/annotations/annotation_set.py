@@ -48,15 +48,15 @@ class AnnotationSet(CommonFieldsAll, DefaultColumns, Base):
         info={"help_text": "A URI pointing to the license to use the data (should be FAIR, e.g. **CC-BY** or CC-0)"},
     )
 
-    context = relationship("Context", foreign_keys=[context_id], back_populates="annotations", passive_deletes=True)
-    project = relationship("Project", foreign_keys=[project_id], back_populates="annotations", passive_deletes=True)
-    pi = relationship("PI", foreign_keys=[pi_id], back_populates="annotations", passive_deletes=True)
-    license = relationship("License", foreign_keys=[license_id], back_populates="annotations", passive_deletes=True)
+    context = relationship("Context", foreign_keys=[context_id], back_populates="annotation_sets", passive_deletes=True)
+    project = relationship("Project", foreign_keys=[project_id], back_populates="annotation_sets", passive_deletes=True)
+    pi = relationship("PI", foreign_keys=[pi_id], back_populates="annotation_sets", passive_deletes=True)
+    license = relationship("License", foreign_keys=[license_id], back_populates="annotation_sets", passive_deletes=True)
 
     creators = relationship(
         "Creator",
         secondary=annotation_set_creators,
-        back_populates="annotations",
+        back_populates="annotation_sets",
         info={"help_text": "Information to identify the creators of the annotation set"},
     )
 
@@ -75,14 +75,14 @@ class AnnotationSet(CommonFieldsAll, DefaultColumns, Base):
 
     annotations = relationship(
         "Annotation",
-        back_populates="annotation_sets",
+        back_populates="annotation_set",
         cascade="all, delete-orphan",
         info={"help_text": "The annotations that are part of this annotation set."},
     )
 
     labels = relationship(
         "Label",
-        back_populates="annotation_sets",
+        back_populates="annotation_set",
         cascade="all, delete-orphan",
         info={"help_text": "The labels that are part of this annotation set."},
     )
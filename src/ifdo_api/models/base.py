@@ -4,12 +4,23 @@ from datetime import timezone
 from uuid import uuid4
 from sqlalchemy import Column
 from sqlalchemy import DateTime
+from sqlalchemy import Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declared_attr
 
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    """Current UTC time, without tzinfo to match the `DateTime` columns (asyncpg rejects aware datetimes for them).
+
+    Returns:
+        datetime: The current naive UTC datetime.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class DefaultColumns:
     """Mixin class to add created_at and updated_at timestamps to a model."""
 
@@ -25,8 +36,17 @@ class DefaultColumns:
         unique=True,
         default=uuid4,
     )
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, nullable=False)
+
+    @declared_attr.directive
+    def __table_args__(cls) -> tuple:  # noqa: N805
+        """Index the (created_at, id) keyset the index endpoints paginate on.
+
+        Returns:
+            tuple: The table arguments.
+        """
+        return (Index(f"idx_{cls.__tablename__}_created_at_id", "created_at", "id"),)
 
 
 class CaseInsensitiveEnum(str, enum.Enum):
@@ -151,3 +171,13 @@ class QualityEnum(CaseInsensitiveEnum):
     raw = "raw"
     processed = "processed"
     product = "product"
+
+
+class ImportJobStatusEnum(str, enum.Enum):
+    """Enumeration of the states of an import job."""
+
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
@@ -34,6 +34,7 @@ class CommonFieldsImagesImageSets:
     date_time = Column(
         DateTime,
         nullable=True,
+        index=True,
         # nullable=False,
         info={"help_text": "UTC time of image acquisition (or start time of a video)"},
     )
@@ -0,0 +1,45 @@
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import String
+from sqlalchemy import Table
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID
+from ifdo_api.models.base import Base
+from ifdo_api.models.image import Image
+from ifdo_api.models.image import merged_fields
+
+
+def effective_column(field: str) -> Column:
+    """Copy a merged field of the `images` table, without its unique constraint.
+
+    Args:
+        field (str): The name of the column.
+
+    Returns:
+        Column: The column of the `effective_images` table.
+    """
+    column = Image.__table__.c[field]
+    foreign_keys = [ForeignKey(foreign_key.target_fullname, ondelete="SET NULL") for foreign_key in column.foreign_keys]
+    return Column(field, column.type, *foreign_keys, nullable=True, info=column.info)
+
+
+# The images with their unset fields taken from their image_set, as `Image.to_merged_dict`: a table kept up to
+# date by the CRUD objects when an image or an image_set is written (see `ifdo_api.crud.effective_image`)
+effective_images = Table(
+    "effective_images",
+    Base.metadata,
+    Column("id", ForeignKey("images.id", ondelete="CASCADE"), primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("image_set_id", ForeignKey("image_sets.id", ondelete="CASCADE"), nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    *(effective_column(field) for field in merged_fields if field != "creators"),
+    Column("creator_ids", ARRAY(UUID), nullable=True, info={"help_text": "The IDs of the creators of the image, or of its image_set"}),
+    info={"help_text": "Effective metadata of the images, falling back to their image_set"},
+)
+
+Index("ix_effective_images_image_set_id", effective_images.c.image_set_id)
+Index("ix_effective_images_date_time", effective_images.c.date_time)
+Index("idx_effective_images_created_at_id", effective_images.c.created_at, effective_images.c.id)
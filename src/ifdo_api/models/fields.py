@@ -38,6 +38,13 @@ class Context(DefaultColumns, NamedURI, Base):
         passive_deletes=True,
     )
 
+    annotation_sets = relationship(
+        "AnnotationSet",
+        foreign_keys="[AnnotationSet.context_id]",
+        back_populates="context",
+        passive_deletes=True,
+    )
+
 
 class Project(DefaultColumns, NamedURI, Base):
     """Represents a project related to an image."""
@@ -55,6 +62,13 @@ class Project(DefaultColumns, NamedURI, Base):
         passive_deletes=True,
     )
 
+    annotation_sets = relationship(
+        "AnnotationSet",
+        foreign_keys="[AnnotationSet.project_id]",
+        back_populates="project",
+        passive_deletes=True,
+    )
+
 
 class Event(DefaultColumns, NamedURI, Base):
     """Represents an event related to an image."""
@@ -127,6 +141,13 @@ class PI(DefaultColumns, NamedURI, Base):
         passive_deletes=True,
     )
 
+    annotation_sets = relationship(
+        "AnnotationSet",
+        foreign_keys="[AnnotationSet.pi_id]",
+        back_populates="pi",
+        passive_deletes=True,
+    )
+
 
 class Creator(DefaultColumns, NamedURI, Base):
     """Represents a creator of an image."""
@@ -1,8 +1,11 @@
+from geoalchemy2 import Geography
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Table
+from sqlalchemy import cast
 from sqlalchemy.orm import relationship
 from ifdo_api.models.base import Base
 from ifdo_api.models.base import DefaultColumns
@@ -16,6 +19,71 @@ image_creators = Table(
     Column("creator_id", ForeignKey("creators.id", ondelete="CASCADE"), primary_key=True),
 )
 
+# Fields of an image falling back to the value of its image_set when they are unset
+merged_fields = [
+    "handle",
+    "context_id",
+    "project_id",
+    "event_id",
+    "platform_id",
+    "sensor_id",
+    "pi_id",
+    "license_id",
+    "creators",
+    "camera_pose_id",
+    "camera_housing_viewport_id",
+    "flatport_parameter_id",
+    "domeport_parameter_id",
+    "camera_calibration_model_id",
+    "photometric_calibration_id",
+    "sha256_hash",
+    "date_time",
+    "geom",
+    "latitude",
+    "longitude",
+    "altitude_meters",
+    "coordinate_uncertainty_meters",
+    "copyright",
+    "abstract",
+    "entropy",
+    "particle_count",
+    "average_color",
+    "mpeg7_color_layout",
+    "mpeg7_color_statistic",
+    "mpeg7_color_structure",
+    "mpeg7_dominant_color",
+    "mpeg7_edge_histogram",
+    "mpeg7_homogeneous_texture",
+    "mpeg7_scalable_color",
+    "acquisition",
+    "quality",
+    "deployment",
+    "navigation",
+    "scale_reference",
+    "illumination",
+    "pixel_magnitude",
+    "marine_zone",
+    "spectral_resolution",
+    "capture_mode",
+    "fauna_attraction",
+    "area_square_meters",
+    "meters_above_ground",
+    "acquisition_settings",
+    "camera_yaw_degrees",
+    "camera_pitch_degrees",
+    "camera_roll_degrees",
+    "overlap_fraction",
+    "objective",
+    "target_environment",
+    "target_timescale",
+    "spatial_constraints",
+    "temporal_constraints",
+    "time_synchronisation",
+    "item_identification_scheme",
+    "curation_protocol",
+    "visual_constraints",
+]
+
 
 class Image(DefaultColumns, CommonFieldsAll, CommonFieldsImagesImageSets, Base):
     """This class represents an image in the database."""
@@ -100,6 +168,7 @@ class Image(DefaultColumns, CommonFieldsAll, CommonFieldsImagesImageSets, Base):
     image_set_id = Column(
         ForeignKey("image_sets.id", onupdate="CASCADE", ondelete="CASCADE"),
         nullable=False,
+        index=True,
         info={"help_text": "The image_set this image belongs to. A image_set can have multiple images."},
     )
 
@@ -112,7 +181,7 @@ class Image(DefaultColumns, CommonFieldsAll, CommonFieldsImagesImageSets, Base):
 
     annotations = relationship(
         "Annotation",
-        back_populates="images",
+        back_populates="image",
         cascade="all, delete-orphan",
         info={"help_text": "All the annotations in this image. Each annotation has a shape, coordinates, and a list of labels assigned to it."},
     )
@@ -169,70 +238,7 @@ class Image(DefaultColumns, CommonFieldsAll, CommonFieldsImagesImageSets, Base):
         Returns:
             dict: A dictionary representation of the image with fallback values applied.
         """
-        common_fields = [
-            "handle",
-            "context_id",
-            "project_id",
-            "event_id",
-            "platform_id",
-            "sensor_id",
-            "pi_id",
-            "license_id",
-            "creators",
-            "camera_pose_id",
-            "camera_housing_viewport_id",
-            "flatport_parameter_id",
-            "domeport_parameter_id",
-            "camera_calibration_model_id",
-            "photometric_calibration_id",
-            "sha256_hash",
-            "date_time",
-            "geom",
-            "latitude",
-            "longitude",
-            "altitude_meters",
-            "coordinate_uncertainty_meters",
-            "copyright",
-            "abstract",
-            "entropy",
-            "particle_count",
-            "average_color",
-            "mpeg7_color_layout",
-            "mpeg7_color_statistic",
-            "mpeg7_color_structure",
-            "mpeg7_dominant_color",
-            "mpeg7_edge_histogram",
-            "mpeg7_homogeneous_texture",
-            "mpeg7_scalable_color",
-            "acquisition",
-            "quality",
-            "deployment",
-            "navigation",
-            "scale_reference",
-            "illumination",
-            "pixel_magnitude",
-            "marine_zone",
-            "spectral_resolution",
-            "capture_mode",
-            "fauna_attraction",
-            "area_square_meters",
-            "meters_above_ground",
-            "acquisition_settings",
-            "camera_yaw_degrees",
-            "camera_pitch_degrees",
-            "camera_roll_degrees",
-            "overlap_fraction",
-            "objective",
-            "target_environment",
-            "target_timescale",
-            "spatial_constraints",
-            "temporal_constraints",
-            "time_synchronisation",
-            "item_identification_scheme",
-            "curation_protocol",
-            "visual_constraints",
-        ]
-        image = {field: self.get_merged_field(field) for field in common_fields}
+        image = {field: self.get_merged_field(field) for field in merged_fields}
         image["id"] = self.id
         image["name"] = self.name
         image["image_set_id"] = self.image_set_id
@@ -240,3 +246,7 @@ class Image(DefaultColumns, CommonFieldsAll, CommonFieldsImagesImageSets, Base):
 
     def __str__(self):
         return self.name
+
+
+# `geom__dwithin` on images (see `ifdo_api.crud.filters`)
+Index("idx_images_geom_geography", cast(Image.geom, Geography(srid=4326)), postgresql_using="gist")
@@ -1,3 +1,4 @@
+from geoalchemy2 import Geography
 from geoalchemy2 import Geometry
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
@@ -5,8 +6,10 @@ from shapely.geometry import box
 from sqlalchemy import Column
 from sqlalchemy import Float
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy import Table
+from sqlalchemy import cast
 from sqlalchemy.orm import relationship
 from ifdo_api.models.annotations.annotation_set import annotation_set_image_sets
 from ifdo_api.models.base import Base
@@ -155,6 +158,13 @@ class ImageSet(CommonFieldsAll, CommonFieldsImagesImageSets, DefaultColumns, Bas
         info={"help_text": "Geographic bounding box of the image_set in WGS84 coordinates."},
     )
 
+    ifdo_sha256 = Column(
+        String(64),
+        unique=True,
+        nullable=True,
+        info={"help_text": "SHA-256 hash of the raw iFDO upload the image_set was imported from, to recognise the same upload."},
+    )
+
     related_materials = relationship("RelatedMaterial", secondary=image_set_related_materials, back_populates="image_sets")
 
     images = relationship(
@@ -277,6 +287,10 @@ class ImageSet(CommonFieldsAll, CommonFieldsImagesImageSets, DefaultColumns, Bas
     #     return value
 
 
+# `limits__dwithin` on image_sets, the set whose bounding box is near the point
+Index("idx_image_sets_limits_geography", cast(ImageSet.limits, Geography(srid=4326)), postgresql_using="gist")
+
+
 # @listens_for(ImageSet, "before_update")
 # def set_limits_before_update(mapper, connection, target) -> None:
 #     if (
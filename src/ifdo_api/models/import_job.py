@@ -0,0 +1,75 @@
+from sqlalchemy import Boolean
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Enum
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import JSONB
+from ifdo_api.models.base import Base
+from ifdo_api.models.base import DefaultColumns
+from ifdo_api.models.base import ImportJobStatusEnum
+from ifdo_api.models.base import utcnow
+
+
+class ImportJob(DefaultColumns, Base):
+    """An import of an iFDO file into an image set, run in the background by the import workers."""
+
+    __tablename__ = "import_jobs"
+
+    status = Column(
+        Enum(ImportJobStatusEnum),
+        nullable=False,
+        default=ImportJobStatusEnum.pending,
+        index=True,
+        info={"help_text": "State of the job: pending, running, completed, failed or cancelled"},
+    )
+    image_set_id = Column(
+        ForeignKey("image_sets.id", ondelete="SET NULL"),
+        nullable=True,
+        info={"help_text": "The image set created by the job, once its header is imported"},
+    )
+    source_path = Column(
+        String(1000),
+        nullable=False,
+        info={"help_text": "Path of the uploaded iFDO file, kept until the job finishes"},
+    )
+    content_type = Column(
+        String(255),
+        nullable=False,
+        info={"help_text": "Content type of the uploaded iFDO file, application/json or application/yaml"},
+    )
+    items_processed = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        info={"help_text": "Number of image-set-items imported so far, the checkpoint the job resumes from"},
+    )
+    batches_committed = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        info={"help_text": "Number of batches of images committed so far"},
+    )
+    errors = Column(
+        JSONB,
+        nullable=False,
+        default=list,
+        info={"help_text": "The errors that made the job fail"},
+    )
+    cancel_requested = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        info={"help_text": "Whether the job was asked to stop after its current batch"},
+    )
+    started_at = Column(DateTime, nullable=True, info={"help_text": "UTC time the job started running"})
+    finished_at = Column(DateTime, nullable=True, info={"help_text": "UTC time the job completed, failed or was cancelled"})
+
+    @property
+    def items_per_second(self) -> float | None:
+        """Throughput of the job, from its start to its end or to now if it is still running."""
+        if self.started_at is None:
+            return None
+        elapsed = ((self.finished_at or utcnow()) - self.started_at).total_seconds()
+        return self.items_processed / elapsed if elapsed > 0 else None
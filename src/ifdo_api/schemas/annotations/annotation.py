@@ -1,7 +1,10 @@
 from typing import Literal
+from uuid import UUID
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import model_validator
 from ifdo_api.schemas.annotations.label import LabelSchema
+from ifdo_api.schemas.bulk import BulkRowResultSchema
 
 ShapeType = Literal["single-pixel", "polyline", "polygon", "circle", "rectangle", "ellipse", "whole-image"]
 
@@ -53,3 +56,53 @@ class AnnotationSchema(BaseModel):
     )
     annotation_labels: list[AnnotationLabelSchema] = Field(..., description="The list of labels assigned to annotations by annotators")
     labels: list[LabelSchema] = Field(..., description="The list of label IDs assigned to this annotation")
+
+
+class AnnotationColumnsSchema(BaseModel):
+    """Annotations given by columns, the values of each annotation being at the same position in every column."""
+
+    image_id: list[UUID] = Field(..., description="The image each annotation belongs to")
+    shape: list[ShapeType] = Field(..., description="The shape of each annotation")
+    coordinates: list[list[list[float]]] = Field(..., description="The pixel coordinates of each annotation, as in `AnnotationSchema`")
+    label: list[str | None] | None = Field(None, description="The name of the label assigned to each annotation, if any")
+    annotator: list[str | None] | None = Field(None, description="The name of the annotator of each label, created if unknown")
+    annotation_platform: list[str | None] | None = Field(None, description="The platform used to create each annotation")
+    dimension_pixels: list[float | None] | None = Field(None, description="The dimension in pixels of each annotation")
+    creation_datetime: list[str | None] | None = Field(None, description="The date-time stamp of each label, the time of the import by default")
+
+    @model_validator(mode="after")
+    def check_lengths(self) -> "AnnotationColumnsSchema":
+        """Check that every column holds one value per annotation.
+
+        Raises:
+            ValueError: If the columns have different lengths.
+
+        Returns:
+            AnnotationColumnsSchema: The validated columns.
+        """
+        lengths = {name: len(values) for name, values in self if values is not None}
+        if len(set(lengths.values())) > 1:
+            msg = f"The columns must have the same length, got {lengths}"
+            raise ValueError(msg)
+        return self
+
+
+class AnnotationIngestResultSchema(BaseModel):
+    """Schema for the response of the bulk ingest of annotations."""
+
+    created: int = Field(..., description="Number of annotations created")
+    failed: int = Field(..., description="Number of annotations rejected")
+    errors: list[BulkRowResultSchema] = Field(default_factory=list, description="Why each rejected annotation was not created")
+
+
+class AnnotationRegionSchema(BaseModel):
+    """An annotation found in a region of an image, with the IDs of its labels."""
+
+    id: UUID = Field(..., description="The ID of the annotation")
+    image_id: UUID = Field(..., description="The image this annotation belongs to")
+    annotation_set_id: UUID = Field(..., description="The annotation set this annotation belongs to")
+    annotation_platform: str | None = Field(None, description="The platform used to create the annotation")
+    shape: ShapeType = Field(..., description="The annotation shape is specified by a keyword.")
+    coordinates: list[list[float]] = Field(..., description="The pixel coordinates of the annotation, as in `AnnotationSchema`")
+    dimension_pixels: float | None = Field(None, description="The dimension in pixels of the annotation")
+    label_ids: list[UUID] = Field(default_factory=list, description="The labels assigned to the annotation")
@@ -0,0 +1,35 @@
+from functools import cache
+from uuid import UUID
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import create_model
+
+
+class BulkRowResultSchema(BaseModel):
+    """Schema for the outcome of one row of a bulk write."""
+
+    index: int = Field(..., description="Position of the row in the request body")
+    id: UUID | None = Field(None, description="ID of the object written, None if the row failed")
+    error: str | None = Field(None, description="Why the row was not written, None if it succeeded")
+
+
+class BulkResultSchema(BaseModel):
+    """Schema for the response of a bulk write."""
+
+    succeeded: int = Field(..., description="Number of rows written")
+    failed: int = Field(..., description="Number of rows not written")
+    results: list[BulkRowResultSchema] = Field(default_factory=list, description="Outcome of each row, in the order of the request")
+
+
+@cache
+def partial_schema(schema: type[BaseModel]) -> type[BaseModel]:
+    """Build the schema of a row of a bulk update: the `id` of the object and any of the fields of the schema.
+
+    Args:
+        schema (type[BaseModel]): The schema of the objects.
+
+    Returns:
+        type[BaseModel]: The schema, with every field optional but the `id`.
+    """
+    fields = {name: (field.annotation | None, None) for name, field in schema.model_fields.items() if name != "id"}
+    return create_model(f"{schema.__name__}Patch", __base__=BaseModel, id=(UUID, ...), **fields)
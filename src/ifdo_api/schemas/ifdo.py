@@ -1,3 +1,8 @@
+from collections.abc import Callable
+from enum import Enum
+from functools import cache
+from typing import Any
+from pydantic import BaseModel
 from ifdo_api.crud.fields import context_crud
 from ifdo_api.crud.fields import creator_crud
 from ifdo_api.crud.fields import event_crud
@@ -25,6 +30,7 @@ from ifdo_api.models.base import QualityEnum
 from ifdo_api.models.base import ScaleReferenceEnum
 from ifdo_api.models.base import SpectralResEnum
 from ifdo_api.schemas.fields import ImageCameraPoseSchema
+from ifdo_api.utils.ifdo import parse_ifdo_datetime
 
 ifdo_mapping = {
     "image-set-name": {"field_name": "name"},
@@ -35,7 +41,7 @@ ifdo_mapping = {
     "image-set-max-latitude-degrees": {"field_name": "max_latitude_degrees", "location": "header"},
     "image-set-min-longitude-degrees": {"field_name": "min_longitude_degrees", "location": "header"},
     "image-set-max-longitude-degrees": {"field_name": "max_longitude_degrees", "location": "header"},
-    "image-datetime": {"field_name": "date_time", "location": "header"},
+    "image-datetime": {"field_name": "date_time", "location": "header", "parse": parse_ifdo_datetime},
     "image-latitude": {
         "field_name": "latitude",
     },
@@ -126,11 +132,11 @@ ifdo_mapping = {
         "crud": image_camera_housing_viewport_crud,
     },
     "image-flatport-parameters": {
-        "field_name": "flatport_parameters",
+        "field_name": "flatport_parameter",
         "crud": image_flatport_parameter_crud,
     },
     "image-domeport-parameters": {
-        "field_name": "domeport_parameters",
+        "field_name": "domeport_parameter",
         "crud": image_domeport_parameter_crud,
     },
     "image-camera-calibration-model": {
@@ -166,3 +172,66 @@ ifdo_addional_fiels_mapping = {
 #     "provenance-entities": "provenance_entities",
 #     "provenance-activities": "provenance_activities",
 # }
+
+
+class IfdoField(BaseModel):
+    """An entry of `ifdo_mapping`, compiled for the section it is read from."""
+
+    model_config = {"arbitrary_types_allowed": True, "frozen": True}
+
+    field_name: str
+    column: str  # the field itself, or the foreign key of a related object
+    convert: Callable[[Any], Any] | None = None
+    crud: Any = None
+    unique: str | None = None
+    many: bool = False
+
+
+def enum_lookup(enum: type[Enum]) -> Callable[[Any], Any]:
+    """Build the converter of an iFDO value into the value of an enum member, matched case-insensitively.
+
+    Args:
+        enum (type[Enum]): The enum, a `CaseInsensitiveEnum`.
+
+    Returns:
+        Callable[[Any], Any]: The converter, raising the ValueError of the enum for unknown values.
+    """
+    members = {member.value.lower(): member.value for member in enum}
+
+    def convert(value: Any) -> Any:  # noqa: ANN401
+        if isinstance(value, str):
+            member = members.get(value.lower())
+            if member is not None:
+                return member
+        return enum(value).value
+
+    return convert
+
+
+@cache
+def ifdo_section_plan(section_name: str) -> dict[str, IfdoField]:
+    """Compile `ifdo_mapping` into the fields read from a section, so that parsing only visits the keys present.
+
+    Args:
+        section_name (str): The name of the section, "header" or "items".
+
+    Returns:
+        dict[str, IfdoField]: The fields of the section, keyed by iFDO key.
+    """
+    plan = {}
+    for key, value in ifdo_mapping.items():
+        location = value.get("location")
+        if location is not None and location != section_name:
+            continue
+        crud = value.get("crud")
+        many = bool(value.get("list"))
+        convert = enum_lookup(value["normalize"]) if value.get("normalize") else value.get("parse")
+        plan[key] = IfdoField(
+            field_name=value["field_name"],
+            column=f"{value['field_name']}_id" if crud is not None and not many else value["field_name"],
+            convert=convert,
+            crud=crud,
+            unique=value.get("unique"),
+            many=many,
+        )
+    return plan
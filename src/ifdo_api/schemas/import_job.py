@@ -0,0 +1,23 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel
+from pydantic import Field
+from ifdo_api.models.base import ImportJobStatusEnum
+
+
+class ImportJobSchema(BaseModel):
+    """Schema for an import job, reporting the progress of a background iFDO import."""
+
+    model_config = {"from_attributes": True}
+
+    id: UUID
+    status: ImportJobStatusEnum
+    image_set_id: UUID | None = Field(None, description="The image set created by the job, once its header is imported")
+    items_processed: int = Field(0, description="Number of image-set-items imported so far")
+    batches_committed: int = Field(0, description="Number of batches of images committed so far")
+    items_per_second: float | None = Field(None, description="Throughput of the job, in items per second")
+    errors: list[str] = Field(default_factory=list, description="The errors that made the job fail")
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
@@ -0,0 +1,13 @@
+from typing import Generic
+from typing import TypeVar
+from pydantic import BaseModel
+from pydantic import Field
+
+T = TypeVar("T")
+
+
+class PageSchema(BaseModel, Generic[T]):
+    """Schema for a page of results of an index endpoint."""
+
+    items: list[T] = Field(default_factory=list)
+    next: str | None = Field(None, description="Opaque cursor of the next page, None on the last page")
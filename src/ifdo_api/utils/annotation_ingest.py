@@ -0,0 +1,141 @@
+"""Parsing and validation of the annotations given by columns to the bulk ingest of an annotation set.
+
+Detectors produce annotations by millions, so their coordinates are not validated object by object: the
+coordinates of all the rows are flattened into one NumPy array, and the number of values required by each
+shape, the closure of the polygons and the radius of the circles are checked for every frame at once.
+"""
+
+import csv
+import io
+from collections.abc import Sequence
+from itertools import chain
+import numpy as np
+import orjson
+from ifdo_api.models.base import ShapeEnum
+
+# Columns of a CSV upload, the coordinates being JSON lists of lists as in the iFDO
+ANNOTATION_CSV_COLUMNS = ("image_id", "shape", "coordinates", "label", "annotator", "annotation_platform", "dimension_pixels", "creation_datetime")
+
+# Number of coordinate values of each shape, the minimum one for the shapes of any number of points
+COORDINATE_COUNTS = {
+    ShapeEnum.whole_image: 0,
+    ShapeEnum.single_pixel: 2,
+    ShapeEnum.circle: 3,
+    ShapeEnum.ellipse: 8,
+    ShapeEnum.rectangle: 8,
+    ShapeEnum.polyline: 4,
+    ShapeEnum.polygon: 8,
+}
+OPEN_SHAPES = (ShapeEnum.polyline, ShapeEnum.polygon)
+
+shapes = list(ShapeEnum)
+shape_codes = {shape.value: code for code, shape in enumerate(shapes)}
+coordinate_counts = np.array([COORDINATE_COUNTS[shape] for shape in shapes])
+open_shapes = np.array([shape in OPEN_SHAPES for shape in shapes])
+
+# Reasons a frame of coordinates is invalid, by order of precedence
+VALID, WRONG_COUNT, NOT_FINITE, NOT_CLOSED, NOT_POSITIVE_RADIUS = range(5)
+
+
+def coordinate_errors(shape_values: Sequence[str], coordinates: Sequence[Sequence[Sequence[float]]]) -> list[str | None]:
+    """Check the coordinates of annotations against their shapes.
+
+    Each annotation holds one list of coordinate values per frame (one for photos). Every frame must have the
+    number of values of the shape (an even number of at least 4 for polylines and 8 for polygons), finite values,
+    the same first and last points for polygons, and a positive radius for circles.
+
+    Args:
+        shape_values (Sequence[str]): The shape of each annotation, as in the iFDO (e.g. `single-pixel`).
+        coordinates (Sequence[Sequence[Sequence[float]]]): The frames of coordinate values of each annotation.
+
+    Returns:
+        list[str | None]: The error of each annotation, None for the valid ones.
+    """
+    rows = len(shape_values)
+    codes = np.fromiter((shape_codes[shape] for shape in shape_values), dtype=np.int64, count=rows)
+    frames_per_row = np.fromiter((len(frames) for frames in coordinates), dtype=np.int64, count=rows)
+    frames = int(frames_per_row.sum())
+    lengths = np.fromiter((len(frame) for frame in chain.from_iterable(coordinates)), dtype=np.int64, count=frames)
+    values = np.fromiter(chain.from_iterable(chain.from_iterable(coordinates)), dtype=np.float64, count=int(lengths.sum()))
+
+    frame_rows = np.repeat(np.arange(rows), frames_per_row)
+    frame_codes = codes[frame_rows]
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    expected = coordinate_counts[frame_codes]
+    counted = np.where(open_shapes[frame_codes], (lengths >= expected) & (lengths % 2 == 0), lengths == expected)
+    finite = np.bincount(np.repeat(np.arange(frames), lengths), weights=~np.isfinite(values), minlength=frames) == 0
+    closed = np.ones(frames, dtype=bool)
+    polygons = counted & (frame_codes == shape_codes[ShapeEnum.polygon.value])
+    closed[polygons] = (values[starts[polygons]] == values[ends[polygons] - 2]) & (values[starts[polygons] + 1] == values[ends[polygons] - 1])
+    radius = np.ones(frames, dtype=bool)
+    circles = counted & (frame_codes == shape_codes[ShapeEnum.circle.value])
+    radius[circles] = values[starts[circles] + 2] > 0
+    reasons = np.select([~counted, ~finite, ~closed, ~radius], [WRONG_COUNT, NOT_FINITE, NOT_CLOSED, NOT_POSITIVE_RADIUS], VALID)
+
+    errors: list[str | None] = [None] * rows
+    for row in np.flatnonzero(frames_per_row == 0):
+        errors[row] = "coordinates: at least one list of coordinate values is required"
+    # Only the first invalid frame of an annotation is reported
+    frame_positions = np.arange(frames) - np.repeat(np.cumsum(frames_per_row) - frames_per_row, frames_per_row)
+    for frame in np.flatnonzero(reasons)[::-1]:
+        shape = shapes[frame_codes[frame]]
+        errors[frame_rows[frame]] = f"coordinates[{frame_positions[frame]}]: " + frame_error(shape, int(reasons[frame]), int(lengths[frame]))
+    return errors
+
+
+def frame_error(shape: ShapeEnum, reason: int, length: int) -> str:
+    """Describe why a frame of coordinates is invalid.
+
+    Args:
+        shape (ShapeEnum): The shape of the annotation.
+        reason (int): The reason the frame is invalid.
+        length (int): The number of values of the frame.
+
+    Returns:
+        str: The error message.
+    """
+    if reason == WRONG_COUNT:
+        if shape in OPEN_SHAPES:
+            return f"a {shape.value} needs an even number of at least {COORDINATE_COUNTS[shape]} values, got {length}"
+        return f"a {shape.value} needs {COORDINATE_COUNTS[shape]} values, got {length}"
+    if reason == NOT_FINITE:
+        return "coordinate values must be finite numbers"
+    if reason == NOT_CLOSED:
+        return "the first and last points of a polygon must be equal"
+    return "the radius of a circle must be positive"
+
+
+def read_annotation_csv(content: str) -> dict[str, list]:
+    """Read annotations from a CSV document into columns.
+
+    Args:
+        content (str): The CSV document, with a header naming the columns in `ANNOTATION_CSV_COLUMNS`.
+
+    Raises:
+        ValueError: If a column is unknown or the coordinates of a row are not a JSON list.
+
+    Returns:
+        dict[str, list]: The values of each column of the document, empty cells being None.
+    """
+    reader = csv.reader(io.StringIO(content))
+    header = next(reader, [])
+    unknown = set(header) - set(ANNOTATION_CSV_COLUMNS)
+    if unknown:
+        msg = f"Unknown columns: {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+    columns: dict[str, list] = {name: [] for name in header}
+    values = [columns[name] for name in header]
+    coordinates = header.index("coordinates") if "coordinates" in header else None
+    for line, row in enumerate(reader, start=2):
+        for position, (column, cell) in enumerate(zip(values, row, strict=False)):
+            if position == coordinates:
+                try:
+                    column.append(orjson.loads(cell))
+                except orjson.JSONDecodeError as error:
+                    msg = f"Line {line}: the coordinates must be a JSON list of lists"
+                    raise ValueError(msg) from error
+            else:
+                column.append(cell or None)
+    return columns
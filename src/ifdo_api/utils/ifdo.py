@@ -1,10 +1,53 @@
+import asyncio
+import hashlib
 import json
+import multiprocessing
+import os
+import re
+import sys
+from collections import deque
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from datetime import timezone
 from enum import Enum
+from functools import cache
+from itertools import islice
+from pathlib import Path
+from typing import Any
+from urllib.parse import urldefrag
+from urllib.parse import urlsplit
+import orjson
 import requests
-import yaml
 from fastapi import UploadFile
 from jsonschema import Draft202012Validator
+from referencing import Registry
+from referencing import Resource
+from referencing.exceptions import NoSuchResource
+from referencing.jsonschema import DRAFT202012
+from starlette.concurrency import run_in_threadpool
+from ifdo_api.api.exceptions import IfdoValidationException
 from ifdo_api.api.exceptions import ValueErrorException
+from ifdo_api.utils.ifdo_stream import IFDO_HEADER
+from ifdo_api.utils.ifdo_stream import IFDO_ITEMS
+from ifdo_api.utils.ifdo_stream import achunked
+from ifdo_api.utils.ifdo_stream import chunked
+from ifdo_api.utils.ifdo_stream import iter_ifdo_items
+from ifdo_api.utils.ifdo_stream import read_ifdo_header
+
+IFDO_SCHEMA_URL = "https://www.ifdo-schema.org/schemas/{version}/ifdo.json"
+IFDO_SCHEMA_DIR = Path(os.getenv("IFDO_SCHEMA_DIR", Path(__file__).parent / "ifdo_schemas"))
+IFDO_VERSION_PATTERN = re.compile(r"^v\d+\.\d+\.\d+$")
+# The `$ref` of a schema to another document (e.g. the annotation and provenance schemas of an iFDO version)
+IFDO_SCHEMA_REFERENCE = re.compile(r'"\$ref":\s*"(https?://[^"#]+)')
+IFDO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Validation stops once this many errors are found
+IFDO_MAX_ERRORS = int(os.getenv("IFDO_MAX_ERRORS", "1000"))
+# Processes validating the items of an iFDO, 1 to validate them without a process pool
+IFDO_VALIDATION_WORKERS = int(os.getenv("IFDO_VALIDATION_WORKERS", str(os.cpu_count() or 1)))
+IFDO_VALIDATION_CHUNK_SIZE = int(os.getenv("IFDO_VALIDATION_CHUNK_SIZE", "1000"))
+# Bytes of an upload read at once while hashing it
+IFDO_HASH_CHUNK_SIZE = 1024 * 1024
 
 
 class DataFormat(str, Enum):
@@ -14,57 +57,50 @@ class DataFormat(str, Enum):
     file = "file"
 
 
-async def validate_ifdo_data(data_format: DataFormat, input_data: str | None, input_file: UploadFile | None) -> dict:
-    """Validate and parse IFDO data from the provided input."""
-    if data_format == DataFormat.ifdo:
-        if input_data is None:
-            raise ValueErrorException(detail="Invalid IFDO data format")
-        parsed_data = _parse_json_string(input_data)
-
-    elif data_format == DataFormat.file:
-        if input_file is None:
-            raise ValueErrorException(detail="File input is required for 'file' format")
-        parsed_data = await _read_and_parse_file(input_file)
+async def validate_ifdo_data(input_data: str | None) -> dict:
+    """Validate and parse IFDO data given as a JSON string.
 
-    else:
-        raise ValueErrorException(detail="Unsupported data format")
+    Files are parsed and validated as they are imported instead, see `stream_ifdo_file`.
+    """
+    if input_data is None:
+        raise ValueErrorException(detail="Invalid IFDO data format")
+    parsed_data = _parse_json_string(input_data)
 
-    _handle_validation(parsed_data)
+    # A schema missing from the store is downloaded, which must not block the event loop
+    await run_in_threadpool(_handle_validation, parsed_data)
     return parsed_data
 
 
-async def _read_and_parse_file(file: UploadFile) -> dict:
-    """Read and parse a file as JSON or YAML.
+async def hash_ifdo_upload(data_format: DataFormat, input_data: str | None, input_file: UploadFile | None) -> str | None:
+    """Compute the SHA-256 hash of a raw iFDO upload, before it is parsed.
 
-    Args:
-        file (UploadFile): The file to read and parse.
+    The file is read by chunks of `IFDO_HASH_CHUNK_SIZE` bytes and rewound, so that it can be parsed afterwards.
 
-    Raises:
-        ValueErrorException: If the file content is not valid JSON or YAML.
+    Args:
+        data_format (DataFormat): The format of the IFDO data.
+        input_data (str | None): The IFDO data given as a JSON string.
+        input_file (UploadFile | None): The uploaded JSON or YAML file.
 
     Returns:
-        dict: Parsed content of the file.
+        str | None: The hexadecimal hash, None if the upload is missing.
     """
-    raw_data = await file.read()
-    text_data = raw_data.decode("utf-8")
-
-    if file.content_type == "application/json":
-        try:
-            return json.loads(text_data)
-        except json.JSONDecodeError as err:
-            raise ValueErrorException(detail="Invalid JSON content in the file") from err
-
-    if file.content_type == "application/yaml":
-        try:
-            return yaml.safe_load(text_data)
-        except yaml.YAMLError as err:
-            raise ValueErrorException(detail="Invalid YAML content in the file") from err
-
-    raise ValueErrorException(detail="File must be in JSON or YAML format")
+    digest = hashlib.sha256()
+    if data_format == DataFormat.ifdo:
+        if input_data is None:
+            return None
+        digest.update(input_data.encode("utf-8"))
+        return digest.hexdigest()
+    if input_file is None:
+        return None
+    await input_file.seek(0)
+    while chunk := await input_file.read(IFDO_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    await input_file.seek(0)
+    return digest.hexdigest()
 
 
 def _parse_json_string(data: str) -> dict:
-    """Parse a JSON string and return the result.
+    """Parse a JSON string with orjson and return the result.
 
     Args:
         data (str): JSON string to parse.
@@ -76,26 +112,113 @@ def _parse_json_string(data: str) -> dict:
         dict: Parsed JSON data.
     """
     try:
-        return json.loads(data)
-    except json.JSONDecodeError as err:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError as err:
         raise ValueErrorException(detail="Invalid JSON body") from err
 
 
+def parse_ifdo_datetime(value: str | datetime) -> datetime:
+    """Parse an iFDO date-time into the naive UTC datetime stored in the database.
+
+    iFDO date-times default to the "%Y-%m-%d %H:%M:%S.%f" format, ISO 8601 strings are accepted as well.
+
+    Args:
+        value (str | datetime): The date-time from the iFDO data.
+
+    Raises:
+        ValueErrorException: If the value is not a valid date-time.
+
+    Returns:
+        datetime: The parsed date-time, converted to UTC if it carries a timezone.
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.strptime(value, IFDO_DATETIME_FORMAT)  # noqa: DTZ007
+        except (TypeError, ValueError):
+            try:
+                value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except (AttributeError, ValueError) as error:
+                msg = f"Invalid iFDO date-time: {value}"
+                raise ValueErrorException(msg) from error
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def stream_ifdo_file(input_file: UploadFile | None) -> tuple[dict, AsyncIterator[tuple[str, Any]]]:
+    """Validate and parse an uploaded IFDO file incrementally.
+
+    The header is read and validated up front, while the items are parsed as the returned iterator is consumed,
+    so that the file is never loaded in memory as a whole. The items are validated by chunks in the validation
+    pool, up to one chunk per worker being validated while the next ones are parsed. Once an item is invalid,
+    no more items are yielded: the rest of the file is validated until `IFDO_MAX_ERRORS` errors are found, and
+    the iteration raises them, so that the import consuming the items rolls back.
+
+    Args:
+        input_file (UploadFile | None): The uploaded JSON or YAML file.
+
+    Raises:
+        ValueErrorException: If no file is given or its header can not be read.
+        IfdoValidationException: If the header is invalid.
+
+    Returns:
+        tuple[dict, AsyncIterator[tuple[str, Any]]]: The `image-set-header` and the (name, item) entries of `image-set-items`.
+    """
+    if input_file is None:
+        raise ValueErrorException(detail="File input is required for 'file' format")
+    header = await read_ifdo_header(input_file)
+    ifdo_version = header.get("image-set-ifdo-version", "v2.1.0")
+    # Also fills the schema store before the validation workers read it
+    _report_validation_errors(await run_in_threadpool(validate_ifdo_section, header, IFDO_HEADER, ifdo_version, IFDO_MAX_ERRORS))
+
+    async def items() -> AsyncIterator[tuple[str, Any]]:
+        errors = []
+        validations = deque()
+        chunks = achunked(iter_ifdo_items(input_file), IFDO_VALIDATION_CHUNK_SIZE)
+        while len(errors) < IFDO_MAX_ERRORS:
+            chunk = await anext(chunks, None)
+            if chunk is not None:
+                validations.append((chunk, submit_ifdo_items_validation(chunk, ifdo_version, IFDO_MAX_ERRORS - len(errors))))
+                if len(validations) < IFDO_VALIDATION_WORKERS:
+                    continue
+            if not validations:
+                break
+            chunk, validation = validations.popleft()
+            errors += (await validation)[: IFDO_MAX_ERRORS - len(errors)]
+            # Once an item is invalid, the rest of the file is only validated, to report all the errors at once
+            if not errors:
+                for name, item in chunk:
+                    yield name, item
+        for _, validation in validations:
+            validation.cancel()
+        _report_validation_errors(errors)
+
+    return header, items()
+
+
 def _handle_validation(ifdo_data: dict) -> None:
-    """Validate IFDO data and print errors if any.
+    """Validate IFDO data.
 
     Args:
         ifdo_data (dict): Parsed IFDO data.
 
     Raises:
-        ValueErrorException: If validation errors are found.
+        IfdoValidationException: If the data does not match the schema of its version.
     """
-    errors = validate_ifdo(ifdo_data=ifdo_data)
-    if not errors:
-        return
-    msg_error = "Validation errors in the output iFDO metadata file:\n"
-    msg_error += "".join(f"{format_ifdo_validation_error(err['path'])}: {err['message']}\n" for err in errors)
-    # print(msg_error)
+    _report_validation_errors(validate_ifdo(ifdo_data=ifdo_data))
+
+
+def _report_validation_errors(errors: list) -> None:
+    """Raise validation errors if any.
+
+    Args:
+        errors (list): The errors, as returned by `validate_ifdo`.
+
+    Raises:
+        IfdoValidationException: If there are errors, with one message per error.
+    """
+    if errors:
+        raise IfdoValidationException([f"{format_ifdo_validation_error(err['path'])}: {err['message']}" for err in errors])
 
 
 def format_ifdo_validation_error(text: list) -> str:
@@ -112,32 +235,258 @@ def format_ifdo_validation_error(text: list) -> str:
     return ".".join(map(str, text))
 
 
-def validate_ifdo(ifdo_data: dict) -> list:
+def validate_ifdo(ifdo_data: dict, max_errors: int = IFDO_MAX_ERRORS) -> list:
     """validate_ifdo method.
 
-    Validates input data against iFDO scheme. Raises an exception if the
-    data is invalid.
+    Validates input data against iFDO scheme. The header is validated once, then the items by chunks against
+    the sub-schema of `image-set-items`, in the validation pool when there are several chunks.
 
     Args:
         ifdo_data (Dict): parsed iFDO data
+        max_errors (int): Number of errors after which the validation stops.
 
     Returns:
-        list: List of validation errors.
+        list: List of validation errors, in document order.
     """
     ifdo_version = ifdo_data.get("image-set-header", {}).get("image-set-ifdo-version", "v2.1.0")
     if not ifdo_version:
         msg = "No iFDO version found in metadata."
         raise ValueErrorException(msg)
-    schema_file_path = f"https://www.ifdo-schema.org/schemas/{ifdo_version}/ifdo.json"
-    response = requests.get(schema_file_path, stream=True, timeout=10)
-    response.raise_for_status()
-    schema = json.loads(response.content)
-    validator = Draft202012Validator(schema)
-    errors = sorted(validator.iter_errors(ifdo_data), key=lambda e: e.path)
-    return [
-        {
-            "path": list(error.absolute_path),
-            "message": error.message,
-        }
-        for error in errors
-    ]
+    errors = [{"path": [], "message": f"'{section}' is a required property"} for section in (IFDO_HEADER, IFDO_ITEMS) if section not in ifdo_data]
+    if IFDO_HEADER in ifdo_data:
+        errors += validate_ifdo_section(ifdo_data[IFDO_HEADER], IFDO_HEADER, ifdo_version, max_errors)
+    items = ifdo_data.get(IFDO_ITEMS)
+    if isinstance(items, dict):
+        errors += validate_ifdo_items(list(items.items()), ifdo_version, max_errors - len(errors))
+    elif items is not None:
+        errors += validate_ifdo_section(items, IFDO_ITEMS, ifdo_version, max_errors)
+    return errors[:max_errors]
+
+
+def validate_ifdo_items(items: list[tuple[str, Any]], ifdo_version: str, max_errors: int = IFDO_MAX_ERRORS) -> list:
+    """Validate entries of `image-set-items` by chunks, in the validation pool when there are several chunks.
+
+    The errors of the chunks are merged in document order, and the chunks not started yet are cancelled once
+    `max_errors` errors are found.
+
+    Args:
+        items (list[tuple[str, Any]]): The (name, item) entries.
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+        max_errors (int): Number of errors after which the validation stops.
+
+    Returns:
+        list: List of validation errors, with paths from the root of the iFDO.
+    """
+    if max_errors <= 0:
+        return []
+    chunks = [dict(chunk) for chunk in chunked(items, IFDO_VALIDATION_CHUNK_SIZE)]
+    pool = get_validation_pool() if len(chunks) > 1 else None
+    futures = []
+    if pool is None:
+        results = (validate_ifdo_section(chunk, IFDO_ITEMS, ifdo_version, max_errors) for chunk in chunks)
+    else:
+        futures = [pool.submit(validate_ifdo_section, chunk, IFDO_ITEMS, ifdo_version, max_errors) for chunk in chunks]
+        results = (future.result() for future in futures)
+    errors = []
+    try:
+        for result in results:
+            errors.extend(result)
+            if len(errors) >= max_errors:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    return errors[:max_errors]
+
+
+def submit_ifdo_items_validation(items: list[tuple[str, Any]], ifdo_version: str, max_errors: int = IFDO_MAX_ERRORS) -> asyncio.Future:
+    """Validate a chunk of entries of `image-set-items` in the validation pool, without blocking the event loop.
+
+    Args:
+        items (list[tuple[str, Any]]): The (name, item) entries.
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+        max_errors (int): Number of errors after which the validation stops.
+
+    Returns:
+        asyncio.Future: Future of the list of validation errors, run in a thread if there is no pool.
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_validation_pool(), validate_ifdo_section, dict(items), IFDO_ITEMS, ifdo_version, max_errors)
+
+
+def validate_ifdo_section(data: dict, section: str, ifdo_version: str, max_errors: int | None = None) -> list:
+    """Validate one section of an iFDO, or a subset of its items, against the sub-schema of the section.
+
+    Args:
+        data (dict): The `image-set-header`, or some entries of `image-set-items`.
+        section (str): The name of the section.
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+        max_errors (int | None): Number of errors after which the validation stops, None for all of them.
+
+    Returns:
+        list: List of validation errors, with paths from the root of the iFDO.
+    """
+    validator = get_ifdo_section_validator(ifdo_version, section)
+    errors = sorted(islice(validator.iter_errors(data), max_errors), key=lambda e: e.path)
+    return [{"path": [section, *error.absolute_path], "message": error.message} for error in errors]
+
+
+@cache
+def get_validation_pool() -> ProcessPoolExecutor | None:
+    """Get the pool of processes validating iFDO items, started on first use.
+
+    Workers are spawned rather than forked, as the API process runs threads. Each one compiles the validators
+    it uses once.
+
+    Returns:
+        ProcessPoolExecutor | None: The pool, or None if `IFDO_VALIDATION_WORKERS` is 1.
+    """
+    if IFDO_VALIDATION_WORKERS <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=IFDO_VALIDATION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def close_validation_pool() -> None:
+    """Shut down the validation pool, if it was started."""
+    if get_validation_pool.cache_info().currsize:
+        pool = get_validation_pool()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        get_validation_pool.cache_clear()
+
+
+@cache
+def get_ifdo_section_validator(ifdo_version: str, section: str) -> Draft202012Validator:
+    """Get the compiled validator of a section of an iFDO version, built once per process.
+
+    The validator refers to the sub-schema of the section inside the iFDO schema, so that the references
+    of the sub-schema resolve against the whole schema, and the other documents it refers to are read from
+    the directory of the version in the schema store.
+
+    Args:
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+        section (str): The name of the section, "image-set-header" or "image-set-items".
+
+    Returns:
+        Draft202012Validator: The validator of the section.
+    """
+    schema = load_ifdo_schema(ifdo_version)
+    uri = schema.get("$id") or f"urn:ifdo:{ifdo_version}"
+    registry = Registry(retrieve=lambda reference: load_ifdo_schema_reference(ifdo_version, reference))
+    registry = registry.with_resource(uri, Resource.from_contents(schema, default_specification=DRAFT202012))
+    return Draft202012Validator({"$ref": f"{uri}#/properties/{section}"}, registry=registry)
+
+
+def load_ifdo_schema(ifdo_version: str) -> dict:
+    """Load the iFDO schema of a version from the schema store.
+
+    The store is the `ifdo_schemas` directory bundled with the package, or the directory set in the
+    IFDO_SCHEMA_DIR environment variable. Versions missing from the store are downloaded once, which blocks:
+    from the event loop, call it through `run_in_threadpool`.
+
+    Args:
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+
+    Raises:
+        ValueErrorException: If the version is invalid or its schema cannot be found.
+
+    Returns:
+        dict: The iFDO JSON schema.
+    """
+    if not IFDO_VERSION_PATTERN.match(ifdo_version):
+        msg = f"Invalid iFDO version: {ifdo_version}"
+        raise ValueErrorException(msg)
+    schema_path = IFDO_SCHEMA_DIR / ifdo_version / "ifdo.json"
+    if schema_path.is_file():
+        return json.loads(schema_path.read_text(encoding="utf-8"))
+    return refresh_ifdo_schema(ifdo_version)
+
+
+def load_ifdo_schema_reference(ifdo_version: str, uri: str) -> Resource:
+    """Load a document the iFDO schema of a version refers to, from the directory of the version in the store.
+
+    Args:
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+        uri (str): The URI of the document, stored under the last segment of its path.
+
+    Raises:
+        NoSuchResource: If the document is not in the store.
+
+    Returns:
+        Resource: The document.
+    """
+    path = IFDO_SCHEMA_DIR / ifdo_version / schema_reference_name(uri)
+    if not path.is_file():
+        raise NoSuchResource(ref=uri)
+    return Resource.from_contents(json.loads(path.read_text(encoding="utf-8")), default_specification=DRAFT202012)
+
+
+def schema_reference_name(uri: str) -> str:
+    """Return the file name a document referred to by an iFDO schema is stored under.
+
+    Args:
+        uri (str): The URI of the document, e.g. "https://marine-imaging.com/fair/schemas/provenance-v0.1.0.json/".
+
+    Returns:
+        str: The last segment of its path, e.g. "provenance-v0.1.0.json".
+    """
+    return Path(urlsplit(uri).path.rstrip("/")).name
+
+
+def refresh_ifdo_schema(ifdo_version: str) -> dict:
+    """Download the iFDO schema of a version, and the documents it refers to, and write them to the schema store.
+
+    Args:
+        ifdo_version (str): The iFDO version, e.g. "v2.1.0".
+
+    Raises:
+        ValueErrorException: If the version is invalid or the schema cannot be downloaded.
+
+    Returns:
+        dict: The iFDO JSON schema.
+    """
+    if not IFDO_VERSION_PATTERN.match(ifdo_version):
+        msg = f"Invalid iFDO version: {ifdo_version}"
+        raise ValueErrorException(msg)
+    documents = {"ifdo.json": download_ifdo_schema(IFDO_SCHEMA_URL.format(version=ifdo_version), ifdo_version)}
+    references = {urldefrag(uri).url for uri in IFDO_SCHEMA_REFERENCE.findall(documents["ifdo.json"].decode())}
+    documents |= {schema_reference_name(uri): download_ifdo_schema(uri, ifdo_version) for uri in sorted(references)}
+
+    # Written as published, byte for byte
+    directory = IFDO_SCHEMA_DIR / ifdo_version
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, content in documents.items():
+            (directory / name).write_bytes(content)
+    except OSError:
+        pass  # read-only store, the schema is still used for this process
+    get_ifdo_section_validator.cache_clear()
+    return json.loads(documents["ifdo.json"])
+
+
+def download_ifdo_schema(url: str, ifdo_version: str) -> bytes:
+    """Download an iFDO schema, or a document it refers to.
+
+    Args:
+        url (str): The URL of the document.
+        ifdo_version (str): The iFDO version, for the error message.
+
+    Raises:
+        ValueErrorException: If the document cannot be downloaded.
+
+    Returns:
+        bytes: The document.
+    """
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as err:
+        msg = f"iFDO schema {ifdo_version} is not available"
+        raise ValueErrorException(msg) from err
+    return response.content
+
+
+if __name__ == "__main__":
+    # Fill the schema store, e.g. `python -m ifdo_api.utils.ifdo v2.1.0`
+    for version in sys.argv[1:]:
+        refresh_ifdo_schema(version)
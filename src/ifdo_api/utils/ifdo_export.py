@@ -0,0 +1,139 @@
+"""Serialization of an image_set as an iFDO document, written as its items are read.
+
+The inverse of `ifdo_api.utils.ifdo_stream`: the header and the items are converted back to the values of the
+iFDO (date-times in the iFDO format, enum values, related objects as the dicts they were imported from), and
+the document is produced as a sequence of byte chunks, JSON or YAML, so that it can be streamed without being
+held in memory.
+"""
+
+import json
+from collections.abc import AsyncIterable
+from collections.abc import AsyncIterator
+from datetime import datetime
+from enum import Enum
+from typing import Any
+from uuid import UUID
+import yaml
+from sqlalchemy import inspect
+from ifdo_api.models.base import Base
+from ifdo_api.utils.ifdo import IFDO_DATETIME_FORMAT
+from ifdo_api.utils.ifdo_stream import IFDO_HEADER
+from ifdo_api.utils.ifdo_stream import IFDO_ITEMS
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Columns of the related objects that are not part of the iFDO
+EXCLUDED_COLUMNS = ("id", "created_at", "updated_at")
+
+
+class IfdoDumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    """YAML dumper, in C when available, writing the related objects shared by several fields in full rather than as aliases."""
+
+    def ignore_aliases(self, data: Any) -> bool:  # noqa: ANN401, ARG002
+        """Never replace a repeated object by an alias.
+
+        Args:
+            data (Any): The object being represented.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+
+def ifdo_value(value: Any) -> Any:  # noqa: ANN401
+    """Convert a value read from the database into its iFDO representation.
+
+    Args:
+        value (Any): A column value, a related object or a list of them.
+
+    Returns:
+        Any: The value, made of JSON and YAML serializable types.
+    """
+    if isinstance(value, Base):
+        return related_dict(value)
+    if isinstance(value, list):
+        return [ifdo_value(item) for item in value]
+    if isinstance(value, datetime):
+        return value.strftime(IFDO_DATETIME_FORMAT)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def related_dict(obj: Base) -> dict:
+    """Convert a related object (context, event, creator, ...) into the iFDO dict it is imported from.
+
+    Args:
+        obj (Base): The object.
+
+    Returns:
+        dict: Its columns set to a value, without the keys of the database.
+    """
+    values = {}
+    for column in inspect(type(obj)).columns:
+        value = getattr(obj, column.key)
+        if column.key not in EXCLUDED_COLUMNS and value is not None:
+            values[column.key] = ifdo_value(value)
+    return values
+
+
+def is_empty(value: Any) -> bool:  # noqa: ANN401
+    """Check whether a value is unset, in which case the value of the image_set applies.
+
+    Args:
+        value (Any): The value of the image.
+
+    Returns:
+        bool: True for None and empty strings, lists and dicts, as `Image.get_merged_field`.
+    """
+    return value is None or (isinstance(value, str | list | dict) and not value)
+
+
+async def dump_ifdo_json(header: dict, items: AsyncIterable[tuple[str, dict]]) -> AsyncIterator[bytes]:
+    """Write an iFDO document as JSON.
+
+    Args:
+        header (dict): The `image-set-header`.
+        items (AsyncIterable[tuple[str, dict]]): The (name, item) entries of `image-set-items`.
+
+    Yields:
+        bytes: Chunks of the document.
+    """
+    chunk = bytearray(f'{{"{IFDO_HEADER}":{json.dumps(header)},"{IFDO_ITEMS}":{{'.encode())
+    separator = b""
+    async for name, item in items:
+        chunk += separator + f"{json.dumps(name)}:{json.dumps(item)}".encode()
+        separator = b","
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    chunk += b"}}"
+    yield bytes(chunk)
+
+
+async def dump_ifdo_yaml(header: dict, items: AsyncIterable[tuple[str, dict]]) -> AsyncIterator[bytes]:
+    """Write an iFDO document as YAML, each item being dumped on its own under `image-set-items`.
+
+    Args:
+        header (dict): The `image-set-header`.
+        items (AsyncIterable[tuple[str, dict]]): The (name, item) entries of `image-set-items`.
+
+    Yields:
+        bytes: Chunks of the document.
+    """
+    chunk = bytearray(yaml.dump({IFDO_HEADER: header}, Dumper=IfdoDumper, sort_keys=False, allow_unicode=True).encode())
+    empty = True
+    async for name, item in items:
+        if empty:
+            chunk += f"{IFDO_ITEMS}:\n".encode()
+            empty = False
+        text = yaml.dump({name: item}, Dumper=IfdoDumper, sort_keys=False, allow_unicode=True)
+        chunk += "".join(f"  {line}" for line in text.splitlines(keepends=True)).encode()
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if empty:
+        chunk += f"{IFDO_ITEMS}: {{}}\n".encode()
+    yield bytes(chunk)
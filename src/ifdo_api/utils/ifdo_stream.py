@@ -0,0 +1,373 @@
+"""Incremental parsing of uploaded iFDO files.
+
+An uploaded file is parsed in two passes over the spooled upload: the first one stops as soon as the
+`image-set-header` object is read, and the second one yields the entries of `image-set-items` one at a
+time. Neither the raw file nor the whole document is held in memory, whatever the order of the sections.
+JSON is parsed from the parser events of ijson, YAML from the events of PyYAML (on the libyaml parser when
+PyYAML is built with it), each item being composed and constructed on its own. Uploads compressed with gzip
+or zstd are decompressed as they are parsed, so each pass only holds the buffers of the decompressor.
+"""
+
+import gzip
+import zlib
+from collections.abc import AsyncIterable
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import PurePath
+from typing import Any
+from typing import BinaryIO
+import ijson
+import yaml
+import zstandard
+from fastapi import UploadFile
+from starlette.concurrency import iterate_in_threadpool
+from starlette.concurrency import run_in_threadpool
+from yaml.composer import Composer
+from ifdo_api.api.exceptions import ValueErrorException
+
+IFDO_HEADER = "image-set-header"
+IFDO_ITEMS = "image-set-items"
+JSON_CONTENT_TYPE = "application/json"
+YAML_CONTENT_TYPE = "application/yaml"
+GZIP_CONTENT_TYPE = "application/gzip"
+ZSTD_CONTENT_TYPE = "application/zstd"
+YAML_SUFFIXES = {".yaml", ".yml"}
+
+# Compression of an upload, given by its content type or by the `Content-Encoding` header of the file
+COMPRESSED_CONTENT_TYPES = {GZIP_CONTENT_TYPE: "gzip", "application/x-gzip": "gzip", ZSTD_CONTENT_TYPE: "zstd"}
+CONTENT_ENCODINGS = {"gzip": "gzip", "x-gzip": "gzip", "zstd": "zstd"}
+ENCODING_CONTENT_TYPES = {"gzip": GZIP_CONTENT_TYPE, "zstd": ZSTD_CONTENT_TYPE}
+ENCODING_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# Errors of a corrupted or truncated compressed upload
+DECOMPRESSION_ERRORS = (gzip.BadGzipFile, EOFError, zlib.error, zstandard.ZstdError)
+
+# Number of YAML items parsed per worker thread round trip
+YAML_CHUNK_SIZE = 256
+
+
+class IfdoLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader), Composer):
+    """Safe YAML loader, on the libyaml parser when available, composing the document one node at a time.
+
+    The C loader only composes whole documents, so the nodes are composed from its events by the composer
+    of the pure Python loader, while the scanning and the parsing, most of the work, stay in C.
+    """
+
+    def __init__(self, stream: BinaryIO | str | bytes) -> None:
+        super().__init__(stream)
+        self.anchors = {}
+
+
+async def read_ifdo_header(file: UploadFile) -> dict:
+    """Read the `image-set-header` of an uploaded iFDO file, without parsing its items.
+
+    Args:
+        file (UploadFile): The uploaded JSON or YAML file, possibly compressed.
+
+    Raises:
+        ValueErrorException: If the file is not valid JSON or YAML, or has no header.
+
+    Returns:
+        dict: The header.
+    """
+    check_content_type(file)
+    await file.seek(0)
+    header = None
+    with open_upload(file) as stream:
+        if upload_content_type(file) == JSON_CONTENT_TYPE:
+            try:
+                async for value in ijson.items_async(async_reader(file, stream), IFDO_HEADER, use_float=True):
+                    header = value
+                    break
+            except (ijson.JSONError, *DECOMPRESSION_ERRORS) as err:
+                raise ValueErrorException(detail="Invalid JSON content in the file") from err
+        else:
+            try:
+                header = await run_in_threadpool(read_yaml_header, stream)
+            except (yaml.YAMLError, *DECOMPRESSION_ERRORS) as err:
+                raise ValueErrorException(detail="Invalid YAML content in the file") from err
+    if not isinstance(header, dict) or not header:
+        msg = "Image set header and image set items are required in IFDO data"
+        raise ValueErrorException(msg)
+    return header
+
+
+async def iter_ifdo_items(file: UploadFile) -> AsyncIterator[tuple[str, Any]]:
+    """Yield the entries of the `image-set-items` of an uploaded iFDO file, one at a time.
+
+    Parse errors are raised when the iteration reaches them, so they abort the import consuming the items.
+
+    Args:
+        file (UploadFile): The uploaded JSON or YAML file, possibly compressed.
+
+    Yields:
+        tuple[str, Any]: The name of each image and its item, a dict (or a list of dicts for videos).
+    """
+    check_content_type(file)
+    await file.seek(0)
+    with open_upload(file) as stream:
+        if upload_content_type(file) == JSON_CONTENT_TYPE:
+            async for name, item in ijson.kvitems_async(async_reader(file, stream), IFDO_ITEMS, use_float=True):
+                yield name, item
+            return
+        async for chunk in iterate_in_threadpool(chunked(iter_yaml_items(stream), YAML_CHUNK_SIZE)):
+            for name, item in chunk:
+                yield name, item
+
+
+def check_content_type(file: UploadFile) -> None:
+    """Check that an uploaded file is JSON or YAML, uncompressed or compressed with gzip or zstd.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Raises:
+        ValueErrorException: If the content type is neither JSON nor YAML, or the compression is not supported.
+    """
+    upload_encoding(file)
+    if upload_content_type(file) not in (JSON_CONTENT_TYPE, YAML_CONTENT_TYPE):
+        raise ValueErrorException(detail="File must be in JSON or YAML format")
+
+
+def upload_encoding(file: UploadFile) -> str | None:
+    """Get the compression of an uploaded file, from its `Content-Encoding` header or else its content type.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Raises:
+        ValueErrorException: If the file is compressed with another encoding than gzip or zstd.
+
+    Returns:
+        str | None: `gzip` or `zstd`, None if the file is not compressed.
+    """
+    encoding = (file.headers.get("content-encoding") or "identity").strip().lower()
+    if encoding == "identity":
+        return COMPRESSED_CONTENT_TYPES.get(file.content_type)
+    if encoding not in CONTENT_ENCODINGS:
+        raise ValueErrorException(detail="File must be uncompressed or compressed with gzip or zstd")
+    return CONTENT_ENCODINGS[encoding]
+
+
+def upload_content_type(file: UploadFile) -> str | None:
+    """Get the content type of an uploaded file once decompressed.
+
+    A file whose content type is the compression (e.g. `application/gzip`) is YAML if its name has a YAML
+    suffix (e.g. `ifdo.yaml.gz`), and JSON otherwise.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Returns:
+        str | None: The content type of the iFDO.
+    """
+    if file.content_type not in COMPRESSED_CONTENT_TYPES:
+        return file.content_type
+    if YAML_SUFFIXES & set(PurePath(file.filename or "").suffixes):
+        return YAML_CONTENT_TYPE
+    return JSON_CONTENT_TYPE
+
+
+@contextmanager
+def open_upload(file: UploadFile) -> Iterator[BinaryIO]:
+    """Open the content of an uploaded file, decompressed as it is read.
+
+    Args:
+        file (UploadFile): The uploaded file, positioned at its start.
+
+    Yields:
+        BinaryIO: The uploaded file, or a decompressing reader over it.
+    """
+    encoding = upload_encoding(file)
+    if encoding is None:
+        yield file.file
+        return
+    if encoding == "gzip":
+        stream = gzip.GzipFile(fileobj=file.file, mode="rb")
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(file.file, read_across_frames=True, closefd=False)
+    try:
+        yield stream
+    finally:
+        stream.close()
+
+
+def async_reader(file: UploadFile, stream: BinaryIO) -> Any:  # noqa: ANN401
+    """Get an object with an asynchronous `read`, as the asynchronous parsers of ijson expect.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        stream (BinaryIO): The content of the file, from `open_upload`.
+
+    Returns:
+        Any: The uploaded file itself if it is not compressed, or else a reader decompressing in a worker thread.
+    """
+    if stream is file.file:
+        return file
+    # An UploadFile reads a file that is not a spooled temporary file in a worker thread
+    return UploadFile(stream)
+
+
+def load_yaml(data: BinaryIO | str | bytes) -> Any:  # noqa: ANN401
+    """Load a whole YAML document, composed at once by the libyaml parser when available.
+
+    Args:
+        data (BinaryIO | str | bytes): The YAML document or a file to read it from.
+
+    Returns:
+        Any: The constructed document.
+    """
+    loader = IfdoLoader(data)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def read_yaml_header(stream: BinaryIO) -> dict | None:
+    """Construct the `image-set-header` of a YAML iFDO, skipping the other top-level values.
+
+    Args:
+        stream (BinaryIO): The YAML file, read from the start.
+
+    Returns:
+        dict | None: The header, or None if the document has none.
+    """
+    stream.seek(0)
+    loader = IfdoLoader(stream)
+    try:
+        for key in iter_yaml_keys(loader):
+            if key == IFDO_HEADER:
+                return construct_yaml_value(loader)
+            skip_yaml_value(loader)
+    finally:
+        loader.dispose()
+    return None
+
+
+def iter_yaml_items(stream: BinaryIO) -> Iterator[tuple[str, Any]]:
+    """Yield the entries of the `image-set-items` mapping of a YAML iFDO, each constructed on its own.
+
+    Args:
+        stream (BinaryIO): The YAML file, read from the start.
+
+    Raises:
+        ValueErrorException: If `image-set-items` is not a mapping.
+
+    Yields:
+        tuple[str, Any]: The name of each image and its item.
+    """
+    stream.seek(0)
+    loader = IfdoLoader(stream)
+    try:
+        for key in iter_yaml_keys(loader):
+            if key != IFDO_ITEMS:
+                skip_yaml_value(loader)
+                continue
+            if not loader.check_event(yaml.MappingStartEvent):
+                msg = f"{IFDO_ITEMS} must be a mapping"
+                raise ValueErrorException(msg)
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                name = construct_yaml_value(loader)
+                yield name, construct_yaml_value(loader)
+            loader.get_event()
+            return
+    finally:
+        loader.dispose()
+
+
+def iter_yaml_keys(loader: IfdoLoader) -> Iterator[Any]:
+    """Yield the keys of the top-level mapping of a YAML document.
+
+    After each key, the caller consumes its value with `construct_yaml_value` or `skip_yaml_value`.
+
+    Args:
+        loader (IfdoLoader): Loader positioned at the start of the stream.
+
+    Raises:
+        ValueErrorException: If the document is not a mapping.
+
+    Yields:
+        Any: The keys, in document order.
+    """
+    loader.get_event()  # StreamStartEvent
+    if not loader.check_event(yaml.DocumentStartEvent):
+        return
+    loader.get_event()
+    if not loader.check_event(yaml.MappingStartEvent):
+        msg = "The iFDO document must be a mapping"
+        raise ValueErrorException(msg)
+    loader.get_event()
+    while not loader.check_event(yaml.MappingEndEvent):
+        yield construct_yaml_value(loader)
+
+
+def construct_yaml_value(loader: IfdoLoader) -> Any:  # noqa: ANN401
+    """Compose and construct the next node of the stream.
+
+    Args:
+        loader (IfdoLoader): The loader.
+
+    Returns:
+        Any: The constructed value.
+    """
+    return loader.construct_document(loader.compose_node(None, None))
+
+
+def skip_yaml_value(loader: IfdoLoader) -> None:
+    """Consume the events of the next node of the stream, without composing it.
+
+    Args:
+        loader (IfdoLoader): The loader.
+    """
+    depth = 0
+    while True:
+        event = loader.get_event()
+        if isinstance(event, yaml.CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, yaml.CollectionEndEvent):
+            depth -= 1
+        if depth == 0:
+            return
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most `size` elements.
+
+    Args:
+        items (Iterable): The elements.
+        size (int): The maximum size of each list.
+
+    Yields:
+        list: The chunks, in order.
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def achunked(items: AsyncIterable | Iterable, size: int) -> AsyncIterator[list]:
+    """Split a synchronous or asynchronous iterable into lists of at most `size` elements.
+
+    Args:
+        items (AsyncIterable | Iterable): The elements.
+        size (int): The maximum size of each list.
+
+    Yields:
+        list: The chunks, in order.
+    """
+    if not isinstance(items, AsyncIterable):
+        for chunk in chunked(items, size):
+            yield chunk
+        return
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
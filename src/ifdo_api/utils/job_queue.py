@@ -0,0 +1,87 @@
+"""In-process queue running background jobs on a pool of asyncio workers.
+
+The queue only holds job IDs: the state of each job lives in the database, so that a job whose worker is gone
+(the process was restarted, or another replica died) is submitted again by the periodic sweep and resumes from
+its last checkpoint.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterable
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Queue of job IDs consumed by a fixed number of worker tasks.
+
+    Args:
+        run (Callable[[UUID], Awaitable[None]]): Coroutine running a job, given its ID.
+        workers (int): Number of jobs run concurrently.
+        sweep (Callable[[], Awaitable[Iterable[UUID]]] | None): Coroutine returning the IDs of the jobs to (re)submit.
+        sweep_interval (float): Seconds between two sweeps, the first one running at start.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[UUID], Awaitable[None]],
+        workers: int = 2,
+        sweep: Callable[[], Awaitable[Iterable[UUID]]] | None = None,
+        sweep_interval: float = 60,
+    ):
+        self.run = run
+        self.workers = workers
+        self.sweep = sweep
+        self.sweep_interval = sweep_interval
+        self.queue: asyncio.Queue[UUID] = asyncio.Queue()
+        self.pending: set[UUID] = set()
+        self.tasks: list[asyncio.Task] = []
+
+    def submit(self, job_id: UUID) -> None:
+        """Queue a job, unless it is already queued or running in this process.
+
+        Args:
+            job_id (UUID): The ID of the job.
+        """
+        if job_id in self.pending:
+            return
+        self.pending.add(job_id)
+        self.queue.put_nowait(job_id)
+
+    def start(self) -> None:
+        """Start the workers and the sweep."""
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+        if self.sweep is not None:
+            self.tasks.append(asyncio.create_task(self.sweep_forever()))
+
+    async def stop(self) -> None:
+        """Cancel the workers, interrupting the running jobs: their state is left for the sweep of the next start."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def work(self) -> None:
+        """Run the queued jobs one after the other."""
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self.run(job_id)
+            except Exception:
+                logger.exception("Error running job %s", job_id)
+            finally:
+                self.pending.discard(job_id)
+                self.queue.task_done()
+
+    async def sweep_forever(self) -> None:
+        """Periodically submit the jobs returned by the sweep."""
+        while True:
+            try:
+                for job_id in await self.sweep():
+                    self.submit(job_id)
+            except Exception:
+                logger.exception("Error sweeping jobs")
+            await asyncio.sleep(self.sweep_interval)